@@ -1,43 +1,52 @@
 # File: /3d_env_viewer/3d_env_viewer/src/ik_simulation.py
 
 import numpy as np
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
+from ik_solvers import solve, forward_kinematics
 
 class IKSimulation:
-    def __init__(self, target_position, link_lengths):
-        self.target_position = np.array(target_position)
-        self.link_lengths = link_lengths
-        self.joint_angles = np.zeros(len(link_lengths))
+    def __init__(self, target_position, link_lengths, method='dls', limits=None):
+        self.target_position = np.array(target_position, dtype=np.float64)
+        self.link_lengths = np.asarray(link_lengths, dtype=np.float64)
+        self.method = method
+        self.limits = limits  # (lower, upper) arrays of shape (n, 2), or None
+        # Yaw/pitch per joint; see ik_solvers for the chain convention
+        self.joint_angles = np.zeros((len(self.link_lengths), 2))
+        self.error = None
+        self.converged = False
 
-    def calculate_joint_angles(self):
-        # Placeholder for IK calculation logic
-        # This should be replaced with an actual IK algorithm
-        # For now, we will just set the angles to zero
-        self.joint_angles = np.zeros(len(self.link_lengths))
+    def calculate_joint_angles(self, **solver_options):
+        # Warm-started from the current pose, so repeated calls track a moving target cheaply
+        result = solve(self.target_position, self.link_lengths, self.method,
+                       initial=self.joint_angles, limits=self.limits, **solver_options)
+        self.joint_angles = result.angles[0]
+        self.error = float(result.error[0])
+        self.converged = bool(result.converged[0])
+        return result
 
-    def forward_kinematics(self):
-        positions = [np.array([0, 0, 0])]
-        for i, angle in enumerate(self.joint_angles):
-            x = positions[-1][0] + self.link_lengths[i] * np.cos(angle)
-            y = positions[-1][1] + self.link_lengths[i] * np.sin(angle)
-            z = positions[-1][2]  # Assuming planar motion for simplicity
-            positions.append(np.array([x, y, z]))
-        return positions
+    def solve_batch(self, targets, initial=None, **solver_options):
+        """Solve for many targets at once (e.g. a reachability sweep); returns an IKResult."""
+        return solve(targets, self.link_lengths, self.method, initial=initial, limits=self.limits, **solver_options)
 
-    def visualize(self):
-        self.calculate_joint_angles()
-        positions = self.forward_kinematics()
+    def forward_kinematics(self):
+        # (n + 1, 3) joint positions, base first
+        return forward_kinematics(self.joint_angles, self.link_lengths)
 
-        fig = plt.figure()
-        ax = fig.add_subplot(111, projection='3d')
-        ax.plot([pos[0] for pos in positions], 
-                [pos[1] for pos in positions], 
-                [pos[2] for pos in positions], marker='o')
+    def visualize(self, trajectory=None, **playback_options):
+        # Plays the solve back as a live chain in the OpenGL viewer; a trajectory of
+        # targets (T, 3) is solved incrementally while it plays
+        from viewRender import ViewRender
+        from viewIK import IKPlayback
+        if trajectory is None:
+            trajectory = [self.target_position]
+        viewer = ViewRender()
+        playback = IKPlayback(self, trajectory, **playback_options)
+        viewer.add_model(playback.model)
+        viewer.add_animation(playback)
+        viewer.run()
+        return playback
 
-        ax.scatter(self.target_position[0], self.target_position[1], self.target_position[2], color='r', s=100)
-        ax.set_xlabel('X axis')
-        ax.set_ylabel('Y axis')
-        ax.set_zlabel('Z axis')
-        plt.title('IK Simulation')
-        plt.show()
\ No newline at end of file
+if __name__ == "__main__":
+    # Demo: a four-link arm following a helix
+    t = np.linspace(0.0, 4.0 * np.pi, 600)
+    helix = np.stack([1.2 + 0.5 * np.cos(t), 0.5 * np.sin(t), np.linspace(-0.8, 0.8, len(t))], axis=1)
+    IKSimulation(helix[0], [1.0, 0.8, 0.6, 0.4]).visualize(helix)
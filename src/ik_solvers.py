@@ -0,0 +1,234 @@
+from collections import namedtuple
+import numpy as np
+
+# ---------------------------------------------
+# Batched inverse kinematics for serial 3D chains
+# ---------------------------------------------
+# A chain of n links starts at the origin. Joint i carries two angles (yaw, pitch): the link
+# frame is the parent frame rotated by Rz(yaw) then Ry(pitch), and link i runs along the
+# frame's local +X axis for link_lengths[i]. With all angles zero the chain lies along +X.
+#
+# Every solver works on a batch of B problems at once:
+#   targets       (B, 3) or (3,)
+#   link_lengths  (n,) shared by all problems, or (B, n) for one chain per problem
+#   initial       (n, 2) or (B, n, 2) warm-start angles, zeros when omitted
+#   limits        (lower, upper), each broadcastable to (B, n, 2), in radians
+# Loops only run over links or iterations; all per-problem work is vectorized.
+
+IKResult = namedtuple('IKResult', ['angles', 'positions', 'error', 'converged', 'iterations'])
+
+def _prepare(targets, link_lengths, initial, limits):
+    targets = np.atleast_2d(np.asarray(targets, dtype=np.float64))
+    lengths = np.asarray(link_lengths, dtype=np.float64)
+    batch = targets.shape[0] if lengths.ndim == 1 else np.broadcast_shapes((targets.shape[0],), lengths.shape[:1])[0]
+    targets = np.broadcast_to(targets, (batch, 3))
+    lengths = np.broadcast_to(lengths, (batch, lengths.shape[-1]))
+    n = lengths.shape[1]
+    if initial is None:
+        angles = np.zeros((batch, n, 2))
+    else:
+        angles = np.array(np.broadcast_to(initial, (batch, n, 2)), dtype=np.float64)
+    if limits is not None:
+        lower, upper = (np.broadcast_to(np.asarray(bound, dtype=np.float64), (batch, n, 2)) for bound in limits)
+        limits = (lower, upper)
+        angles = np.clip(angles, lower, upper)
+    return targets, lengths, angles, limits
+
+def _clip(angles, limits):
+    if limits is None:
+        return angles
+    return np.clip(angles, limits[0], limits[1])
+
+def joint_rotations(angles):
+    """Local Rz(yaw) @ Ry(pitch) matrices for angles of shape (..., 2) -> (..., 3, 3)."""
+    c0, c1 = np.cos(angles[..., 0]), np.cos(angles[..., 1])
+    s0, s1 = np.sin(angles[..., 0]), np.sin(angles[..., 1])
+    zero = np.zeros_like(c0)
+    return np.stack([
+        np.stack([c0 * c1, -s0, c0 * s1], axis=-1),
+        np.stack([s0 * c1, c0, s0 * s1], axis=-1),
+        np.stack([-s1, zero, c1], axis=-1),
+    ], axis=-2)
+
+def chain_frames(angles, link_lengths):
+    """World rotations (B, n, 3, 3) of every link and joint positions (B, n + 1, 3)."""
+    local = joint_rotations(angles)
+    rotations = np.empty_like(local)
+    current = np.broadcast_to(np.eye(3), local.shape[:-3] + (3, 3))
+    for i in range(local.shape[-3]):
+        current = current @ local[..., i, :, :]
+        rotations[..., i, :, :] = current
+    # Each link advances along its frame's X axis (first column)
+    offsets = rotations[..., :, 0] * link_lengths[..., None]
+    positions = np.concatenate([np.zeros(offsets.shape[:-2] + (1, 3)), np.cumsum(offsets, axis=-2)], axis=-2)
+    return rotations, positions
+
+def forward_kinematics(angles, link_lengths):
+    """Joint positions (..., n + 1, 3) for angles (..., n, 2); the first row is the base."""
+    angles = np.asarray(angles, dtype=np.float64)
+    lengths = np.broadcast_to(np.asarray(link_lengths, dtype=np.float64), angles.shape[:-1])
+    return chain_frames(angles, lengths)[1]
+
+def _axis_rotations(axes, delta):
+    # Rodrigues rotation matrices about unit axes (B, 3) by delta (B,)
+    x, y, z = axes[:, 0], axes[:, 1], axes[:, 2]
+    zero = np.zeros_like(x)
+    k = np.stack([np.stack([zero, -z, y], -1), np.stack([z, zero, -x], -1), np.stack([-y, x, zero], -1)], -2)
+    s = np.sin(delta)[:, None, None]
+    c = np.cos(delta)[:, None, None]
+    return np.eye(3) + s * k + (1.0 - c) * (k @ k)
+
+def _result(angles, lengths, targets, tol, iterations):
+    _, positions = chain_frames(angles, lengths)
+    error = np.linalg.norm(targets - positions[:, -1], axis=1)
+    return IKResult(angles, positions, error, error <= tol, iterations)
+
+# ---------------------------------------------
+# Damped least squares (Levenberg-Marquardt on the position Jacobian)
+# ---------------------------------------------
+def solve_dls(targets, link_lengths, initial=None, limits=None, max_iter=100, tol=1e-4, damping=0.05, max_step=0.25):
+    """Damped least squares. damping and max_step are fractions of the chain's total length."""
+    targets, lengths, angles, limits = _prepare(targets, link_lengths, initial, limits)
+    batch, n = lengths.shape
+    reach = lengths.sum(axis=1)
+    lam2 = (damping * reach) ** 2
+    iterations = np.zeros(batch, dtype=np.int64)
+    # Indices of problems still iterating; converged ones drop out of the batch
+    idx = np.arange(batch)
+    for _ in range(max_iter):
+        sub_angles, sub_lengths = angles[idx], lengths[idx]
+        rotations, positions = chain_frames(sub_angles, sub_lengths)
+        error = targets[idx] - positions[:, -1]
+        distance = np.linalg.norm(error, axis=1)
+        active = distance > tol
+        idx, rotations, positions, error, distance, sub_angles = (
+            idx[active], rotations[active], positions[active], error[active], distance[active], sub_angles[active])
+        if not len(idx):
+            break
+        count = len(idx)
+        # Clamp the task-space step so far targets do not throw the linearization off
+        limit = max_step * reach[idx]
+        error *= np.minimum(1.0, limit / distance)[:, None]
+        # Joint axes in world space: yaw turns about the parent's Z, pitch about the link's Y
+        parent_z = np.concatenate([np.broadcast_to([0.0, 0.0, 1.0], (count, 1, 3)), rotations[:, :-1, :, 2]], axis=1)
+        axes = np.stack([parent_z, rotations[:, :, :, 1]], axis=2)                   # (B, n, 2, 3)
+        lever = positions[:, -1, None, None, :] - positions[:, :-1, None, :]          # (B, n, 1, 3)
+        jacobian = np.cross(axes, lever).reshape(count, 2 * n, 3).transpose(0, 2, 1)  # (B, 3, 2n)
+        jjt = jacobian @ jacobian.transpose(0, 2, 1) + lam2[idx, None, None] * np.eye(3)
+        step = jacobian.transpose(0, 2, 1) @ np.linalg.solve(jjt, error[:, :, None])
+        sub_limits = None if limits is None else (limits[0][idx], limits[1][idx])
+        angles[idx] = _clip(sub_angles + step.reshape(count, n, 2), sub_limits)
+        iterations[idx] += 1
+    return _result(angles, lengths, targets, tol, iterations)
+
+# ---------------------------------------------
+# Cyclic coordinate descent
+# ---------------------------------------------
+def solve_ccd(targets, link_lengths, initial=None, limits=None, max_iter=50, tol=1e-4):
+    """CCD sweeping joints from the tip to the base, one rotation axis at a time.
+
+    Each update is a rotation about a world axis through the joint, so the downstream
+    positions and frames are rotated in place instead of re-running forward kinematics.
+    """
+    targets, lengths, angles, limits = _prepare(targets, link_lengths, initial, limits)
+    batch, n = lengths.shape
+    all_rotations, all_positions = chain_frames(angles, lengths)
+    iterations = np.zeros(batch, dtype=np.int64)
+    idx = np.arange(batch)
+    for _ in range(max_iter):
+        active = np.linalg.norm(targets[idx] - all_positions[idx, -1], axis=1) > tol
+        idx = idx[active]
+        if not len(idx):
+            break
+        iterations[idx] += 1
+        # Sweep only the unconverged problems, then scatter their state back
+        sub_angles, rotations, positions = angles[idx], all_rotations[idx], all_positions[idx]
+        sub_targets = targets[idx]
+        sub_limits = None if limits is None else (limits[0][idx], limits[1][idx])
+        for i in range(n - 1, -1, -1):
+            pivot = positions[:, i]
+            for k in range(2):
+                if k == 0:
+                    axis = rotations[:, i - 1, :, 2] if i > 0 else np.broadcast_to([0.0, 0.0, 1.0], (len(idx), 3))
+                else:
+                    axis = rotations[:, i, :, 1]
+                to_end = positions[:, -1] - pivot
+                to_target = sub_targets - pivot
+                # Angle between the two vectors projected onto the plane normal to the axis
+                to_end = to_end - np.sum(to_end * axis, axis=1)[:, None] * axis
+                to_target = to_target - np.sum(to_target * axis, axis=1)[:, None] * axis
+                delta = np.arctan2(np.sum(axis * np.cross(to_end, to_target), axis=1), np.sum(to_end * to_target, axis=1))
+                updated = sub_angles[:, i, k] + delta
+                if sub_limits is not None:
+                    updated = np.clip(updated, sub_limits[0][:, i, k], sub_limits[1][:, i, k])
+                delta = updated - sub_angles[:, i, k]
+                sub_angles[:, i, k] = updated
+                turn = _axis_rotations(axis, delta)
+                positions[:, i + 1:] = pivot[:, None] + np.einsum('bij,bkj->bki', turn, positions[:, i + 1:] - pivot[:, None])
+                rotations[:, i:] = turn[:, None] @ rotations[:, i:]
+        angles[idx], all_rotations[idx], all_positions[idx] = sub_angles, rotations, positions
+    return _result(angles, lengths, targets, tol, iterations)
+
+# ---------------------------------------------
+# FABRIK (forward and backward reaching), projected onto the joint model
+# ---------------------------------------------
+def _positions_to_angles(positions, lengths, limits):
+    # Recover yaw/pitch per link from link directions, clamp to limits and rebuild the chain
+    batch, n = lengths.shape
+    angles = np.empty((batch, n, 2))
+    rebuilt = np.zeros_like(positions)
+    parent = np.broadcast_to(np.eye(3), (batch, 3, 3))
+    for i in range(n):
+        direction = positions[:, i + 1] - positions[:, i]
+        local = np.einsum('bji,bj->bi', parent, direction)
+        yaw = np.arctan2(local[:, 1], local[:, 0])
+        pitch = np.arctan2(-local[:, 2], np.hypot(local[:, 0], local[:, 1]))
+        joint = np.stack([yaw, pitch], axis=1)
+        if limits is not None:
+            joint = np.clip(joint, limits[0][:, i], limits[1][:, i])
+        angles[:, i] = joint
+        parent = parent @ joint_rotations(joint)
+        rebuilt[:, i + 1] = rebuilt[:, i] + parent[:, :, 0] * lengths[:, i, None]
+    return angles, rebuilt
+
+def solve_fabrik(targets, link_lengths, initial=None, limits=None, max_iter=50, tol=1e-4):
+    """FABRIK passes on joint positions; after every iteration the chain is mapped back to
+    joint angles and clamped, so limits hold and the result is always a valid pose."""
+    targets, lengths, angles, limits = _prepare(targets, link_lengths, initial, limits)
+    batch, n = lengths.shape
+    _, positions = chain_frames(angles, lengths)
+    iterations = np.zeros(batch, dtype=np.int64)
+
+    def place(anchor, toward, length):
+        direction = toward - anchor
+        norm = np.linalg.norm(direction, axis=1, keepdims=True)
+        # Coincident joints keep an arbitrary but finite direction
+        direction = np.where(norm > 1e-12, direction / np.maximum(norm, 1e-12), [1.0, 0.0, 0.0])
+        return anchor + direction * length[:, None]
+
+    idx = np.arange(batch)
+    for _ in range(max_iter):
+        active = np.linalg.norm(targets[idx] - positions[idx, -1], axis=1) > tol
+        idx = idx[active]
+        if not len(idx):
+            break
+        iterations[idx] += 1
+        sub_lengths = lengths[idx]
+        reached = positions[idx]
+        reached[:, -1] = targets[idx]
+        for i in range(n - 1, -1, -1):
+            reached[:, i] = place(reached[:, i + 1], reached[:, i], sub_lengths[:, i])
+        reached[:, 0] = 0.0
+        for i in range(n):
+            reached[:, i + 1] = place(reached[:, i], reached[:, i + 1], sub_lengths[:, i])
+        sub_limits = None if limits is None else (limits[0][idx], limits[1][idx])
+        angles[idx], positions[idx] = _positions_to_angles(reached, sub_lengths, sub_limits)
+    return _result(angles, lengths, targets, tol, iterations)
+
+SOLVERS = {'dls': solve_dls, 'ccd': solve_ccd, 'fabrik': solve_fabrik}
+
+def solve(targets, link_lengths, method='dls', **kwargs):
+    """Solve a batch of IK problems with the named method ('dls', 'ccd' or 'fabrik')."""
+    if method not in SOLVERS:
+        raise ValueError(f"unknown IK method '{method}', expected one of {tuple(SOLVERS)}")
+    return SOLVERS[method](targets, link_lengths, **kwargs)
@@ -0,0 +1,199 @@
+import numpy as np
+from OpenGL.GL import *
+
+# ---------------------------------------------
+# CPU-side buffer preparation (no GL calls, safe off the render thread)
+# ---------------------------------------------
+# Depth resolution of the back-to-front face sort (uint16 keys)
+DEPTH_BUCKETS = 1 << 16
+
+def fan_triangles(num_faces, arity):
+    # Triangle corner indices for num_faces convex faces of the given arity stored
+    # corner-by-corner: face f occupies corners f*arity .. f*arity + arity - 1
+    if arity < 3 or num_faces == 0:
+        return np.empty(0, dtype=np.uint32)
+    k = np.arange(1, arity - 1, dtype=np.uint32)
+    fan = np.stack([np.zeros_like(k), k, k + 1], axis=1).ravel()
+    base = np.arange(num_faces, dtype=np.uint32)[:, None] * np.uint32(arity)
+    return (base + fan[None, :]).ravel()
+
+def build_face_positions(model):
+    # Faces are expanded to one vertex per face corner so each face can carry its own color
+    return np.ascontiguousarray(model.vertices[model.faces].reshape(-1, 3), dtype=np.float32)
+
+def build_face_arrays(model):
+    return build_face_positions(model), fan_triangles(len(model.faces), model.face_arity)
+
+def build_edge_arrays(model):
+    return np.ascontiguousarray(model.edges, dtype=np.uint32).ravel()
+
+def compute_face_centroids(model):
+    return model.vertices[model.faces].mean(axis=1, dtype=np.float32)
+
+class FaceDepthOrder:
+    """Back-to-front face order of one model for the current view, for blended faces.
+
+    Faces are ordered by the eye-space depth of their centroids, quantized to DEPTH_BUCKETS
+    levels across the model so a stable radix sort orders them in linear time. Each sort
+    starts from the previous order, so faces that share a bucket keep their relative order
+    between frames instead of flickering. Only the view rotation affects the order (pan and
+    zoom shift every depth equally), so nothing is recomputed while just panning or zooming.
+    """
+
+    def __init__(self):
+        self.order = None
+        self.key = None
+
+    def update(self, model, view_matrix):
+        # Returns (order, changed); order lists face indices farthest first
+        axis = np.asarray(view_matrix, dtype=np.float32)[2, :3]
+        key = (model.version, axis.tobytes())
+        if key == self.key:
+            return self.order, False
+        self.key = key
+        centroids = model.cached('face_centroids', compute_face_centroids)
+        # The camera looks down -z, so ascending eye-space z runs from far to near
+        depth = centroids @ axis
+        low, high = depth.min(), depth.max()
+        scale = (DEPTH_BUCKETS - 1) / (high - low) if high > low else 0.0
+        buckets = ((depth - low) * scale).astype(np.uint16)
+        previous = self.order
+        if previous is None or len(previous) != len(buckets):
+            self.order = np.argsort(buckets, kind='stable')
+            return self.order, True
+        ordered = buckets[previous]
+        if np.all(ordered[1:] >= ordered[:-1]):
+            return previous, False
+        self.order = previous[np.argsort(ordered, kind='stable')]
+        return self.order, True
+
+# ---------------------------------------------
+# Retained-mode GPU buffers for a single model
+# ---------------------------------------------
+class MeshBuffers:
+    """Vertex/index buffer objects for one Model, re-uploaded only when geometry or colors change."""
+
+    # Running totals across all models, read (and reset) by the frame profiler
+    draw_calls = 0
+    faces_submitted = 0
+
+    def __init__(self):
+        self.face_vbo = None
+        # Per-face color sets by slot name, e.g. the model's own tint and the viewer's shading,
+        # so alternating between them does not re-upload colors every frame
+        self.color_vbos = {}
+        self.face_colors = {}
+        self.face_ibo = None
+        self.edge_vbo = None
+        self.edge_ibo = None
+        self.sizes = {}
+        self.geometry_version = None
+        self.topology_version = None
+        self.face_index_count = 0
+        self.edge_index_count = 0
+        # Face indices in back-to-front order, valid for geometry sorted_version
+        self.depth_order = FaceDepthOrder()
+        self.sorted_ibo = None
+        self.sorted_version = None
+
+    def _upload(self, name, target, buffer, data):
+        # Reuse the existing allocation (glBufferSubData) when the size is unchanged
+        if buffer is None:
+            buffer = glGenBuffers(1)
+        glBindBuffer(target, buffer)
+        if self.sizes.get(name) == data.nbytes:
+            glBufferSubData(target, 0, data.nbytes, data)
+        else:
+            glBufferData(target, data.nbytes, data if data.nbytes else None, GL_DYNAMIC_DRAW)
+            self.sizes[name] = data.nbytes
+        glBindBuffer(target, 0)
+        return buffer
+
+    def update_geometry(self, model):
+        if self.geometry_version == model.version:
+            return
+        if self.topology_version == model.topology_version:
+            # Only positions moved: rewrite the vertex buffers, keep indices and colors
+            if self.face_index_count:
+                self.face_vbo = self._upload('face_vbo', GL_ARRAY_BUFFER, self.face_vbo, build_face_positions(model))
+            self.edge_vbo = self._upload('edge_vbo', GL_ARRAY_BUFFER, self.edge_vbo, np.ascontiguousarray(model.vertices))
+            self.geometry_version = model.version
+            return
+        positions, indices = model.cached('face_arrays', build_face_arrays)
+        edge_indices = model.cached('edge_arrays', build_edge_arrays)
+        self.face_vbo = self._upload('face_vbo', GL_ARRAY_BUFFER, self.face_vbo, positions)
+        self.face_ibo = self._upload('face_ibo', GL_ELEMENT_ARRAY_BUFFER, self.face_ibo, indices)
+        self.edge_vbo = self._upload('edge_vbo', GL_ARRAY_BUFFER, self.edge_vbo, np.ascontiguousarray(model.vertices))
+        self.edge_ibo = self._upload('edge_ibo', GL_ELEMENT_ARRAY_BUFFER, self.edge_ibo, edge_indices)
+        self.face_index_count = len(indices)
+        self.edge_index_count = len(edge_indices)
+        self.geometry_version = model.version
+        self.topology_version = model.topology_version
+        # Corner count may have changed, so force the colors through again
+        self.face_colors.clear()
+
+    def update_face_colors(self, model, face_colors, slot):
+        # face_colors is an (F, 4) float32 array; only changed colors reach the GPU
+        previous = self.face_colors.get(slot)
+        if previous is not None and np.array_equal(previous, face_colors):
+            return
+        corner_colors = np.repeat(np.asarray(face_colors, dtype=np.float32), model.face_arity, axis=0)
+        self.color_vbos[slot] = self._upload(('colors', slot), GL_ARRAY_BUFFER, self.color_vbos.get(slot), corner_colors)
+        self.face_colors[slot] = np.array(face_colors, dtype=np.float32)
+
+    def update_sorted_indices(self, model, view_matrix):
+        # Re-upload the face indices in depth order, only when that order changed
+        order, changed = self.depth_order.update(model, view_matrix)
+        if not changed and self.sorted_version == model.version:
+            return
+        indices = model.cached('face_arrays', build_face_arrays)[1]
+        sorted_indices = np.ascontiguousarray(indices.reshape(len(order), -1)[order]).ravel()
+        self.sorted_ibo = self._upload('sorted_ibo', GL_ELEMENT_ARRAY_BUFFER, self.sorted_ibo, sorted_indices)
+        self.sorted_version = model.version
+
+    def draw_faces(self, model, face_colors, slot='default', view_matrix=None):
+        # With view_matrix, faces are drawn back to front so blending is order-correct; later
+        # passes without one reuse that order while the geometry is unchanged
+        self.update_geometry(model)
+        if self.face_index_count == 0:
+            return
+        self.update_face_colors(model, face_colors, slot)
+        if view_matrix is not None:
+            self.update_sorted_indices(model, view_matrix)
+        ibo = self.sorted_ibo if self.sorted_version == model.version else self.face_ibo
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, self.face_vbo)
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        glBindBuffer(GL_ARRAY_BUFFER, self.color_vbos[slot])
+        glColorPointer(4, GL_FLOAT, 0, None)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ibo)
+        glDrawElements(GL_TRIANGLES, self.face_index_count, GL_UNSIGNED_INT, None)
+        MeshBuffers.draw_calls += 1
+        MeshBuffers.faces_submitted += len(model.faces)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+
+    def draw_edges(self, model):
+        self.update_geometry(model)
+        if self.edge_index_count == 0:
+            return
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, self.edge_vbo)
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.edge_ibo)
+        glDrawElements(GL_LINES, self.edge_index_count, GL_UNSIGNED_INT, None)
+        MeshBuffers.draw_calls += 1
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_VERTEX_ARRAY)
+
+    def release(self):
+        # Must be called with the owning GL context current
+        buffers = [self.face_vbo, self.face_ibo, self.edge_vbo, self.edge_ibo, self.sorted_ibo, *self.color_vbos.values()]
+        buffers = [int(b) for b in buffers if b is not None]
+        if buffers:
+            glDeleteBuffers(len(buffers), buffers)
+        self.__init__()
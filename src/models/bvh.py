@@ -0,0 +1,195 @@
+from collections import namedtuple
+import numpy as np
+
+# ---------------------------------------------
+# Pick result: closest hit along a ray
+# ---------------------------------------------
+# barycentrics are (w0, w1, w2) weights of the hit point within the picked triangle
+# instance is set for hits on an InstancedModel, None otherwise
+PickHit = namedtuple('PickHit', ['model_idx', 'face_idx', 't', 'barycentrics', 'instance'], defaults=(None,))
+
+# ---------------------------------------------
+# Helpers
+# ---------------------------------------------
+def _morton_codes(points, lo, hi):
+    # 30-bit Morton codes (10 bits per axis) of points normalized into the [lo, hi] box
+    extent = np.where(hi - lo > 0, hi - lo, 1.0)
+    cells = ((points - lo) / extent * 1023.0).clip(0, 1023).astype(np.uint32)
+    codes = np.zeros(len(points), dtype=np.uint32)
+    for axis in range(3):
+        c = cells[:, axis]
+        c = (c | (c << 16)) & 0x030000FF
+        c = (c | (c << 8)) & 0x0300F00F
+        c = (c | (c << 4)) & 0x030C30C3
+        c = (c | (c << 2)) & 0x09249249
+        codes |= c << np.uint32(axis)
+    return codes
+
+def ray_box_entry(origin, inv_dir, lo, hi):
+    # Vectorized slab test: entry distance per box, inf where the ray misses
+    t1 = (lo - origin) * inv_dir
+    t2 = (hi - origin) * inv_dir
+    t_near = np.minimum(t1, t2).max(axis=1)
+    t_far = np.maximum(t1, t2).min(axis=1)
+    hit = (t_far >= np.maximum(t_near, 0.0))
+    return np.where(hit, t_near, np.inf)
+
+def classify_boxes(planes, lo, hi):
+    # Frustum test for many boxes at once: returns (intersects_or_inside, fully_inside) masks
+    normals, offsets = planes[:, :3], planes[:, 3]
+    positive = normals >= 0
+    far_corner = np.where(positive[None], hi[:, None], lo[:, None])
+    near_corner = np.where(positive[None], lo[:, None], hi[:, None])
+    far_dist = np.einsum('bpk,pk->bp', far_corner, normals) + offsets
+    near_dist = np.einsum('bpk,pk->bp', near_corner, normals) + offsets
+    return np.all(far_dist >= 0, axis=1), np.all(near_dist >= 0, axis=1)
+
+def ray_triangles(origin, direction, v0, v1, v2, eps=1e-12):
+    # Batched Moller-Trumbore; returns (t, u, v) with t = inf where a triangle is missed
+    e1 = v1 - v0
+    e2 = v2 - v0
+    p = np.cross(direction, e2)
+    det = np.einsum('ij,ij->i', e1, p)
+    valid = np.abs(det) > eps
+    inv_det = np.divide(1.0, det, out=np.zeros_like(det), where=valid)
+    s = origin - v0
+    u = np.einsum('ij,ij->i', s, p) * inv_det
+    q = np.cross(s, e1)
+    v = (q @ direction) * inv_det
+    t = np.einsum('ij,ij->i', e2, q) * inv_det
+    hit = valid & (u >= 0) & (v >= 0) & (u + v <= 1) & (t > 0)
+    return np.where(hit, t, np.inf), u, v
+
+# ---------------------------------------------
+# Bounding volume hierarchy over axis-aligned boxes
+# ---------------------------------------------
+class BVH:
+    """Linear BVH over primitive bounding boxes.
+
+    Primitives are sorted along a Morton curve and split at the midpoint of each range,
+    giving a complete binary tree in heap layout (children of node k are 2k+1 and 2k+2)
+    whose leaves hold contiguous runs of ``order``. Building and every traversal step are
+    whole-level NumPy operations rather than per-node Python work.
+    """
+
+    def __init__(self, lo, hi, leaf_size=16):
+        lo = np.asarray(lo, dtype=np.float64)
+        hi = np.asarray(hi, dtype=np.float64)
+        count = len(lo)
+        self.depth = max(int(np.ceil(np.log2(max(count / leaf_size, 1.0)))), 0)
+        num_leaves = 1 << self.depth
+        self.first_leaf = num_leaves - 1
+        if count:
+            centers = (lo + hi) * 0.5
+            self.order = np.argsort(_morton_codes(centers, centers.min(axis=0), centers.max(axis=0)), kind='stable')
+        else:
+            self.order = np.empty(0, dtype=np.int64)
+        # Leaf i covers order[leaf_start[i]:leaf_start[i + 1]]
+        self.leaf_start = (np.arange(num_leaves + 1) * count) // num_leaves
+        node_lo = np.full((2 * num_leaves - 1, 3), np.inf)
+        node_hi = np.full((2 * num_leaves - 1, 3), -np.inf)
+        if count:
+            starts = self.leaf_start[:-1]
+            nonempty = starts < self.leaf_start[1:]
+            leaf_nodes = np.arange(self.first_leaf, 2 * num_leaves - 1)[nonempty]
+            node_lo[leaf_nodes] = np.minimum.reduceat(lo[self.order], starts[nonempty], axis=0)
+            node_hi[leaf_nodes] = np.maximum.reduceat(hi[self.order], starts[nonempty], axis=0)
+        # Bottom-up: each level's bounds are the union of its children's
+        for level in range(self.depth - 1, -1, -1):
+            nodes = np.arange((1 << level) - 1, (1 << (level + 1)) - 1)
+            node_lo[nodes] = np.minimum(node_lo[2 * nodes + 1], node_lo[2 * nodes + 2])
+            node_hi[nodes] = np.maximum(node_hi[2 * nodes + 1], node_hi[2 * nodes + 2])
+        self.node_lo = node_lo
+        self.node_hi = node_hi
+
+    @property
+    def bounds(self):
+        return self.node_lo[0], self.node_hi[0]
+
+    def leaves_hit_by_ray(self, origin, direction, max_t=np.inf):
+        # Leaf indices whose boxes the ray enters before max_t, with their entry distances
+        if not len(self.order):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        # A tiny stand-in for zero components keeps axis-parallel rays free of 0 * inf NaNs
+        inv_dir = 1.0 / np.where(direction == 0, 1e-30, direction)
+        nodes = np.zeros(1, dtype=np.int64)
+        for level in range(self.depth + 1):
+            t_near = ray_box_entry(origin, inv_dir, self.node_lo[nodes], self.node_hi[nodes])
+            keep = t_near < max_t
+            nodes, t_near = nodes[keep], t_near[keep]
+            if not len(nodes):
+                break
+            if level < self.depth:
+                nodes = np.stack([2 * nodes + 1, 2 * nodes + 2], axis=1).ravel()
+        return nodes - self.first_leaf, t_near
+
+    def query_frustum(self, planes, lo, hi):
+        # Primitives whose boxes (lo, hi, indexed like the build input) touch the frustum.
+        # Subtrees fully inside are accepted as whole leaf ranges without further tests.
+        if not len(self.order):
+            return np.empty(0, dtype=np.int64)
+        accepted = []
+        nodes = np.zeros(1, dtype=np.int64)
+        for level in range(self.depth + 1):
+            visible, inside = classify_boxes(planes, self.node_lo[nodes], self.node_hi[nodes])
+            span = 1 << (self.depth - level)
+            first = (nodes[inside] - ((1 << level) - 1)) * span
+            if len(first):
+                leaves = (first[:, None] + np.arange(span)).ravel()
+                accepted.append(self.primitives_in_leaves(leaves))
+            nodes = nodes[visible & ~inside]
+            if not len(nodes):
+                break
+            if level < self.depth:
+                nodes = np.stack([2 * nodes + 1, 2 * nodes + 2], axis=1).ravel()
+        else:
+            # Leaves straddling a plane: test their primitives individually
+            prims = self.primitives_in_leaves(nodes - self.first_leaf)
+            accepted.append(prims[classify_boxes(planes, lo[prims], hi[prims])[0]])
+        return np.sort(np.concatenate(accepted)) if accepted else np.empty(0, dtype=np.int64)
+
+    def primitives_in_leaves(self, leaves):
+        # Concatenate the primitive runs of the given leaves without a Python loop
+        starts = self.leaf_start[leaves]
+        counts = self.leaf_start[leaves + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        return self.order[np.arange(counts.sum()) + offsets]
+
+# ---------------------------------------------
+# Triangle BVH for a mesh
+# ---------------------------------------------
+class MeshBVH:
+    """BVH over a model's triangles, answering closest-hit ray queries in model space."""
+
+    def __init__(self, vertices, triangles, triangle_faces, leaf_size=16):
+        self.vertices = vertices
+        self.triangles = triangles
+        self.triangle_faces = triangle_faces
+        corners = vertices[triangles]
+        self.bvh = BVH(corners.min(axis=1), corners.max(axis=1), leaf_size)
+
+    def intersect(self, origin, direction, max_t=np.inf):
+        """Closest hit as (face_idx, t, barycentrics), or None if the ray misses."""
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+        leaves, entry = self.bvh.leaves_hit_by_ray(origin, direction, max_t)
+        if not len(leaves):
+            return None
+        # Visit leaves front to back in batches so far leaves are skipped once a near hit is found
+        ranked = np.argsort(entry)
+        leaves, entry = leaves[ranked], entry[ranked]
+        best = (np.inf, -1, 0.0, 0.0)
+        start, batch = 0, 8
+        while start < len(leaves) and entry[start] < best[0]:
+            prims = self.bvh.primitives_in_leaves(leaves[start:start + batch])
+            start += batch
+            v0, v1, v2 = (self.vertices[self.triangles[prims, k]].astype(np.float64) for k in range(3))
+            t, u, v = ray_triangles(origin, direction, v0, v1, v2)
+            i = np.argmin(t)
+            if t[i] < best[0] and t[i] < max_t:
+                best = (t[i], prims[i], u[i], v[i])
+            batch *= 2
+        t, prim, u, v = best
+        if prim < 0:
+            return None
+        return int(self.triangle_faces[prim]), float(t), (float(1.0 - u - v), float(u), float(v))
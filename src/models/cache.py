@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import numpy as np
+from models.model import Model
+
+# ---------------------------------------------
+# Native mesh cache: versioned, memory-mappable arrays
+# ---------------------------------------------
+# Layout: 8-byte magic, little-endian uint32 header length, JSON header, then every array
+# aligned to ALIGNMENT bytes so np.memmap views can be handed to Model without copying.
+# The header records the source file's size and mtime; a mismatch, a different format
+# version or a corrupt file all count as a miss and the entry is rewritten.
+MAGIC = b'3DVMESH\0'
+FORMAT_VERSION = 2
+ALIGNMENT = 64
+CACHE_DIR = os.environ.get('VIEWER_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', '3d_viewer'))
+
+def cache_path(source, cache_dir=None):
+    # One cache file per absolute source path
+    digest = hashlib.sha1(os.path.abspath(source).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir or CACHE_DIR, digest + '.mesh')
+
+def source_signature(source, content_hash=False):
+    # Size + mtime is cheap and enough for local assets; content_hash also guards against
+    # tools that rewrite files while preserving timestamps
+    stat = os.stat(source)
+    signature = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if content_hash:
+        sha = hashlib.sha1()
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 24), b''):
+                sha.update(block)
+        signature['sha1'] = sha.hexdigest()
+    return signature
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def write_cache(path, model, signature):
+    """Write model's arrays (plus derived normals, edges and bounds) to a cache file."""
+    bounds = model.bounds()
+    arrays = {
+        'vertices': model.vertices,
+        'faces': model.faces,
+        'edges': model.edges,
+        'face_normals': model.face_normals(),
+        'bounds': np.array(bounds if bounds is not None else np.zeros((2, 3))),
+    }
+    if model.face_map is not None:
+        arrays['face_map'] = model.face_map
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        entries[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _align(offset + array.nbytes)
+    header = json.dumps({
+        'version': FORMAT_VERSION, 'source': signature, 'arrays': entries, 'has_bounds': bounds is not None,
+    }).encode('utf-8')
+    data_start = _align(len(MAGIC) + 4 + len(header))
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # Write to a temporary name and rename so readers never see a partial file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint32(len(header)).astype('<u4').tobytes())
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + entries[name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp, path)
+
+def read_cache(path, signature=None):
+    """Model backed by memory-mapped cache arrays, or None if missing, stale or unreadable."""
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            header_len = int(np.frombuffer(f.read(4), dtype='<u4')[0])
+            header = json.loads(f.read(header_len))
+    except (OSError, ValueError, IndexError):
+        return None
+    if header.get('version') != FORMAT_VERSION:
+        return None
+    if signature is not None and header.get('source') != signature:
+        return None
+    data_start = _align(len(MAGIC) + 4 + header_len)
+    arrays = {}
+    try:
+        for name, entry in header['arrays'].items():
+            shape = tuple(entry['shape'])
+            if np.prod(shape) == 0:
+                arrays[name] = np.empty(shape, dtype=entry['dtype'])
+            else:
+                # Copy-on-write mapping: pages are shared with the page cache until edited
+                arrays[name] = np.memmap(path, dtype=entry['dtype'], mode='c',
+                                         offset=data_start + entry['offset'], shape=shape)
+    except (OSError, ValueError, KeyError):
+        return None
+    model = Model(arrays['vertices'], arrays['edges'], arrays['faces'])
+    model.face_map = arrays.get('face_map')
+    model.seed_cache('face_normals', arrays['face_normals'])
+    if header.get('has_bounds'):
+        model.seed_cache('bounds', (np.asarray(arrays['bounds'][0]), np.asarray(arrays['bounds'][1])))
+    return model
+
+def load_cached(source, loader, cache_dir=None, content_hash=False):
+    """Load source through the cache, calling loader(source) and refreshing the entry on a miss."""
+    signature = source_signature(source, content_hash)
+    path = cache_path(source, cache_dir)
+    model = read_cache(path, signature)
+    if model is not None:
+        return model
+    model = loader(source)
+    try:
+        write_cache(path, model, signature)
+    except OSError:
+        # A read-only or full cache directory should not prevent loading the asset
+        pass
+    return model
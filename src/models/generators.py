@@ -0,0 +1,150 @@
+from functools import lru_cache
+import numpy as np
+from models.model import Model, derive_edges
+
+# ---------------------------------------------
+# Procedural meshes built from broadcast index grids
+# ---------------------------------------------
+# Every generator returns a new Model at the requested resolution. Closed shapes are
+# watertight: seams and poles share vertices, so every edge borders exactly two faces, and
+# faces are wound so their normals point outward. Edges are derived from the faces.
+#
+# The arrays for recently used parameters are memoized (LRU, CACHE_SIZE entries); each call
+# still returns a Model with its own copies, so editing one never affects another.
+
+CACHE_SIZE = 8
+
+def grid_quads(rows, cols, wrap_rows=False, wrap_cols=False):
+    """Quads over a rows x cols vertex grid (vertex r * cols + c), optionally closed around
+    either axis. Winding follows +row then +col, i.e. the normal is d_row x d_col."""
+    r = np.arange(rows if wrap_rows else rows - 1)[:, None]
+    c = np.arange(cols if wrap_cols else cols - 1)[None, :]
+    r2 = (r + 1) % rows
+    c2 = (c + 1) % cols
+    quads = np.stack(np.broadcast_arrays(r * cols + c, r2 * cols + c, r2 * cols + c2, r * cols + c2), axis=-1)
+    return quads.reshape(-1, 4).astype(np.int32)
+
+def quads_to_triangles(quads):
+    # Split each quad (a, b, c, d) into (a, b, c) and (a, c, d), keeping the winding
+    return np.stack([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]], axis=1).reshape(-1, 3)
+
+def _frozen(vertices, faces):
+    arrays = (np.ascontiguousarray(vertices, dtype=np.float32), np.ascontiguousarray(faces, dtype=np.int32))
+    arrays += (derive_edges(arrays[1]),)
+    for array in arrays:
+        array.flags.writeable = False
+    return arrays
+
+def _model(arrays):
+    vertices, faces, edges = arrays
+    return Model(vertices.copy(), edges.copy(), faces.copy())
+
+# ---------------------------------------------
+# Cached array builders (vertices, faces, edges)
+# ---------------------------------------------
+@lru_cache(maxsize=CACHE_SIZE)
+def _torus_arrays(major_radius, minor_radius, rings, sides):
+    u = np.linspace(0.0, 2.0 * np.pi, rings, endpoint=False)[:, None]
+    v = np.linspace(0.0, 2.0 * np.pi, sides, endpoint=False)[None, :]
+    radius = major_radius + minor_radius * np.cos(v)
+    vertices = np.stack(np.broadcast_arrays(radius * np.cos(u), radius * np.sin(u), minor_radius * np.sin(v)), axis=-1)
+    return _frozen(vertices.reshape(-1, 3), grid_quads(rings, sides, wrap_rows=True, wrap_cols=True))
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _uv_sphere_arrays(radius, rings, segments):
+    # rings - 1 latitude circles between two single pole vertices
+    theta = np.linspace(0.0, np.pi, rings + 1)[1:-1, None]
+    phi = np.linspace(0.0, 2.0 * np.pi, segments, endpoint=False)[None, :]
+    body = np.stack(np.broadcast_arrays(np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), np.cos(theta)), axis=-1)
+    vertices = np.concatenate([body.reshape(-1, 3), [[0.0, 0.0, 1.0], [0.0, 0.0, -1.0]]]) * radius
+    north, south = len(vertices) - 2, len(vertices) - 1
+    c = np.arange(segments)
+    c2 = (c + 1) % segments
+    last = (rings - 2) * segments
+    faces = np.concatenate([
+        np.stack([np.full(segments, north), c, c2], axis=1),
+        quads_to_triangles(grid_quads(rings - 1, segments, wrap_cols=True)),
+        np.stack([last + c, np.full(segments, south), last + c2], axis=1),
+    ])
+    return _frozen(vertices, faces)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cylinder_arrays(radius, height, segments, rings, capped):
+    # Side rows run from the top (z = +height/2) down so the quad winding faces outward
+    z = np.linspace(height / 2.0, -height / 2.0, rings + 1)[:, None]
+    phi = np.linspace(0.0, 2.0 * np.pi, segments, endpoint=False)[None, :]
+    side = np.stack(np.broadcast_arrays(radius * np.cos(phi), radius * np.sin(phi), z), axis=-1).reshape(-1, 3)
+    faces = [quads_to_triangles(grid_quads(rings + 1, segments, wrap_cols=True))]
+    vertices = [side]
+    if capped:
+        top, bottom = len(side), len(side) + 1
+        vertices.append([[0.0, 0.0, height / 2.0], [0.0, 0.0, -height / 2.0]])
+        c = np.arange(segments)
+        c2 = (c + 1) % segments
+        last = rings * segments
+        faces.append(np.stack([np.full(segments, top), c, c2], axis=1))
+        faces.append(np.stack([np.full(segments, bottom), last + c2, last + c], axis=1))
+    return _frozen(np.concatenate(vertices), np.concatenate(faces))
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _grid_plane_arrays(width, depth, rows, cols):
+    # Open rows x cols quad grid in the XZ plane, centered on the origin, facing +Y
+    z = np.linspace(-depth / 2.0, depth / 2.0, rows + 1)[:, None]
+    x = np.linspace(-width / 2.0, width / 2.0, cols + 1)[None, :]
+    vertices = np.stack(np.broadcast_arrays(x, np.zeros_like(x * z), z), axis=-1).reshape(-1, 3)
+    return _frozen(vertices, grid_quads(rows + 1, cols + 1))
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _subdivided_cube_arrays(size, divisions):
+    # Surface points of an (n x n x n) lattice get vertex indices; each side is a slice of
+    # the index lattice, so edges and corners are shared between neighbouring sides
+    n = divisions + 1
+    lattice = np.indices((n, n, n)).reshape(3, -1).T
+    surface = np.any((lattice == 0) | (lattice == divisions), axis=1)
+    index = np.full(n ** 3, -1, dtype=np.int64)
+    index[surface] = np.arange(surface.sum())
+    index = index.reshape(n, n, n)
+    vertices = (lattice[surface] / divisions - 0.5) * size
+    sides = []
+    for axis in range(3):
+        # Remaining axes in cyclic order (axis+1, axis+2) make d_row x d_col = +axis
+        a, b = (axis + 1) % 3, (axis + 2) % 3
+        ordered = np.transpose(index, (axis, a, b))
+        for layer, outward in ((0, False), (divisions, True)):
+            grid = ordered[layer]
+            quads = grid.ravel()[grid_quads(n, n)]
+            sides.append(quads if outward else quads[:, ::-1])
+    return _frozen(vertices, np.concatenate(sides))
+
+# ---------------------------------------------
+# Public generators
+# ---------------------------------------------
+def torus(major_radius=1.0, minor_radius=0.5, rings=24, sides=12):
+    """Quad torus around the Z axis: `rings` segments around the hole, `sides` around the tube."""
+    if rings < 3 or sides < 3:
+        raise ValueError("torus needs at least 3 rings and 3 sides")
+    return _model(_torus_arrays(float(major_radius), float(minor_radius), int(rings), int(sides)))
+
+def uv_sphere(radius=1.0, rings=16, segments=32):
+    """Triangle sphere with `rings` latitude bands and `segments` longitude slices (poles on Z)."""
+    if rings < 2 or segments < 3:
+        raise ValueError("uv_sphere needs at least 2 rings and 3 segments")
+    return _model(_uv_sphere_arrays(float(radius), int(rings), int(segments)))
+
+def cylinder(radius=1.0, height=2.0, segments=32, rings=1, capped=True):
+    """Triangle cylinder along Z; `rings` subdivides the side, caps are fans around a center vertex."""
+    if segments < 3 or rings < 1:
+        raise ValueError("cylinder needs at least 3 segments and 1 ring")
+    return _model(_cylinder_arrays(float(radius), float(height), int(segments), int(rings), bool(capped)))
+
+def grid_plane(width=2.0, depth=2.0, rows=10, cols=10):
+    """Open quad grid in the XZ plane with rows x cols cells."""
+    if rows < 1 or cols < 1:
+        raise ValueError("grid_plane needs at least one row and one column")
+    return _model(_grid_plane_arrays(float(width), float(depth), int(rows), int(cols)))
+
+def subdivided_cube(size=2.0, divisions=1):
+    """Quad cube centered on the origin with each side split into divisions x divisions cells."""
+    if divisions < 1:
+        raise ValueError("subdivided_cube needs at least one division")
+    return _model(_subdivided_cube_arrays(float(size), int(divisions)))
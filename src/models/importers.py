@@ -0,0 +1,377 @@
+import os
+import re
+import numpy as np
+from models.model import Model
+from models.preprocess import triangulate_polygons, face_edges, weld_vertices, normalize_model
+
+# ---------------------------------------------
+# Streaming mesh importers (OBJ, PLY, STL)
+# ---------------------------------------------
+# Text formats are read in large chunks and each chunk's numeric block is parsed in one
+# np.fromstring call; binary formats are mapped with np.memmap so no per-line or
+# per-face Python objects survive past the chunk that produced them.
+CHUNK_SIZE = 32 << 20
+PLY_FACE_WINDOW = 256  # faces per first bulk check (or per walked block) in binary PLY face lists
+PLY_SHORT_RUN = 16     # equal-arity runs shorter than this are walked face by face
+
+# Captures stop at '#' so inline comments never reach the number parser
+_OBJ_VERTEX = re.compile(rb'^v[ \t]+([^\r\n#]*)', re.M)
+_OBJ_FACE = re.compile(rb'^f[ \t]+([^\r\n#]*)', re.M)
+_OBJ_KIND = re.compile(rb'^([vf])[ \t]', re.M)
+_OBJ_INDEX_SUFFIX = re.compile(rb'/[^\s]*')
+_STL_VERTEX = re.compile(rb'vertex[ \t]+([^\r\n]*)')
+
+_PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8',
+}
+
+def load_mesh(path, chunk_size=CHUNK_SIZE, weld_tolerance=None):
+    """Load an OBJ, PLY or STL file into a Model, choosing the importer by extension.
+
+    With weld_tolerance, vertices closer than about that distance are merged afterwards
+    (normalize_model), which shrinks meshes exported with one vertex copy per face.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    loaders = {'.obj': load_obj, '.ply': load_ply, '.stl': load_stl}
+    if ext not in loaders:
+        raise ValueError(f"unsupported mesh format: {path}")
+    model = loaders[ext](path, chunk_size)
+    if weld_tolerance is not None:
+        model = normalize_model(model, weld_tolerance)
+    return model
+
+# ---------------------------------------------
+# Shared helpers
+# ---------------------------------------------
+def _line_chunks(f, chunk_size):
+    # Yield blocks of whole lines; a partial trailing line is carried into the next block
+    remainder = b''
+    while True:
+        block = f.read(chunk_size)
+        if not block:
+            if remainder:
+                yield remainder
+            return
+        block = remainder + block
+        cut = block.rfind(b'\n') + 1
+        remainder = block[cut:]
+        if cut:
+            yield block[:cut]
+
+def _tokens_per_line(blob, num_lines):
+    # Count whitespace-separated tokens on each line of a newline-joined blob, vectorized
+    data = np.frombuffer(blob, dtype=np.uint8)
+    if not len(data):
+        return np.zeros(num_lines, dtype=np.int64)
+    space = (data == 32) | (data == 9) | (data == 10) | (data == 13)
+    starts = ~space
+    starts[1:] &= space[:-1]
+    line = np.cumsum(data == 10)
+    return np.bincount(line[starts], minlength=num_lines)[:num_lines]
+
+def _parse_rows(blob, num_lines, dtype, width, kind):
+    # Numbers of a newline-joined block plus the token count of each line; every line must
+    # hold at least width numbers
+    counts = _tokens_per_line(blob, num_lines)
+    try:
+        values = np.fromstring(blob, dtype=dtype, sep=' ')
+    except ValueError:
+        values = None
+    if values is None or len(values) != counts.sum() or np.any(counts < width):
+        raise ValueError(f"malformed {kind} line in block starting with {blob[:60]!r}")
+    return values, counts
+
+def _ragged_rows(values, counts, width):
+    # First `width` values of each variable-length row (rows must have at least width values)
+    starts = np.cumsum(counts) - counts
+    return values[starts[:, None] + np.arange(width)]
+
+class _FaceAccumulator:
+    """Flat polygon indices plus per-polygon counts, grown geometrically as chunks arrive."""
+
+    def __init__(self):
+        self.indices = np.empty(0, dtype=np.int32)
+        self.counts = np.empty(0, dtype=np.int32)
+        self.num_indices = 0
+        self.num_faces = 0
+
+    def add(self, indices, counts):
+        self.indices = _append(self.indices, self.num_indices, indices)
+        self.counts = _append(self.counts, self.num_faces, counts)
+        self.num_indices += len(indices)
+        self.num_faces += len(counts)
+
+    def faces(self):
+        # (F, K) when every polygon has the same arity, otherwise fan triangles plus face map
+        indices = self.indices[:self.num_indices]
+        if len(self.indices) > self.num_indices:
+            indices = indices.copy()  # release the growth slack
+        counts = self.counts[:self.num_faces]
+        if not len(counts):
+            return np.empty((0, 3), dtype=np.int32), None
+        if np.all(counts == counts[0]):
+            return indices.reshape(-1, int(counts[0])), None
+        return triangulate_polygons(indices, counts)
+
+def _append(buf, count, values):
+    needed = count + len(values)
+    if needed > len(buf):
+        grown = np.empty(max(needed, 2 * len(buf), 1024), dtype=buf.dtype)
+        grown[:count] = buf[:count]
+        buf = grown
+    buf[count:needed] = values
+    return buf
+
+def _finish_model(model, faces, face_map=None):
+    # Attach faces and derived edges to a streamed model and release its spare capacity;
+    # face_map links triangles back to the mixed-arity polygons they were split from
+    model.faces = faces
+    model.face_map = face_map
+    model.edges = face_edges(faces, face_map)
+    model.compact()
+    return model
+
+# ---------------------------------------------
+# Wavefront OBJ
+# ---------------------------------------------
+def load_obj(path, chunk_size=CHUNK_SIZE):
+    model = Model([], [])
+    faces = _FaceAccumulator()
+    with open(path, 'rb') as f:
+        for chunk in _line_chunks(f, chunk_size):
+            base = len(model.vertices)
+            lines = _OBJ_VERTEX.findall(chunk)
+            if lines:
+                values, counts = _parse_rows(b'\n'.join(lines), len(lines), np.float32, 3, 'OBJ vertex')
+                if np.all(counts == counts[0]):
+                    vertices = values.reshape(len(lines), -1)[:, :3]
+                else:
+                    vertices = _ragged_rows(values, counts, 3)
+                model.add_vertices(vertices)
+            lines = _OBJ_FACE.findall(chunk)
+            if lines:
+                # Keep only the position index of v/vt/vn triplets
+                blob = _OBJ_INDEX_SUFFIX.sub(b'', b'\n'.join(lines))
+                values, counts = _parse_rows(blob, len(lines), np.int64, 1, 'OBJ face')
+                if np.any(values < 0):
+                    # Relative indices count back from the vertices defined before each face line
+                    kinds = np.array(_OBJ_KIND.findall(chunk)) == b'v'
+                    seen = base + np.cumsum(kinds)[~kinds]
+                    values = np.where(values < 0, values + np.repeat(seen, counts) + 1, values)
+                faces.add(values - 1, counts)
+    return _finish_model(model, *faces.faces())
+
+# ---------------------------------------------
+# Stanford PLY (ASCII, binary little/big endian)
+# ---------------------------------------------
+def _read_ply_header(f):
+    if f.readline().strip() != b'ply':
+        raise ValueError("not a PLY file")
+    fmt = None
+    elements = []
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError("truncated PLY header")
+        words = line.decode('ascii', 'replace').split()
+        if not words or words[0] in ('comment', 'obj_info'):
+            continue
+        if words[0] == 'end_header':
+            return fmt, elements, f.tell()
+        if words[0] == 'format':
+            fmt = words[1]
+        elif words[0] == 'element':
+            elements.append({'name': words[1], 'count': int(words[2]), 'props': []})
+        elif words[0] == 'property':
+            if words[1] == 'list':
+                elements[-1]['props'].append((words[4], _PLY_TYPES[words[2]], _PLY_TYPES[words[3]]))
+            else:
+                elements[-1]['props'].append((words[2], _PLY_TYPES[words[1]], None))
+
+def load_ply(path, chunk_size=CHUNK_SIZE):
+    with open(path, 'rb') as f:
+        fmt, elements, offset = _read_ply_header(f)
+    if fmt == 'ascii':
+        return _load_ply_ascii(path, elements, offset, chunk_size)
+    endian = '<' if fmt == 'binary_little_endian' else '>'
+    vertices = faces = face_map = None
+    for element in elements:
+        props = element['props']
+        if all(list_type is None for _, _, list_type in props):
+            dtype = np.dtype([(name, endian + t) for name, t, _ in props])
+            records = np.memmap(path, dtype=dtype, mode='c', offset=offset, shape=(element['count'],))
+            offset += dtype.itemsize * element['count']
+            if element['name'] == 'vertex':
+                vertices = _ply_positions(records, dtype)
+        elif element['name'] == 'face':
+            faces, face_map, offset = _ply_binary_faces(path, element, endian, offset)
+        else:
+            raise ValueError(f"cannot skip PLY element '{element['name']}' with list properties")
+    if vertices is None:
+        raise ValueError("PLY file has no vertex element")
+    if faces is None:
+        faces = np.empty((0, 3), dtype=np.int32)
+    return _finish_model(Model(vertices, []), faces, face_map)
+
+def _ply_positions(records, dtype):
+    if dtype.names[:3] == ('x', 'y', 'z') and all(dtype[i] == np.dtype('<f4') for i in range(3)) \
+            and dtype.itemsize == 12 and dtype.isnative:
+        # Packed native float32 x/y/z: use the mapped file directly, no copy
+        return records.view(np.float32).reshape(-1, 3)
+    return np.stack([records['x'], records['y'], records['z']], axis=1).astype(np.float32)
+
+def _ply_binary_faces(path, element, endian, offset):
+    count = element['count']
+    if len(element['props']) != 1:
+        raise ValueError("only PLY faces with a single vertex index list are supported")
+    _, count_type, index_type = element['props'][0]
+    count_dtype = np.dtype(endian + count_type)
+    index_dtype = np.dtype(endian + index_type)
+    if count == 0:
+        return np.empty((0, 3), dtype=np.int32), None, offset
+    arity = int(np.memmap(path, dtype=count_dtype, mode='r', offset=offset, shape=(1,))[0])
+    # Fast path: every face has the same arity, so the face block is a fixed-stride record array
+    fixed = np.dtype([('n', count_dtype), ('idx', index_dtype, (arity,))])
+    file_size = os.path.getsize(path)
+    if offset + fixed.itemsize * count <= file_size:
+        records = np.memmap(path, dtype=fixed, mode='r', offset=offset, shape=(count,))
+        if np.all(records['n'] == arity):
+            return records['idx'].astype(np.int32), None, offset + fixed.itemsize * count
+    # Mixed arity: decode runs of equal arity as strided record views
+    data = np.memmap(path, dtype=np.uint8, mode='r', offset=offset)
+    indices, counts, size = _ply_face_runs(data, count, count_dtype, index_dtype)
+    return triangulate_polygons(indices, counts) + (offset + size,)
+
+def _ply_face_runs(data, count, count_dtype, index_dtype, window=PLY_FACE_WINDOW):
+    """Flat indices, per-face counts and byte size of a variable-arity binary face block.
+
+    Starting at a face of known arity, the next faces are assumed to share it: their count
+    fields then sit at a fixed stride, so one strided view checks a whole window of them and
+    the confirmed run's indices are copied out as an (n, arity) view of the same bytes.
+    Windows double while the prediction holds, so files dominated by one arity decode in a
+    few passes. Where arities change every few faces (two short runs in a row), a window of
+    faces is walked one count at a time instead and its indices are gathered in one call.
+    """
+    count_size, index_size = count_dtype.itemsize, index_dtype.itemsize
+    # The count and index types read at every byte offset (views, no copies)
+    count_at = np.ndarray((max(len(data) - count_size + 1, 0),), dtype=count_dtype, buffer=data, strides=(1,))
+    index_at = np.ndarray((max(len(data) - index_size + 1, 0),), dtype=index_dtype, buffer=data, strides=(1,))
+    read_count = count_at.item
+    indices, counts = [], []
+    pos = done = 0
+    size = window
+    short = False  # the previous run was short too
+    try:
+        while done < count:
+            arity = read_count(pos)
+            stride = count_size + arity * index_size
+            # Faces of this arity whose count fields fit in the remaining bytes
+            n = min(size, count - done, (len(data) - pos - count_size) // stride + 1)
+            found = np.ndarray((n,), dtype=count_dtype, buffer=data, offset=pos, strides=(stride,))
+            changed = np.flatnonzero(found != arity)
+            run = int(changed[0]) if len(changed) else n
+            # A lone change of arity is just a short run; repeated ones switch to walking
+            if run >= PLY_SHORT_RUN or run == count - done or not short:
+                short = run < PLY_SHORT_RUN
+                if pos + run * stride > len(data):
+                    raise IndexError(pos + run * stride)
+                indices.append(np.ndarray((run, arity), dtype=index_dtype, buffer=data, offset=pos + count_size,
+                                          strides=(stride, index_size)).astype(np.int32).ravel())
+                counts.append(np.full(run, arity, dtype=np.int64))
+                done += run
+                pos += run * stride
+                size = min(2 * size, count) if run == n else window
+                continue
+            # Arity keeps changing: walk a window of faces count by count
+            block = min(window, count - done)
+            starts = np.empty(block, dtype=np.int64)
+            block_counts = np.empty(block, dtype=np.int64)
+            for i in range(block):
+                arity = read_count(pos)
+                starts[i] = pos + count_size
+                block_counts[i] = arity
+                pos += count_size + arity * index_size
+            if pos > len(data):
+                raise IndexError(pos)
+            offsets = np.repeat(starts - index_size * (np.cumsum(block_counts) - block_counts), block_counts)
+            indices.append(index_at[offsets + index_size * np.arange(len(offsets))].astype(np.int32))
+            counts.append(block_counts)
+            done += block
+            size = window
+            short = False
+    except IndexError:
+        raise ValueError("truncated PLY face data") from None
+    return np.concatenate(indices), np.concatenate(counts), pos
+
+def _load_ply_ascii(path, elements, offset, chunk_size):
+    model = Model([], [])
+    faces = _FaceAccumulator()
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        lines = _LineReader(f, chunk_size)
+        for element in elements:
+            props = element['props']
+            for blob, num_lines in lines.take(element['count']):
+                values = np.fromstring(blob, dtype=np.float64, sep=' ')
+                if element['name'] == 'vertex':
+                    names = [name for name, _, _ in props]
+                    columns = [names.index(axis) for axis in ('x', 'y', 'z')]
+                    model.add_vertices(values.reshape(num_lines, len(props))[:, columns])
+                elif element['name'] == 'face':
+                    # Each line is "n i0 i1 ... i(n-1)"
+                    tokens = _tokens_per_line(blob, num_lines)
+                    line_starts = np.cumsum(tokens) - tokens
+                    counts = values[line_starts].astype(np.int64)
+                    rel = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+                    faces.add(values[np.repeat(line_starts + 1, counts) + rel].astype(np.int32), counts)
+    return _finish_model(model, *faces.faces())
+
+class _LineReader:
+    """Hands out exactly N lines at a time from a chunked binary file, as newline-joined blobs."""
+
+    def __init__(self, f, chunk_size):
+        self.chunks = _line_chunks(f, chunk_size)
+        self.pending = b''
+
+    def take(self, count):
+        while count > 0:
+            if not self.pending:
+                self.pending = next(self.chunks, b'')
+                if not self.pending:
+                    raise ValueError("unexpected end of PLY data")
+            newlines = np.flatnonzero(np.frombuffer(self.pending, dtype=np.uint8) == 10)
+            if len(newlines) <= count:
+                blob, self.pending, n = self.pending, b'', len(newlines)
+            else:
+                cut = newlines[count - 1] + 1
+                blob, self.pending, n = self.pending[:cut], self.pending[cut:], count
+            count -= n
+            yield blob, n
+
+# ---------------------------------------------
+# STL (binary and ASCII)
+# ---------------------------------------------
+_STL_RECORD = np.dtype([('normal', '<f4', (3,)), ('corners', '<f4', (3, 3)), ('attributes', '<u2')])
+
+def load_stl(path, chunk_size=CHUNK_SIZE):
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.read(84)
+    count = int(np.frombuffer(header[80:84], dtype='<u4')[0]) if len(header) == 84 else -1
+    if size == 84 + count * _STL_RECORD.itemsize:
+        records = np.memmap(path, dtype=_STL_RECORD, mode='r', offset=84, shape=(count,))
+        corners = records['corners'].reshape(-1, 3)
+    else:
+        blocks = []
+        with open(path, 'rb') as f:
+            for chunk in _line_chunks(f, chunk_size):
+                lines = _STL_VERTEX.findall(chunk)
+                if lines:
+                    blocks.append(np.fromstring(b'\n'.join(lines), dtype=np.float32, sep=' ').reshape(-1, 3))
+        corners = np.concatenate(blocks) if blocks else np.empty((0, 3), dtype=np.float32)
+    # STL stores three independent corners per triangle; weld identical positions so faces share vertices
+    vertices, remap = weld_vertices(corners)
+    return _finish_model(Model(vertices, []), remap.reshape(-1, 3))
@@ -0,0 +1,408 @@
+import ctypes
+import os
+import numpy as np
+from OpenGL import contextdata
+from OpenGL.GL import *
+from models.model import Model, _reserve
+from models.buffers import MeshBuffers
+from models.bvh import BVH, ray_box_entry
+
+# ---------------------------------------------
+# Instanced drawing: one shared Model, many 4x4 transforms and colors
+# ---------------------------------------------
+# Transforms use the column-vector convention (world = T @ local), like the camera matrices.
+# With GL 3.3 the shared geometry is drawn once per pass with glDrawElementsInstanced, and
+# per-instance transforms and colors come from attribute divisors, so GPU memory and draw
+# calls grow with the unique geometry, not the instance count. Without it (or with
+# VIEWER_INSTANCING=0) the instances are baked into one transformed Model on the CPU.
+
+_VERTEX_SHADER = """
+#version 330 compatibility
+layout(location = 0) in vec3 position;
+layout(location = 1) in vec3 normal;
+layout(location = 2) in mat4 instance_transform;
+layout(location = 6) in vec4 instance_color;
+uniform vec3 view_dir;
+uniform vec4 facing_color;
+uniform vec4 backfacing_color;
+uniform int flat_shading;
+uniform vec4 flat_color;
+uniform int marked_instance[2];
+uniform vec4 marked_color[2];
+out vec4 color;
+void main() {
+    gl_Position = gl_ModelViewProjectionMatrix * (instance_transform * vec4(position, 1.0));
+    if (flat_shading != 0) {
+        color = flat_color;
+        return;
+    }
+    vec3 n = transpose(inverse(mat3(instance_transform))) * normal;
+    color = (dot(n, view_dir) > 0.0 ? facing_color : backfacing_color) * instance_color;
+    for (int k = 0; k < 2; ++k) {
+        if (gl_InstanceID == marked_instance[k]) {
+            color = marked_color[k];
+        }
+    }
+}
+"""
+
+_FRAGMENT_SHADER = """
+#version 330 compatibility
+in vec4 color;
+layout(location = 0) out vec4 frag_color;
+void main() {
+    frag_color = color;
+}
+"""
+
+def instancing_program():
+    """The instancing shader program for the current context, or None if unsupported."""
+    # Program names are only valid in the context that compiled them, so the result is kept
+    # in PyOpenGL's per-context storage (False once instancing turned out to be unavailable)
+    program = contextdata.getValue('instancing_program')
+    if program is None:
+        program = False
+        if os.environ.get('VIEWER_INSTANCING', '1') != '0' and bool(glDrawElementsInstanced) and bool(glVertexAttribDivisor):
+            from OpenGL.GL import shaders
+            try:
+                program = shaders.compileProgram(shaders.compileShader(_VERTEX_SHADER, GL_VERTEX_SHADER),
+                                                 shaders.compileShader(_FRAGMENT_SHADER, GL_FRAGMENT_SHADER))
+            except Exception:
+                program = False
+        contextdata.setValue('instancing_program', program)
+    return program or None
+
+class InstanceBuffers:
+    """GPU state of an InstancedModel: per-corner normals and the per-instance attributes."""
+
+    def __init__(self):
+        self.normal_vbo = None
+        self.instance_vbo = None
+        self.color_vbo = None
+        self.sizes = {}
+        self.normals_version = None
+        self.instances_key = None
+        self.count = 0
+
+    _upload = MeshBuffers._upload
+
+    def update(self, instanced, indices):
+        model = instanced.model
+        if self.normals_version != model.version:
+            normals = np.repeat(model.face_normals().astype(np.float32), model.face_arity, axis=0)
+            self.normal_vbo = self._upload('normal_vbo', GL_ARRAY_BUFFER, self.normal_vbo, np.ascontiguousarray(normals))
+            self.normals_version = model.version
+        key = (instanced.version, None if indices is None else indices.tobytes())
+        if key != self.instances_key:
+            transforms = instanced.transforms if indices is None else instanced.transforms[indices]
+            colors = instanced.colors if indices is None else instanced.colors[indices]
+            # GLSL reads a mat4 attribute as four column vectors, hence the transpose
+            columns = np.ascontiguousarray(transforms.transpose(0, 2, 1), dtype=np.float32)
+            self.instance_vbo = self._upload('instance_vbo', GL_ARRAY_BUFFER, self.instance_vbo, columns)
+            self.color_vbo = self._upload('color_vbo', GL_ARRAY_BUFFER, self.color_vbo, np.ascontiguousarray(colors))
+            self.instances_key = key
+            self.count = len(transforms)
+
+    def bind_instances(self):
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        for column in range(4):
+            glEnableVertexAttribArray(2 + column)
+            glVertexAttribPointer(2 + column, 4, GL_FLOAT, GL_FALSE, 64, ctypes.c_void_p(16 * column))
+            glVertexAttribDivisor(2 + column, 1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.color_vbo)
+        glEnableVertexAttribArray(6)
+        glVertexAttribPointer(6, 4, GL_FLOAT, GL_FALSE, 0, None)
+        glVertexAttribDivisor(6, 1)
+
+    def unbind_instances(self):
+        for location in range(2, 7):
+            glVertexAttribDivisor(location, 0)
+            glDisableVertexAttribArray(location)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def release(self):
+        buffers = [int(b) for b in (self.normal_vbo, self.instance_vbo, self.color_vbo) if b is not None]
+        if buffers:
+            glDeleteBuffers(len(buffers), buffers)
+        self.__init__()
+
+class InstancedModel:
+    """A shared Model drawn at many placements.
+
+    Picking, bounds and frustum culling work per instance through a BVH over the instances'
+    world-space boxes; hits report the instance as well as the face of the shared model.
+    Edit transforms through the methods here (or call mark_modified after in-place edits).
+    """
+
+    def __init__(self, model, transforms=None, colors=None):
+        self.model = model
+        self._transforms = np.empty((0, 4, 4), dtype=np.float32)
+        self._colors = np.empty((0, 4), dtype=np.float32)
+        self._count = 0
+        self.version = 0
+        self._derived = {}
+        self.buffers = None
+        self.listeners = []
+        self.drawn = None     # instance indices drawn by the last draw_faces (None = all)
+        self._follow_model()
+        if transforms is not None:
+            self.add_instances(transforms, colors)
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def transforms(self):
+        return self._transforms[:self._count]
+
+    @property
+    def colors(self):
+        return self._colors[:self._count]
+
+    def mark_modified(self):
+        self.version += 1
+        Model.global_version += 1
+        for listener in self.listeners:
+            listener(self)
+
+    def _follow_model(self):
+        # Geometry edits of the shared model invalidate everything derived from it
+        if self._on_model_modified not in self.model.listeners:
+            self.model.listeners.append(self._on_model_modified)
+
+    def _on_model_modified(self, model):
+        self.mark_modified()
+
+    def cached(self, key, build, discard=None):
+        # Keyed on both versions: instance edits and shared geometry edits; discard(old_value)
+        # runs when a stale value is replaced, as in Model.cached
+        entry = self._derived.get(key)
+        if entry is None or entry[0] != (self.version, self.model.version):
+            if entry is not None and discard is not None:
+                discard(entry[1])
+            entry = ((self.version, self.model.version), build(self))
+            self._derived[key] = entry
+        return entry[1]
+
+    # ---------------------------------------------
+    # Instance editing
+    # ---------------------------------------------
+    def add_instances(self, transforms, colors=None):
+        transforms = np.asarray(transforms, dtype=np.float32).reshape(-1, 4, 4)
+        if colors is None:
+            colors = np.ones((len(transforms), 4), dtype=np.float32)
+        colors = np.broadcast_to(np.asarray(colors, dtype=np.float32), (len(transforms), 4))
+        start = self._count
+        self._transforms = _reserve(self._transforms, start, len(transforms))
+        self._colors = _reserve(self._colors, start, len(transforms))
+        self._transforms[start:start + len(transforms)] = transforms
+        self._colors[start:start + len(transforms)] = colors
+        self._count += len(transforms)
+        self.mark_modified()
+        return np.arange(start, self._count)
+
+    def add_instance(self, transform, color=None):
+        return self.add_instances([transform], None if color is None else [color])[0]
+
+    def set_transforms(self, indices, transforms):
+        self._transforms[:self._count][indices] = np.asarray(transforms, dtype=np.float32)
+        self.mark_modified()
+
+    def set_colors(self, indices, colors):
+        self._colors[:self._count][indices] = np.asarray(colors, dtype=np.float32)
+        self.mark_modified()
+
+    # ---------------------------------------------
+    # Derived data (cached per version)
+    # ---------------------------------------------
+    def instance_bounds(self):
+        """World-space (lo, hi) boxes of every instance, each (K, 3)."""
+        return self.cached('instance_bounds', _compute_instance_bounds)
+
+    def bounds(self):
+        lo, hi = self.instance_bounds()
+        if not len(lo):
+            return None
+        return lo.min(axis=0), hi.max(axis=0)
+
+    def bvh(self):
+        return self.cached('bvh', lambda inst: BVH(*inst.instance_bounds(), leaf_size=8))
+
+    def visible_instances(self, planes):
+        lo, hi = self.instance_bounds()
+        return self.bvh().query_frustum(planes, lo, hi)
+
+    def pick(self, origin, direction, max_t=np.inf):
+        """Closest hit as (face_idx, t, barycentrics, instance), or None."""
+        if not self._count or self.model.bounds() is None:
+            return None
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+        bvh = self.bvh()
+        leaves, _ = bvh.leaves_hit_by_ray(origin, direction, max_t)
+        candidates = bvh.primitives_in_leaves(leaves)
+        if not len(candidates):
+            return None
+        lo, hi = self.instance_bounds()
+        entry = ray_box_entry(origin, 1.0 / np.where(direction == 0, 1e-30, direction), lo[candidates], hi[candidates])
+        ranked = np.argsort(entry)
+        candidates, entry = candidates[ranked], entry[ranked]
+        inverses = self.cached('inverse_transforms', lambda inst: np.linalg.inv(inst.transforms.astype(np.float64)))
+        best = None
+        for instance, t_entry in zip(candidates, entry):
+            if t_entry >= max_t:
+                break
+            # The ray maps into model space unnormalized, so t is the same in both spaces
+            inverse = inverses[instance]
+            hit = self.model.pick(inverse[:3, :3] @ origin + inverse[:3, 3], inverse[:3, :3] @ direction, max_t)
+            if hit is not None:
+                best = hit + (int(instance),)
+                max_t = hit[1]
+        return best
+
+    # ---------------------------------------------
+    # Rendering
+    # ---------------------------------------------
+    def gpu_buffers(self):
+        if self.buffers is None:
+            self.buffers = InstanceBuffers()
+        return self.buffers
+
+    def baked(self):
+        """All instances transformed into a single Model (CPU fallback path)."""
+        return self.cached('baked', _bake_instances, discard=Model.release_buffers)
+
+    def draw_faces(self, view_dir, planes=None, marked=(), facing_color=(0.2, 0.8, 0.2, 0.5),
+                   backfacing_color=(0.8, 0.2, 0.2, 0.5)):
+        """Shaded faces of the instances inside the frustum planes.
+
+        marked is a sequence of (instance, color) painted over the shading in order.
+        """
+        model = self.model
+        # Drawn again after release() (e.g. re-added to a viewer): follow the shared model again
+        self._follow_model()
+        indices = None
+        if planes is not None:
+            indices = self.visible_instances(planes)
+            if len(indices) == self._count:
+                indices = None
+        # Remembered for the wireframe pass, which draws the same subset
+        self.drawn = indices
+        if not len(model.faces) or (indices is not None and not len(indices)):
+            return
+        program = instancing_program()
+        if program is None:
+            self._draw_baked_faces(view_dir, marked, facing_color, backfacing_color)
+            return
+        geometry = model.gpu_buffers()
+        geometry.update_geometry(model)
+        buffers = self.gpu_buffers()
+        buffers.update(self, indices)
+        if not buffers.count or not geometry.face_index_count:
+            return
+        glUseProgram(program)
+        glUniform3f(glGetUniformLocation(program, 'view_dir'), *np.asarray(view_dir, dtype=np.float64))
+        glUniform4f(glGetUniformLocation(program, 'facing_color'), *facing_color)
+        glUniform4f(glGetUniformLocation(program, 'backfacing_color'), *backfacing_color)
+        glUniform1i(glGetUniformLocation(program, 'flat_shading'), 0)
+        # Marked instances are addressed by their position in the drawn subset
+        for k in range(2):
+            instance, color = marked[k] if k < len(marked) else (-1, (0.0, 0.0, 0.0, 0.0))
+            if indices is not None and instance >= 0:
+                position = np.searchsorted(indices, instance)
+                instance = int(position) if position < len(indices) and indices[position] == instance else -1
+            glUniform1i(glGetUniformLocation(program, f'marked_instance[{k}]'), instance)
+            glUniform4f(glGetUniformLocation(program, f'marked_color[{k}]'), *color)
+        glBindBuffer(GL_ARRAY_BUFFER, geometry.face_vbo)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
+        glBindBuffer(GL_ARRAY_BUFFER, buffers.normal_vbo)
+        glEnableVertexAttribArray(1)
+        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, 0, None)
+        buffers.bind_instances()
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, geometry.face_ibo)
+        glDrawElementsInstanced(GL_TRIANGLES, geometry.face_index_count, GL_UNSIGNED_INT, None, buffers.count)
+        MeshBuffers.draw_calls += 1
+        MeshBuffers.faces_submitted += len(model.faces) * buffers.count
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        buffers.unbind_instances()
+        glDisableVertexAttribArray(1)
+        glDisableVertexAttribArray(0)
+        glUseProgram(0)
+
+    def _draw_baked_faces(self, view_dir, marked, facing_color, backfacing_color):
+        baked = self.baked()
+        faces_per_instance = len(self.model.faces)
+        facing = (baked.face_normals() @ np.asarray(view_dir, dtype=np.float32)) > 0
+        colors = np.where(facing[:, None], facing_color, backfacing_color).astype(np.float32)
+        colors *= np.repeat(self.colors, faces_per_instance, axis=0)
+        for instance, color in marked:
+            colors[instance * faces_per_instance:(instance + 1) * faces_per_instance] = color
+        baked.gpu_buffers().draw_faces(baked, colors, slot='shading')
+
+    def render(self, screen=None):
+        # Wireframe of the instances drawn by the last draw_faces call
+        model = self.model
+        if not self._count:
+            return
+        program = instancing_program()
+        if program is None:
+            glColor3f(1.0, 1.0, 1.0)
+            baked = self.baked()
+            baked.gpu_buffers().draw_edges(baked)
+            return
+        geometry = model.gpu_buffers()
+        geometry.update_geometry(model)
+        buffers = self.gpu_buffers()
+        if (self.drawn is not None and not len(self.drawn)) or not geometry.edge_index_count:
+            return
+        buffers.update(self, self.drawn)
+        glUseProgram(program)
+        glUniform1i(glGetUniformLocation(program, 'flat_shading'), 1)
+        glUniform4f(glGetUniformLocation(program, 'flat_color'), 1.0, 1.0, 1.0, 1.0)
+        glBindBuffer(GL_ARRAY_BUFFER, geometry.edge_vbo)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
+        glVertexAttrib3f(1, 0.0, 0.0, 1.0)
+        buffers.bind_instances()
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, geometry.edge_ibo)
+        glDrawElementsInstanced(GL_LINES, geometry.edge_index_count, GL_UNSIGNED_INT, None, buffers.count)
+        MeshBuffers.draw_calls += 1
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        buffers.unbind_instances()
+        glDisableVertexAttribArray(0)
+        glUseProgram(0)
+
+    def release(self):
+        # Also stops following the shared model, which would otherwise keep this alive
+        if self._on_model_modified in self.model.listeners:
+            self.model.listeners.remove(self._on_model_modified)
+        if self.buffers is not None:
+            self.buffers.release()
+        entry = self._derived.pop('baked', None)
+        if entry is not None:
+            entry[1].release_buffers()
+
+# ---------------------------------------------
+# Builders for cached data
+# ---------------------------------------------
+def _compute_instance_bounds(instanced):
+    bounds = instanced.model.bounds()
+    transforms = instanced.transforms.astype(np.float64)
+    if bounds is None or not len(transforms):
+        return np.empty((0, 3)), np.empty((0, 3))
+    lo, hi = bounds
+    corners = np.stack(np.meshgrid(*zip(lo, hi), indexing='ij'), axis=-1).reshape(8, 3)
+    world = np.einsum('kij,cj->kci', transforms[:, :3, :3], corners) + transforms[:, None, :3, 3]
+    return world.min(axis=1), world.max(axis=1)
+
+def _bake_instances(instanced):
+    model = instanced.model
+    transforms = instanced.transforms.astype(np.float64)
+    count, num_vertices = len(transforms), len(model.vertices)
+    vertices = np.einsum('kij,vj->kvi', transforms[:, :3, :3], model.vertices.astype(np.float64))
+    vertices += transforms[:, None, :3, 3]
+    offsets = (np.arange(count) * num_vertices)[:, None, None]
+    faces = (model.faces[None] + offsets).reshape(-1, model.face_arity) if len(model.faces) else np.empty((0, 3))
+    edges = (model.edges[None] + offsets).reshape(-1, 2)
+    return Model(vertices.reshape(-1, 3).astype(np.float32), edges, faces)
@@ -0,0 +1,171 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from models.model import Model, derive_edges
+
+# Seconds the vertices must stay unchanged before decimated levels are rebuilt after an edit
+LOD_SETTLE_S = 0.5
+
+_rebuild_pool = None  # single worker thread shared by every LOD chain, created on first rebuild
+
+def _rebuilds():
+    global _rebuild_pool
+    if _rebuild_pool is None:
+        _rebuild_pool = ThreadPoolExecutor(1, thread_name_prefix='lod')
+    return _rebuild_pool
+
+# ---------------------------------------------
+# Vertex-clustering decimation
+# ---------------------------------------------
+def cluster_decimate(model, cell_size):
+    """Triangle Model with vertices snapped to a grid of cell_size and merged per cell.
+
+    Each occupied cell keeps the mean of its vertices; triangles that collapse (two corners in
+    the same cell) or become duplicates are dropped. Everything runs as sorts and bincounts.
+    """
+    vertices = model.vertices.astype(np.float64)
+    triangles, _ = model.triangles()
+    if not len(vertices) or not len(triangles):
+        return Model(np.empty((0, 3)), [], np.empty((0, 3), dtype=np.int32))
+    cells = np.floor((vertices - vertices.min(axis=0)) / cell_size).astype(np.int64)
+    keys = (cells[:, 0] << 42) | (cells[:, 1] << 21) | cells[:, 2]
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    first = np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+    cluster = np.empty(len(keys), dtype=np.int64)
+    cluster[order] = np.cumsum(first) - 1
+    num_clusters = int(first.sum())
+    counts = np.bincount(cluster, minlength=num_clusters)[:, None]
+    positions = np.stack([np.bincount(cluster, vertices[:, axis], num_clusters) for axis in range(3)], axis=1) / counts
+    remapped = cluster[triangles]
+    keep = (remapped[:, 0] != remapped[:, 1]) & (remapped[:, 1] != remapped[:, 2]) & (remapped[:, 0] != remapped[:, 2])
+    remapped = remapped[keep]
+    # Drop duplicate triangles regardless of winding, keeping the first occurrence's winding
+    canonical = np.sort(remapped, axis=1)
+    order = np.lexsort(canonical.T[::-1])
+    ordered = canonical[order]
+    first = np.concatenate(([True], np.any(ordered[1:] != ordered[:-1], axis=1)))
+    faces = remapped[np.sort(order[first])].astype(np.int32)
+    return Model(positions.astype(np.float32), derive_edges(faces), faces)
+
+# ---------------------------------------------
+# Level-of-detail chain with screen-space selection
+# ---------------------------------------------
+class ModelLOD:
+    """Progressively decimated versions of a Model, selected by projected cell size.
+
+    Level 0 is the model itself; level i was clustered on a grid whose cells are about
+    2**i times coarser than the previous one. Levels are only kept if they remove at least
+    a quarter of the previous level's triangles. Picking always uses the full model.
+
+    After a vertex-only edit the decimated levels are stale: select() draws the full model
+    until the vertices have stayed unchanged for LOD_SETTLE_S and the levels have been rebuilt
+    on a background thread, so neither per-frame animation nor the rebuild itself stalls the
+    render thread. Face or edge edits replace the whole chain (see model_lod).
+    """
+
+    def __init__(self, model, min_faces=4096, base_resolution=512, max_levels=6):
+        self.model = model
+        self.min_faces = min_faces
+        self.base_resolution = base_resolution
+        self.max_levels = max_levels
+        self.current = 0
+        self.changed_at = None  # time the model's version was first seen to differ
+        self.seen_version = model.version
+        self.pending = None     # future of a background rebuild
+        self.install(self.build())
+
+    def build(self):
+        # Decimated chain for the model's current vertices; touches no GL or ModelLOD state,
+        # so it can run on a worker thread
+        model = self.model
+        version = model.version
+        levels, cell_sizes = [model], [0.0]
+        center, radius = None, 0.0
+        bounds = model.bounds()
+        if bounds is None or len(model.faces) < self.min_faces:
+            return version, levels, cell_sizes, center, radius
+        diagonal = float(np.linalg.norm(bounds[1] - bounds[0]))
+        center = (bounds[0] + bounds[1]) / 2.0
+        radius = diagonal / 2.0
+        resolution = self.base_resolution
+        face_count = len(model.triangles()[0])
+        while len(levels) <= self.max_levels and resolution >= 4:
+            cell_size = diagonal / resolution
+            level = cluster_decimate(model, cell_size)
+            resolution //= 2
+            if len(level.faces) > 0.75 * face_count:
+                continue
+            levels.append(level)
+            cell_sizes.append(cell_size)
+            face_count = len(level.faces)
+            if face_count < self.min_faces // 4:
+                break
+        return version, levels, cell_sizes, center, radius
+
+    def install(self, chain):
+        self.version, self.levels, self.cell_sizes, self.center, self.radius = chain
+
+    def release(self):
+        # Free the GPU buffers of the decimated levels (level 0 is the model and owns its own)
+        for level in self.levels[1:]:
+            if level.buffers is not None:
+                level.buffers.release()
+                level.buffers = None
+
+    def refresh(self, now=None):
+        """True when the levels match the model's vertices. Once the vertices have settled
+        after an edit the levels are rebuilt in the background and swapped in by a later
+        call; False until then."""
+        if self.pending is not None:
+            if not self.pending.done():
+                return False
+            # Swapped on the calling (render) thread, which owns the old levels' buffers
+            chain = self.pending.result()
+            self.pending = None
+            self.release()
+            self.install(chain)
+        version = self.model.version
+        if version == self.version:
+            return True
+        now = time.perf_counter() if now is None else now
+        if version != self.seen_version or self.changed_at is None:
+            self.seen_version = version
+            self.changed_at = now
+        if now - self.changed_at >= LOD_SETTLE_S:
+            # Edits arriving during the rebuild leave the new chain stale, and it settles again
+            self.pending = _rebuilds().submit(self.build)
+            self.changed_at = None
+        return False
+
+    def pixels_per_unit(self, camera):
+        # Screen-space scale at the model's center, measured along the camera's right axis
+        right = camera.view_matrix[0, :3]
+        screen = camera.project([self.center, self.center + right * self.radius])
+        if not np.all(np.isfinite(screen)) or np.any(screen[:, 2] < 0) or np.any(screen[:, 2] > 1):
+            return np.inf
+        return float(np.linalg.norm(screen[1, :2] - screen[0, :2])) / max(self.radius, 1e-12)
+
+    def select(self, camera, pixel_error=1.5, hysteresis=0.25):
+        """Coarsest level whose cells project below pixel_error pixels, with hysteresis."""
+        if len(self.levels) == 1 or not self.refresh():
+            self.current = 0
+            return self.levels[0]
+        scale = self.pixels_per_unit(camera)
+        if not np.isfinite(scale):
+            # Center behind or at the camera: nothing to gain from coarser levels
+            self.current = 0
+            return self.levels[0]
+        cell_pixels = np.array(self.cell_sizes) * scale
+        # Moving to a finer level happens as soon as the current one exceeds the error bound;
+        # moving coarser requires the next level to be comfortably below it, preventing popping
+        while self.current > 0 and cell_pixels[self.current] > pixel_error:
+            self.current -= 1
+        while self.current + 1 < len(self.levels) and cell_pixels[self.current + 1] < pixel_error * (1.0 - hysteresis):
+            self.current += 1
+        return self.levels[self.current]
+
+def model_lod(model):
+    # The model's LOD chain, kept across vertex-only edits and replaced (with its level
+    # buffers freed) when faces or edges change
+    return model.cached('lod', ModelLOD, topology_only=True, discard=ModelLOD.release)
@@ -1,47 +1,294 @@
 import pygame
 import numpy as np
 from OpenGL.GL import *
+from models.buffers import MeshBuffers, fan_triangles
+from models.bvh import MeshBVH
+from models.topology import MeshTopology
+
+# ---------------------------------------------
+# Array helpers
+# ---------------------------------------------
+def _as_rows(data, dtype, width):
+    # Coerce a list of tuples (or an existing array) into a contiguous (N, width) array
+    arr = np.ascontiguousarray(data, dtype=dtype)
+    if arr.size == 0:
+        return np.empty((0, width), dtype=dtype)
+    if arr.ndim != 2 or (width and arr.shape[1] != width):
+        raise ValueError(f"expected rows of length {width}, got array of shape {arr.shape}")
+    return arr
+
+def _reserve(buf, count, extra):
+    # Grow buf geometrically so that count + extra rows fit; amortized O(1) per appended row
+    needed = count + extra
+    if needed <= len(buf):
+        return buf
+    capacity = max(needed, 2 * len(buf), 16)
+    grown = np.empty((capacity,) + buf.shape[1:], dtype=buf.dtype)
+    grown[:count] = buf[:count]
+    return grown
+
+def derive_edges(faces):
+    # Unique undirected boundary edges of an (F, K) face array, as an (E, 2) int32 array
+    faces = np.asarray(faces)
+    if faces.ndim != 2 or faces.size == 0:
+        return np.empty((0, 2), dtype=np.int32)
+    pairs = np.stack([faces, np.roll(faces, -1, axis=1)], axis=2).reshape(-1, 2).astype(np.int64)
+    pairs.sort(axis=1)
+    # Sort-and-mask dedup is several times faster than np.unique's hashing on large meshes
+    keys = np.sort((pairs[:, 0] << 32) | pairs[:, 1])
+    keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+    return np.stack([keys >> 32, keys & 0xFFFFFFFF], axis=1).astype(np.int32)
+
+def compute_face_normals(model):
+    # Unit normals for all faces at once from their first three corners; degenerate faces get zeros
+    corners = model.vertices[model.faces[:, :3]] if model.face_arity >= 3 else np.empty((0, 3, 3), np.float32)
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+def compute_bounds(model):
+    vertices = model.vertices
+    if not len(vertices):
+        return None
+    return vertices.min(axis=0).astype(np.float64), vertices.max(axis=0).astype(np.float64)
+
+def compute_triangles(model):
+    # Fan-triangulate every face; triangle_faces maps each triangle back to its face for picking
+    faces = model.faces
+    corners = fan_triangles(len(faces), model.face_arity)
+    triangles = faces.ravel()[corners].reshape(-1, 3)
+    triangle_faces = corners[::3] // max(model.face_arity, 1)
+    return triangles, triangle_faces.astype(np.int64)
 
 class Model:
+    # Incremented whenever any model's geometry changes, so scene-level caches can skip
+    # per-model version checks when nothing at all has been modified
+    global_version = 0
+
     def __init__(self, vertices, edges, faces=None):
-        self.vertices = vertices
-        self.edges = edges
-        self.faces = faces if faces is not None else []
+        # Geometry is kept in contiguous arrays: float32 (N, 3) vertices, int32 (E, 2) edges
+        # and int32 (F, K) faces where K is the face arity (4 for quads, 3 for triangles).
+        # The arrays may have spare capacity; the public properties expose only the used rows.
+        self._vertices = _as_rows(vertices, np.float32, 3)
+        self._edges = _as_rows(edges, np.int32, 2)
+        self._faces = _as_rows(faces if faces is not None else [], np.int32, 0)
+        self._num_vertices = len(self._vertices)
+        self._num_edges = len(self._edges)
+        self._num_faces = len(self._faces)
+        self.version = 0
+        self.topology_version = 0  # bumped only when edges or faces change
+        self._derived = {}
+        self.buffers = None
+        # Optional (F,) index of the source polygon of each face, set when an importer or
+        # normalize_model split or dropped faces; None means faces are the source polygons
+        self.face_map = None
+        # Callables invoked with the model after every geometry change (e.g. scene bounds)
+        self.listeners = []
+
+    # ---------------------------------------------
+    # Geometry arrays
+    # ---------------------------------------------
+    @property
+    def vertices(self):
+        return self._vertices[:self._num_vertices]
+
+    @vertices.setter
+    def vertices(self, vertices):
+        self._vertices = _as_rows(vertices, np.float32, 3)
+        self._num_vertices = len(self._vertices)
+        self.mark_modified(topology=False)
+
+    @property
+    def edges(self):
+        return self._edges[:self._num_edges]
+
+    @edges.setter
+    def edges(self, edges):
+        self._edges = _as_rows(edges, np.int32, 2)
+        self._num_edges = len(self._edges)
+        self.mark_modified()
+
+    @property
+    def faces(self):
+        return self._faces[:self._num_faces]
+
+    @faces.setter
+    def faces(self, faces):
+        self._faces = _as_rows(faces, np.int32, 0)
+        self._num_faces = len(self._faces)
+        self.face_map = None
+        self.mark_modified()
+
+    @property
+    def face_arity(self):
+        return self._faces.shape[1] if self._faces.ndim == 2 else 0
+
+    def mark_modified(self, topology=True):
+        # Call after editing the arrays in place so version-keyed caches are rebuilt;
+        # topology=False promises that only vertex positions changed
+        self.version += 1
+        if topology:
+            self.topology_version += 1
+        Model.global_version += 1
+        for listener in self.listeners:
+            listener(self)
+
+    def cached(self, key, build, topology_only=False, discard=None):
+        # Return build(self), memoized until the geometry version changes; with topology_only,
+        # until the edges or faces change (vertex-only edits keep the cached value).
+        # discard(old_value) runs when a stale value is replaced (e.g. to free its GPU buffers)
+        version = self.topology_version if topology_only else self.version
+        entry = self._derived.get(key)
+        if entry is None or entry[0] != version:
+            if entry is not None and discard is not None:
+                discard(entry[1])
+            entry = (version, build(self))
+            self._derived[key] = entry
+        return entry[1]
+
+    def seed_cache(self, key, value):
+        # Install precomputed derived data (e.g. from a mesh cache) for the current version
+        self._derived[key] = (self.version, value)
+
+    # ---------------------------------------------
+    # Derived geometry (cached per version)
+    # ---------------------------------------------
+    def face_normals(self):
+        return self.cached('face_normals', compute_face_normals)
+
+    def bounds(self):
+        # Axis-aligned (min, max) corners, or None for a model without vertices
+        return self.cached('bounds', compute_bounds)
+
+    def triangles(self):
+        # (T, 3) vertex indices and (T,) owning face index for every triangle of every face
+        return self.cached('triangles', compute_triangles)
+
+    def bvh(self):
+        # Built lazily on first pick and rebuilt after any geometry change
+        return self.cached('bvh', lambda model: MeshBVH(model.vertices, *model.triangles()))
+
+    def topology(self):
+        # CSR adjacency (vertex->face, edge->face, face->face); only depends on the faces
+        return self.cached('topology', MeshTopology.from_model, topology_only=True)
+
+    def source_faces(self, face_idx):
+        # All faces split from the same source polygon as face_idx (for highlighting)
+        if self.face_map is None:
+            return face_idx
+        return np.flatnonzero(self.face_map == self.face_map[face_idx])
+
+    def pick(self, origin, direction, max_t=np.inf):
+        """Closest face hit by the ray as (face_idx, t, barycentrics), or None."""
+        if self._num_faces == 0:
+            return None
+        return self.bvh().intersect(origin, direction, max_t)
+
+    # ---------------------------------------------
+    # Incremental construction
+    # ---------------------------------------------
+    def add_vertex(self, vertex):
+        return self.add_vertices([vertex])[0]
+
+    def add_vertices(self, vertices):
+        vertices = _as_rows(vertices, np.float32, 3)
+        start = self._num_vertices
+        self._vertices = _reserve(self._vertices, start, len(vertices))
+        self._vertices[start:start + len(vertices)] = vertices
+        self._num_vertices += len(vertices)
+        self.mark_modified(topology=False)
+        return np.arange(start, self._num_vertices)
+
+    def update_vertices(self, vertices, start=0):
+        # Overwrite positions in place (e.g. animation); buffers keep their index data
+        vertices = _as_rows(vertices, np.float32, 3)
+        if start < 0 or start + len(vertices) > self._num_vertices:
+            raise IndexError(f"vertex rows {start}..{start + len(vertices)} outside model with {self._num_vertices} vertices")
+        self._vertices[start:start + len(vertices)] = vertices
+        self.mark_modified(topology=False)
+
+    def add_edge(self, edge):
+        self.add_edges([edge])
+
+    def add_edges(self, edges):
+        edges = _as_rows(edges, np.int32, 2)
+        start = self._num_edges
+        self._edges = _reserve(self._edges, start, len(edges))
+        self._edges[start:start + len(edges)] = edges
+        self._num_edges += len(edges)
+        self.mark_modified()
 
     def add_face(self, face):
-        self.faces.append(face)
+        self.add_faces([face])
+
+    def add_faces(self, faces):
+        faces = _as_rows(faces, np.int32, 0)
+        if len(faces) == 0:
+            return
+        if self._num_faces == 0 and self.face_arity != faces.shape[1]:
+            # First face fixes the arity of the face array
+            self._faces = np.empty((0, faces.shape[1]), dtype=np.int32)
+        elif faces.shape[1] != self.face_arity:
+            raise ValueError(f"face has {faces.shape[1]} vertices, model faces have {self.face_arity}")
+        start = self._num_faces
+        self._faces = _reserve(self._faces, start, len(faces))
+        self._faces[start:start + len(faces)] = faces
+        if self.face_map is not None:
+            # Appended faces are their own source polygons, numbered after the existing ones
+            first = self.face_map.max() + 1 if len(self.face_map) else 0
+            self.face_map = np.concatenate([self.face_map, first + np.arange(len(faces))])
+        self._num_faces += len(faces)
+        self.mark_modified()
+
+    def compact(self):
+        # Drop spare capacity left over from incremental construction
+        if len(self._vertices) > self._num_vertices:
+            self._vertices = self.vertices.copy()
+        if len(self._edges) > self._num_edges:
+            self._edges = self.edges.copy()
+        if len(self._faces) > self._num_faces:
+            self._faces = self.faces.copy()
+
+    # ---------------------------------------------
+    # Rendering
+    # ---------------------------------------------
+    def gpu_buffers(self):
+        # Vertex/index buffers are created lazily on first draw (requires a current GL context)
+        if self.buffers is None:
+            self.buffers = MeshBuffers()
+        return self.buffers
+
+    def release_buffers(self):
+        # Free the GPU buffers of the model and of derived models drawn in its place (LOD
+        # levels); must be called with the owning GL context current
+        if self.buffers is not None:
+            self.buffers.release()
+            self.buffers = None
+        for _, value in self._derived.values():
+            if hasattr(value, 'release'):
+                value.release()
+
+    def face_colors(self, base_color, highlight_faces=None, highlight_color=None):
+        colors = np.empty((self._num_faces, 4), dtype=np.float32)
+        colors[:] = base_color
+        if highlight_faces:
+            highlight = np.fromiter(highlight_faces, dtype=np.int64)
+            colors[highlight[(highlight >= 0) & (highlight < self._num_faces)]] = highlight_color
+        return colors
 
     def render_faces(self, screen=None, highlight_faces=None):
         # Enable blending for transparency
         glEnable(GL_BLEND)
         glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        glColor4f(0.2, 0.6, 1.0, 0.3)  # Light blue, low opacity
-        glBegin(GL_QUADS)
-        for i, face in enumerate(self.faces):
-            if highlight_faces and i in highlight_faces:
-                glColor4f(1.0, 0.8, 0.2, 0.6)  # Highlight color, higher opacity
-            else:
-                glColor4f(0.2, 0.6, 1.0, 0.3)
-            for idx in face:
-                glVertex3fv(self.vertices[idx])
-        glEnd()
+        # Light blue, low opacity; highlighted faces in amber with higher opacity
+        colors = self.face_colors((0.2, 0.6, 1.0, 0.3), highlight_faces, (1.0, 0.8, 0.2, 0.6))
+        self.gpu_buffers().draw_faces(self, colors)
         glDisable(GL_BLEND)
 
-    def add_vertex(self, vertex):
-        self.vertices.append(vertex)
-
-    def add_edge(self, edge):
-        self.edges.append(edge)
-
     def render(self, screen=None, highlight_faces=None):
         self.render_faces(screen, highlight_faces)
         glColor3f(1.0, 1.0, 1.0)  # White color
-        glBegin(GL_LINES)
-        for edge in self.edges:
-            start, end = edge
-            glVertex3fv(self.vertices[start])
-            glVertex3fv(self.vertices[end])
-        glEnd()
+        self.gpu_buffers().draw_edges(self)
 
 # ---------------------------------------------
 # Polar coordinate class for creating models
@@ -84,30 +331,7 @@ def create_cube():
     ]
     return Model(vertices, edges, faces)
 
-def create_donut():
-    vertices = []
-    edges = []
-    faces = []
-    # Use polar coordinates to quickly create a low poly donut with 12 sides
-    num_sides = 12
-    for i in range(num_sides):
-        angle = 2 * np.pi * i / num_sides
-        for j in range(num_sides):
-            sub_angle = 2 * np.pi * j / num_sides
-            radius = 1.0 + 0.5 * np.cos(sub_angle)
-            z = 0.5 * np.sin(sub_angle)
-            x = radius * np.cos(angle)
-            y = radius * np.sin(angle)
-            vertices.append((x, y, z))
-            if i < num_sides - 1 and j < num_sides - 1:
-                # Create faces for the donut
-                idx1 = i * num_sides + j
-                idx2 = idx1 + 1
-                idx3 = (i + 1) * num_sides + j + 1
-                idx4 = (i + 1) * num_sides + j
-                faces.append([idx1, idx2, idx3, idx4])
-                edges.append((idx1, idx2))
-                edges.append((idx2, idx3))
-                edges.append((idx3, idx4))
-                edges.append((idx4, idx1))
-    
+def create_donut(rings=12, sides=12):
+    # Low poly torus; see models.generators for other shapes and resolutions
+    from models.generators import torus
+    return torus(1.0, 0.5, rings, sides)
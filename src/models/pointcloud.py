@@ -0,0 +1,320 @@
+import ctypes
+import json
+import os
+from collections import OrderedDict
+import numpy as np
+from OpenGL.GL import *
+from models.bvh import BVH, _morton_codes
+
+# ---------------------------------------------
+# Out-of-core point clouds
+# ---------------------------------------------
+# A cloud lives in a directory of memory-mapped arrays: positions (N, 3) float32, colors
+# (N, 4) uint8 and a chunk table. Points are stored in Morton order and cut into chunks of
+# at most CHUNK_POINTS, so each chunk is a compact region with its own bounding box. Inside
+# a chunk the points are shuffled, so any prefix of a chunk is a uniform random subsample:
+# drawing fewer points when zoomed out is just drawing a shorter prefix.
+#
+# Only the prefixes of visible chunks are uploaded to the GPU, under a fixed byte budget with
+# least-recently-used eviction; the file itself is paged in by the OS as chunks are read, so
+# clouds larger than RAM work. Build once with PointCloud.build, then PointCloud.open.
+CHUNK_POINTS = 1 << 16
+BUILD_BLOCK = 1 << 22              # points per pass block while building
+GPU_BUDGET = 256 << 20             # bytes of point buffers kept on the GPU
+UPLOAD_BUDGET = 32 << 20           # bytes uploaded per frame; the rest follows in later frames
+MIN_UPLOAD = 1024                  # smallest prefix uploaded for a chunk
+FORMAT_VERSION = 1
+
+_CHUNK_DTYPE = np.dtype([('start', '<i8'), ('count', '<i8'), ('lo', '<f4', (3,)), ('hi', '<f4', (3,))])
+_POINT_DTYPE = np.dtype([('position', '<f4', (3,)), ('color', 'u1', (4,))])
+
+def _as_rgba(colors):
+    # uint8 RGBA from uint8 RGB(A) or float [0, 1] RGB(A) rows
+    colors = np.asarray(colors)
+    if colors.dtype != np.uint8:
+        colors = (np.clip(colors, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+    if colors.shape[1] == 3:
+        colors = np.concatenate([colors, np.full((len(colors), 1), 255, dtype=np.uint8)], axis=1)
+    return colors
+
+class _ChunkCache:
+    """GPU buffers holding prefixes of chunks, evicted least recently used first."""
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.entries = OrderedDict()  # chunk -> (vbo, uploaded points, bytes, frame last used)
+        self.used = 0
+
+    def get(self, chunk, frame):
+        entry = self.entries.get(chunk)
+        if entry is None:
+            return None
+        self.entries.move_to_end(chunk)
+        self.entries[chunk] = entry[:3] + (frame,)
+        return entry
+
+    def make_room(self, nbytes, frame):
+        # Evict entries not drawn this frame until nbytes fit; False if they cannot
+        while self.used + nbytes > self.budget:
+            oldest = next(iter(self.entries), None)
+            if oldest is None or self.entries[oldest][3] == frame:
+                return False
+            self.discard(oldest)
+        return True
+
+    def put(self, chunk, points, frame):
+        entry = self.entries.pop(chunk, None)
+        vbo = entry[0] if entry is not None else glGenBuffers(1)
+        if entry is not None:
+            self.used -= entry[2]
+        glBindBuffer(GL_ARRAY_BUFFER, vbo)
+        glBufferData(GL_ARRAY_BUFFER, points.nbytes, points, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.entries[chunk] = (vbo, len(points), points.nbytes, frame)
+        self.used += points.nbytes
+        return self.entries[chunk]
+
+    def discard(self, chunk):
+        vbo, _, nbytes, _ = self.entries.pop(chunk)
+        glDeleteBuffers(1, [int(vbo)])
+        self.used -= nbytes
+
+    def release(self):
+        for chunk in list(self.entries):
+            self.discard(chunk)
+
+class PointCloud:
+    """Spatially chunked, memory-mapped points rendered as GL_POINTS.
+
+    Chunks outside the frustum are skipped; visible ones draw a prefix sized by their
+    projected area (points_per_pixel points per covered pixel). Picking returns the point
+    nearest along the ray among those within pick_angle radians of it.
+    """
+
+    def __init__(self, positions, colors, chunks, point_size=2.0, points_per_pixel=1.0,
+                 gpu_budget=GPU_BUDGET, upload_budget=UPLOAD_BUDGET, pick_angle=0.005):
+        self.positions = positions
+        self.colors = colors
+        self.chunks = chunks
+        self.point_size = point_size
+        self.points_per_pixel = points_per_pixel
+        self.upload_budget = upload_budget
+        self.pick_angle = pick_angle
+        self.version = 0
+        self.listeners = []
+        self.cache = _ChunkCache(gpu_budget)
+        self.frame = 0
+        self.incomplete = False   # some visible chunk was drawn with fewer points than wanted
+        self.stats = {'chunks': 0, 'points': 0, 'uploaded': 0}
+        self.lo = chunks['lo'].astype(np.float64)
+        self.hi = chunks['hi'].astype(np.float64)
+        self.bvh = BVH(self.lo, self.hi, leaf_size=4)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def bounds(self):
+        if not len(self.chunks):
+            return None
+        return self.lo.min(axis=0), self.hi.max(axis=0)
+
+    # ---------------------------------------------
+    # On-disk format
+    # ---------------------------------------------
+    @classmethod
+    def open(cls, directory, **options):
+        with open(os.path.join(directory, 'cloud.json')) as f:
+            header = json.load(f)
+        if header.get('version') != FORMAT_VERSION:
+            raise ValueError(f"unsupported point cloud version in {directory}")
+        positions = np.load(os.path.join(directory, 'positions.npy'), mmap_mode='r')
+        colors = np.load(os.path.join(directory, 'colors.npy'), mmap_mode='r')
+        chunks = np.load(os.path.join(directory, 'chunks.npy'))
+        return cls(positions, colors, chunks, **options)
+
+    @classmethod
+    def build(cls, directory, positions, colors=None, chunk_points=CHUNK_POINTS, block=BUILD_BLOCK, seed=0, **options):
+        """Write positions (any (N, 3) array, e.g. an np.memmap larger than RAM) and optional
+        colors into a chunked cloud in directory, then open it.
+
+        Three streaming passes of `block` points: bounds, Morton cell counts, and a scatter into
+        the output arrays in cell order; finally each chunk is shuffled in place.
+        """
+        count = len(positions)
+        os.makedirs(directory, exist_ok=True)
+        out_positions = np.lib.format.open_memmap(os.path.join(directory, 'positions.npy'), 'w+', np.float32, (count, 3))
+        out_colors = np.lib.format.open_memmap(os.path.join(directory, 'colors.npy'), 'w+', np.uint8, (count, 4))
+        blocks = [slice(start, min(start + block, count)) for start in range(0, count, block)]
+        lo = np.full(3, np.inf)
+        hi = np.full(3, -np.inf)
+        for rows in blocks:
+            points = np.asarray(positions[rows], dtype=np.float64)
+            lo = np.minimum(lo, points.min(axis=0))
+            hi = np.maximum(hi, points.max(axis=0))
+        # Cells small enough that a chunk spans a handful of them (at most 2**21 cells)
+        level = int(np.clip(np.ceil(np.log2(max(count * 8 / chunk_points, 1.0)) / 3.0), 0, 7))
+        shift = np.uint32(3 * (10 - level))
+        cell_counts = np.zeros(1 << (3 * level), dtype=np.int64)
+        for rows in blocks:
+            cells = _morton_codes(np.asarray(positions[rows], dtype=np.float64), lo, hi) >> shift
+            cell_counts += np.bincount(cells, minlength=len(cell_counts))
+        cursor = np.cumsum(cell_counts) - cell_counts
+        for rows in blocks:
+            points = np.asarray(positions[rows], dtype=np.float64)
+            # Same float64 input as the counting pass, so every point lands in its counted cell
+            cells = _morton_codes(points, lo, hi) >> shift
+            order = np.argsort(cells, kind='stable')
+            cells = cells[order]
+            # Rank of each point within its cell in this block, added to the cell's write cursor
+            first = np.concatenate(([True], cells[1:] != cells[:-1]))
+            run_start = np.maximum.accumulate(np.where(first, np.arange(len(cells)), 0))
+            target = cursor[cells] + (np.arange(len(cells)) - run_start)
+            out_positions[target] = points[order].astype(np.float32)
+            block_colors = _as_rgba(colors[rows]) if colors is not None else np.full((len(points), 4), 255, np.uint8)
+            out_colors[target] = block_colors[order]
+            cursor[cells[first]] += np.diff(np.append(np.flatnonzero(first), len(cells)))
+        starts = np.arange(0, count, chunk_points)
+        chunks = np.zeros(len(starts), dtype=_CHUNK_DTYPE)
+        chunks['start'] = starts
+        chunks['count'] = np.minimum(starts + chunk_points, count) - starts
+        rng = np.random.default_rng(seed)
+        for chunk in chunks:
+            rows = slice(chunk['start'], chunk['start'] + chunk['count'])
+            shuffle = rng.permutation(int(chunk['count']))
+            points = out_positions[rows][shuffle]
+            out_positions[rows] = points
+            out_colors[rows] = out_colors[rows][shuffle]
+            chunk['lo'] = points.min(axis=0)
+            chunk['hi'] = points.max(axis=0)
+        out_positions.flush()
+        out_colors.flush()
+        del out_positions, out_colors
+        np.save(os.path.join(directory, 'chunks.npy'), chunks)
+        with open(os.path.join(directory, 'cloud.json'), 'w') as f:
+            json.dump({'version': FORMAT_VERSION, 'points': count, 'chunk_points': chunk_points}, f)
+        return cls.open(directory, **options)
+
+    # ---------------------------------------------
+    # Level of detail
+    # ---------------------------------------------
+    def wanted_points(self, chunks, camera):
+        # Points to draw per chunk: covered pixels times density, capped by the chunk size
+        lo, hi = self.lo[chunks], self.hi[chunks]
+        corners = np.stack([np.where(np.array([i & 1, i & 2, i & 4], bool), hi, lo) for i in range(8)], axis=1)
+        window = camera.project(corners.reshape(-1, 3)).reshape(-1, 8, 3)
+        counts = self.chunks['count'][chunks]
+        # Boxes reaching behind the camera cover an unknown area: draw them in full
+        behind = np.any((window[:, :, 2] < 0) | (window[:, :, 2] > 1) | ~np.isfinite(window[:, :, 2]), axis=1)
+        extent = window[:, :, :2].max(axis=1) - window[:, :, :2].min(axis=1)
+        _, _, width, height = camera.viewport
+        area = np.minimum(extent[:, 0], width) * np.minimum(extent[:, 1], height)
+        wanted = np.ceil(np.maximum(area, 1.0) * self.points_per_pixel).astype(np.int64)
+        return np.where(behind, counts, np.minimum(wanted, counts))
+
+    # ---------------------------------------------
+    # Rendering
+    # ---------------------------------------------
+    def draw(self, camera, marked=()):
+        """Draw visible chunks; marked is a sequence of (point_idx, color) drawn enlarged."""
+        self.frame += 1
+        visible = self.bvh.query_frustum(camera.frustum_planes(), self.lo, self.hi)
+        wanted = self.wanted_points(visible, camera)
+        # Thin every chunk evenly when the view wants more than half the GPU budget, leaving
+        # room for power-of-two rounding of the uploaded prefixes
+        limit = self.cache.budget // (2 * _POINT_DTYPE.itemsize)
+        if wanted.sum() > limit:
+            wanted = np.maximum(wanted * limit // wanted.sum(), 1)
+        # Nearest chunks first, so the upload budget goes where detail is most visible
+        eye = np.linalg.inv(camera.view_matrix)[:3, 3]
+        nearest = np.argsort(np.linalg.norm((self.lo[visible] + self.hi[visible]) / 2.0 - eye, axis=1))
+        upload_left = self.upload_budget
+        self.incomplete = False
+        self.stats = {'chunks': 0, 'points': 0, 'uploaded': 0}
+        glPointSize(self.point_size)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        for i in nearest:
+            chunk, needed = int(visible[i]), int(wanted[i])
+            entry = self.cache.get(chunk, self.frame)
+            if entry is None or entry[1] < needed:
+                # Round prefixes up to powers of two so small zoom changes reuse the upload
+                size = min(int(self.chunks['count'][chunk]), max(MIN_UPLOAD, 1 << (needed - 1).bit_length()))
+                nbytes = size * _POINT_DTYPE.itemsize
+                if nbytes > upload_left:
+                    # Out of upload budget for this frame: refine in the next one
+                    self.incomplete = True
+                elif self.cache.make_room(nbytes - (entry[2] if entry else 0), self.frame):
+                    entry = self.cache.put(chunk, self._chunk_points(chunk, size), self.frame)
+                    upload_left -= nbytes
+                    self.stats['uploaded'] += size
+                if entry is None:
+                    continue
+            vbo, uploaded = entry[0], entry[1]
+            glBindBuffer(GL_ARRAY_BUFFER, vbo)
+            glVertexPointer(3, GL_FLOAT, _POINT_DTYPE.itemsize, None)
+            glColorPointer(4, GL_UNSIGNED_BYTE, _POINT_DTYPE.itemsize, ctypes.c_void_p(12))
+            count = min(needed, uploaded)
+            glDrawArrays(GL_POINTS, 0, count)
+            self.stats['chunks'] += 1
+            self.stats['points'] += count
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        if marked:
+            # Picked points as larger dots, from client-side arrays
+            points = np.ascontiguousarray(self.positions[[point for point, _ in marked]], dtype=np.float32)
+            colors = np.array([color for _, color in marked], dtype=np.float32)
+            glPointSize(self.point_size * 4.0)
+            glVertexPointer(3, GL_FLOAT, 0, points)
+            glColorPointer(4, GL_FLOAT, 0, colors)
+            glDrawArrays(GL_POINTS, 0, len(points))
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glPointSize(1.0)
+
+    def _chunk_points(self, chunk, size):
+        start = int(self.chunks['start'][chunk])
+        points = np.empty(size, dtype=_POINT_DTYPE)
+        points['position'] = self.positions[start:start + size]
+        points['color'] = self.colors[start:start + size]
+        return points
+
+    def render(self, screen=None):
+        # Points have no wireframe; they are drawn in the viewer's face pass (draw)
+        pass
+
+    def release(self):
+        # Must be called with the owning GL context current
+        self.cache.release()
+
+    # ---------------------------------------------
+    # Picking
+    # ---------------------------------------------
+    def pick(self, origin, direction, max_t=np.inf):
+        """Nearest point within pick_angle of the ray as (point_idx, t, None), or None."""
+        if not len(self.chunks):
+            return None
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+        tolerance = np.tan(self.pick_angle)
+        # Cone test against each chunk's bounding sphere
+        center = (self.lo + self.hi) / 2.0
+        radius = np.linalg.norm(self.hi - self.lo, axis=1) / 2.0
+        along = (center - origin) @ direction
+        off_ray = np.linalg.norm(center - origin - along[:, None] * direction, axis=1)
+        reach = radius + np.maximum(along + radius, 0.0) * tolerance
+        entry = np.maximum(along - radius, 0.0)
+        candidates = np.flatnonzero((off_ray <= reach) & (along + radius > 0) & (entry < max_t))
+        candidates = candidates[np.argsort(entry[candidates])]
+        best = None
+        for chunk in candidates:
+            if entry[chunk] >= max_t:
+                break
+            start, count = int(self.chunks['start'][chunk]), int(self.chunks['count'][chunk])
+            points = np.asarray(self.positions[start:start + count], dtype=np.float64) - origin
+            t = points @ direction
+            distance = np.linalg.norm(points - t[:, None] * direction, axis=1)
+            hit = np.flatnonzero((t > 0) & (t < max_t) & (distance <= t * tolerance))
+            if len(hit):
+                nearest = hit[np.argmin(t[hit])]
+                best = (start + int(nearest), float(t[nearest]), None)
+                max_t = float(t[nearest])
+        return best
@@ -0,0 +1,121 @@
+import numpy as np
+from models.model import Model, derive_edges
+
+# ---------------------------------------------
+# Mesh normalization: bulk triangulation, vertex welding and edge derivation
+# ---------------------------------------------
+# Imported meshes often carry duplicated corners (one copy per face in STL or per-face
+# exports), mixed polygon arities and hand-made edge lists that repeat face boundaries.
+# These helpers work on whole index arrays at once; no step loops over faces in Python.
+#
+# When faces are split or dropped, the result keeps a face map: entry i is the index of the
+# original polygon that face i came from, so picks and highlights can refer to source faces.
+
+def triangulate_polygons(indices, counts):
+    """Fan-triangulate polygons given as flat vertex indices plus per-polygon counts.
+
+    Returns (T, 3) int32 triangles and the (T,) int64 polygon index of each triangle.
+    Polygons with fewer than three corners produce no triangles.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    indices = np.asarray(indices)
+    starts = np.cumsum(counts) - counts
+    tris_per_face = np.maximum(counts - 2, 0)
+    face_map = np.repeat(np.arange(len(counts)), tris_per_face)
+    k = np.arange(len(face_map)) - np.repeat(np.cumsum(tris_per_face) - tris_per_face, tris_per_face)
+    base = starts[face_map]
+    triangles = np.stack([indices[base], indices[base + k + 1], indices[base + k + 2]], axis=1)
+    return triangles.astype(np.int32), face_map
+
+def triangulate_faces(faces):
+    # (F, K) faces as (F * (K - 2), 3) fan triangles plus their face map
+    faces = np.asarray(faces)
+    if faces.ndim != 2 or faces.shape[1] < 3:
+        return np.empty((0, 3), dtype=np.int32), np.empty(0, dtype=np.int64)
+    return triangulate_polygons(faces.ravel(), np.full(len(faces), faces.shape[1]))
+
+def face_edges(faces, face_map=None):
+    """Unique undirected boundary edges of (F, K) faces as (E, 2) int32.
+
+    With a face map, an edge shared by two faces of the same source polygon is a diagonal
+    added by triangulation and is left out, so the edges outline the original polygons.
+    """
+    faces = np.asarray(faces)
+    if face_map is None or faces.ndim != 2 or faces.size == 0:
+        return derive_edges(faces)
+    pairs = np.stack([faces, np.roll(faces, -1, axis=1)], axis=2).reshape(-1, 2).astype(np.int64)
+    pairs.sort(axis=1)
+    keys = (pairs[:, 0] << 32) | pairs[:, 1]
+    sources = np.repeat(np.asarray(face_map, dtype=np.int64), faces.shape[1])
+    order = np.lexsort((sources, keys))
+    keys, sources = keys[order], sources[order]
+    # Runs of equal (edge, source) longer than one are interior to a polygon
+    same = (keys[1:] == keys[:-1]) & (sources[1:] == sources[:-1])
+    interior = np.zeros(len(keys), dtype=bool)
+    interior[1:] |= same
+    interior[:-1] |= same
+    keys = keys[~interior]
+    keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+    return np.stack([keys >> 32, keys & 0xFFFFFFFF], axis=1).astype(np.int32)
+
+def weld_vertices(vertices, tolerance=0.0):
+    """Merge duplicate vertices; returns (unique_vertices, remap) with remap[old] = new.
+
+    tolerance=0 merges bit-identical positions (with -0.0 equal to 0.0). A positive tolerance
+    snaps positions to a grid of that spacing and merges vertices in the same cell, which
+    joins seams written with slightly different rounding. Each merged vertex keeps the
+    position of its first occurrence, and unique vertices stay in first-occurrence order.
+    """
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 3)
+    if not len(vertices):
+        return vertices.copy(), np.empty(0, dtype=np.int32)
+    if tolerance > 0:
+        keys = np.floor(vertices / np.float32(tolerance) + 0.5).astype(np.int64)
+    else:
+        # Adding 0.0 folds -0.0 into 0.0 so comparing the raw bits is exact
+        keys = (vertices + np.float32(0.0)).view(np.uint32)
+    # Stable sort: within a run of equal keys the lowest original index comes first
+    order = np.lexsort((keys[:, 2], keys[:, 1], keys[:, 0]))
+    ordered = keys[order]
+    first = np.concatenate(([True], np.any(ordered[1:] != ordered[:-1], axis=1)))
+    group = np.cumsum(first) - 1
+    representative = order[first]
+    # Renumber groups by their first occurrence so vertex order survives the weld
+    rank = np.empty(len(representative), dtype=np.int64)
+    by_position = np.argsort(representative, kind='stable')
+    rank[by_position] = np.arange(len(representative))
+    remap = np.empty(len(vertices), dtype=np.int32)
+    remap[order] = rank[group]
+    return vertices[representative[by_position]], remap
+
+def distinct_corners(faces):
+    # Number of distinct vertex indices in each face row
+    faces = np.sort(np.asarray(faces), axis=1)
+    return 1 + np.count_nonzero(faces[:, 1:] != faces[:, :-1], axis=1)
+
+def normalize_model(model, tolerance=0.0, triangulate=False):
+    """Welded copy of model with collapsed faces removed and edges derived from the faces.
+
+    Hand-made edges are kept (remapped and deduplicated) alongside the face boundaries.
+    With triangulate=True, faces are split into fan triangles. The returned model's
+    face_map points back to faces of the input model (through the input's own face_map,
+    if it had one), or is None when every face was kept as is.
+    """
+    vertices, remap = weld_vertices(model.vertices, tolerance)
+    faces = remap[model.faces] if len(model.faces) else np.empty((0, 3), dtype=np.int32)
+    face_map = np.flatnonzero(distinct_corners(faces) >= 3) if len(faces) else np.empty(0, dtype=np.int64)
+    faces = faces[face_map]
+    # Edge set: polygon boundaries (derived before triangulation adds diagonals) plus hand-made edges
+    sources = model.face_map[face_map] if model.face_map is not None else None
+    edges = remap[model.edges]
+    edges = derive_edges(np.concatenate([face_edges(faces, sources), edges[edges[:, 0] != edges[:, 1]]]))
+    if triangulate and faces.shape[1] > 3:
+        faces, triangle_map = triangulate_faces(faces)
+        keep = distinct_corners(faces) == 3
+        faces, face_map = faces[keep], face_map[triangle_map[keep]]
+    result = Model(vertices, edges, faces)
+    if model.face_map is not None:
+        result.face_map = model.face_map[face_map]
+    elif not np.array_equal(face_map, np.arange(len(model.faces))):
+        result.face_map = face_map
+    return result
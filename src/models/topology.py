@@ -0,0 +1,286 @@
+import numpy as np
+
+# ---------------------------------------------
+# Mesh adjacency in compressed sparse row (CSR) form
+# ---------------------------------------------
+# Every relation is a pair of arrays: offsets of length N + 1 and a flat payload, so the
+# entries of item i are payload[offsets[i]:offsets[i + 1]]. All of it is built with sorts
+# and cumulative sums over the face array; no step loops over faces in Python.
+#
+#     topology = model.topology()
+#     region = topology.connected_faces(face_idx)
+#     outline = topology.boundary_edges()
+#
+# Region queries label the components of the face graph once (vectorized union-find) and
+# then select by label, so a click costs a comparison over the faces rather than a traversal.
+
+def csr_rows(offsets, payload, rows):
+    # Concatenated entries of the given rows (flat gather over their CSR ranges)
+    rows = np.asarray(rows, dtype=np.int64).ravel()
+    starts, counts = offsets[rows], offsets[rows + 1] - offsets[rows]
+    run_starts = np.cumsum(counts) - counts
+    index = np.arange(counts.sum()) - np.repeat(run_starts - starts, counts)
+    return payload[index]
+
+def connected_labels(num, a, b):
+    """Component label (smallest member index) of each of num nodes joined by edges (a, b).
+
+    Hook-and-compress union-find over arrays: every pass points the larger root of each
+    uncollapsed edge at the smaller one, then pointer-jumps until every node points at its
+    root. Pointers only decrease, so the forest never has cycles; edges whose endpoints
+    already share a root are dropped, so passes get cheaper as components merge.
+    """
+    labels = np.arange(num, dtype=np.int64)
+    a, b = np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64)
+    while len(a):
+        la, lb = labels[a], labels[b]
+        open_ = la != lb
+        if not open_.any():
+            break
+        a, b, la, lb = a[open_], b[open_], la[open_], lb[open_]
+        # Duplicate roots keep one of their writes; the rest are retried on the next pass
+        labels[np.maximum(la, lb)] = np.minimum(la, lb)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+    return labels
+
+class MeshTopology:
+    """Vertex->face, edge->face and face->face adjacency of an (F, K) face array.
+
+    Edges are the unique undirected face sides, in the same sorted order as derive_edges;
+    edge i connects vertices edges[i] and face_edges[f, j] is the edge of the side from
+    corner j to corner j + 1 of face f (-1 for a collapsed side). Two faces are neighbors
+    when they share an edge; neighbor_edges gives that edge for every face->face entry.
+    """
+
+    def __init__(self, faces, num_vertices):
+        faces = np.asarray(faces, dtype=np.int32)
+        if faces.ndim != 2:
+            faces = faces.reshape(0, 3)
+        self.num_faces, arity = faces.shape
+        self.num_vertices = int(num_vertices)
+        num_sides = self.num_faces * arity
+        corners = faces.ravel()
+        # Order within a vertex, edge or face row is unspecified, so unstable sorts will do
+        order = np.argsort(corners)
+        self.vertex_offsets = np.zeros(self.num_vertices + 1, dtype=np.int64)
+        np.cumsum(np.bincount(corners, minlength=self.num_vertices), out=self.vertex_offsets[1:])
+        self.vertex_faces = (order // max(arity, 1)).astype(np.int32)
+
+        # Face sides as (low << 32 | high) keys grouped by edge; collapsed sides are not edges
+        ends = np.roll(faces, -1, axis=1)
+        low = np.minimum(faces, ends).ravel().astype(np.int64)
+        high = np.maximum(faces, ends).ravel().astype(np.int64)
+        sides = np.flatnonzero(low != high)
+        keys = (low[sides] << 32) | high[sides]
+        order = np.argsort(keys)
+        keys, sides = keys[order], sides[order]
+        first = np.concatenate(([True], keys[1:] != keys[:-1])) if len(keys) else np.empty(0, dtype=bool)
+        starts = np.flatnonzero(first)
+        side_edge = (np.cumsum(first) - 1).astype(np.int32)
+        self.edges = np.stack([keys[starts] >> 32, keys[starts] & 0xFFFFFFFF], axis=1).astype(np.int32)
+        self.edge_offsets = np.append(starts, len(keys)).astype(np.int64)
+        self.edge_faces = (sides // max(arity, 1)).astype(np.int32)
+        self.face_edges = np.full(num_sides, -1, dtype=np.int32)
+        self.face_edges[sides] = side_edge
+        self.face_edges = self.face_edges.reshape(faces.shape)
+        # First two faces of every edge; -1 in the second column for boundary edges
+        counts = np.diff(self.edge_offsets)
+        second = np.minimum(starts + 1, max(len(keys) - 1, 0))
+        self.edge_pairs = np.stack([self.edge_faces[starts], np.where(counts > 1, self.edge_faces[second], -1)], axis=1)
+
+        # Every face side links to each other side of the same edge; links are scattered
+        # into face order, where the sides of each face are adjacent
+        manifold = counts.max(initial=0) <= 2
+        if manifold:
+            # Manifold: the two sides of a shared edge are consecutive
+            src = starts[counts == 2]
+            src, dst = np.concatenate([src, src + 1]), np.concatenate([src + 1, src])
+        else:
+            partners = np.repeat(counts - 1, counts)
+            src = np.repeat(np.arange(len(keys)), partners)
+            step = np.arange(len(src)) - np.repeat(np.cumsum(partners) - partners, partners) + 1
+            edge = side_edge[src]
+            dst = starts[edge] + (src - starts[edge] + step) % counts[edge]
+        a, b = self.edge_faces[src], self.edge_faces[dst]
+        keep = a != b
+        src, a, b = src[keep], a[keep], b[keep]
+        edge = side_edge[src]
+        owner = sides[src]
+        if manifold:
+            # At most one link per side: its slot is the number of linked sides before it
+            linked = np.zeros(num_sides, dtype=bool)
+            linked[owner] = True
+            slots = (np.cumsum(linked) - 1)[owner]
+        else:
+            slots = np.empty(len(owner), dtype=np.int64)
+            slots[np.argsort(owner, kind='stable')] = np.arange(len(owner))
+        self.face_offsets = np.zeros(self.num_faces + 1, dtype=np.int64)
+        np.cumsum(np.bincount(a, minlength=self.num_faces), out=self.face_offsets[1:])
+        self.face_neighbors = np.empty(len(slots), dtype=np.int32)
+        self.face_neighbors[slots] = b
+        self.neighbor_edges = np.empty(len(slots), dtype=np.int32)
+        self.neighbor_edges[slots] = edge
+        # Each shared edge as one undirected face link, for unions over the face graph
+        once = a < b
+        self.links = np.stack([a[once], b[once]], axis=1)
+        self.link_edges = edge[once]
+        self._labels = None
+
+    @classmethod
+    def from_model(cls, model):
+        return cls(model.faces, len(model.vertices))
+
+    # ---------------------------------------------
+    # Adjacency lookups
+    # ---------------------------------------------
+    def faces_of_vertices(self, vertices):
+        # Unique faces using any of the vertices; vertices added after the build are unused
+        vertices = np.asarray(vertices, dtype=np.int64).ravel()
+        return np.unique(csr_rows(self.vertex_offsets, self.vertex_faces, vertices[vertices < self.num_vertices]))
+
+    def faces_of_edges(self, edges):
+        # Unique faces using any of the edges (edge ids)
+        return np.unique(csr_rows(self.edge_offsets, self.edge_faces, edges))
+
+    def neighbors(self, faces):
+        # Unique faces sharing an edge with any of the faces (may include the faces themselves)
+        return np.unique(csr_rows(self.face_offsets, self.face_neighbors, faces))
+
+    def edge_face_counts(self):
+        # Faces incident to each edge: 1 on open boundaries, 2 on manifold interior edges
+        return np.diff(self.edge_offsets)
+
+    # ---------------------------------------------
+    # Region selection
+    # ---------------------------------------------
+    def component_labels(self, edge_mask=None):
+        """Component label of each face; with edge_mask (E,) bool, faces only connect across
+        edges where it is True. Unmasked labels are computed once and reused."""
+        if edge_mask is None and self._labels is not None:
+            return self._labels
+        links = self.links if edge_mask is None else self.links[edge_mask[self.link_edges]]
+        labels = connected_labels(self.num_faces, links[:, 0], links[:, 1])
+        if edge_mask is None:
+            self._labels = labels
+        return labels
+
+    def connected_faces(self, seeds, edge_mask=None):
+        """Faces reachable from the seed faces through shared edges (flood fill), sorted."""
+        labels = self.component_labels(edge_mask)
+        return np.flatnonzero(np.isin(labels, labels[np.asarray(seeds, dtype=np.int64)]))
+
+    def patch_faces(self, seeds, inside):
+        """Flood fill from the seed faces that only enters faces where inside (F,) bool is
+        True, sorted. The union runs over the links of those faces only, so small patches
+        cost little regardless of the mesh size."""
+        seeds = np.asarray(seeds, dtype=np.int64).ravel()
+        inside = inside.copy()
+        inside[seeds] = True
+        members = np.flatnonzero(inside)
+        local = np.full(self.num_faces, -1, dtype=np.int64)
+        local[members] = np.arange(len(members))
+        counts = self.face_offsets[members + 1] - self.face_offsets[members]
+        owners = np.repeat(local[members], counts)
+        others = local[csr_rows(self.face_offsets, self.face_neighbors, members)]
+        keep = owners < others
+        labels = connected_labels(len(members), owners[keep], others[keep])
+        return members[np.isin(labels, labels[local[seeds]])]
+
+    def coplanar_faces(self, seeds, normals, angle=1.0):
+        """Connected faces whose normals lie within angle degrees of the first seed's normal."""
+        seeds = np.asarray(seeds, dtype=np.int64).ravel()
+        inside = normals @ normals[seeds[0]] >= np.cos(np.radians(angle))
+        # A component that is flat as a whole (e.g. a plane) needs no union of its own
+        component = self.component_labels() == self.component_labels()[seeds[0]]
+        if inside[component].all():
+            return np.flatnonzero(component)
+        return self.patch_faces(seeds, inside)
+
+    def smooth_faces(self, seeds, cosines, angle=30.0):
+        # Flood fill that stops at crease edges sharper than angle degrees
+        return self.connected_faces(seeds, ~self.crease_mask(cosines, angle))
+
+    def grow(self, faces, rings=1):
+        # Selection extended by rings of edge neighbors
+        faces = np.unique(np.asarray(faces, dtype=np.int64))
+        for _ in range(rings):
+            faces = np.union1d(faces, self.neighbors(faces))
+        return faces
+
+    # ---------------------------------------------
+    # Feature edges (as edge masks, or (N, 2) int32 vertex pairs like Model.edges)
+    # ---------------------------------------------
+    def boundary_mask(self):
+        # Edges used by exactly one face
+        return self.edge_pairs[:, 1] < 0
+
+    def nonmanifold_mask(self):
+        # Edges shared by more than two faces
+        return self.edge_face_counts() > 2
+
+    def edge_cosines(self, normals):
+        # Cosine of the angle between the first two faces of each edge (1 on boundary edges)
+        first, second = self.edge_pairs[:, 0], self.edge_pairs[:, 1]
+        cosines = np.einsum('ij,ij->i', normals[first], normals[second])
+        cosines[second < 0] = 1.0
+        return cosines
+
+    def crease_mask(self, cosines, angle=30.0):
+        """Edges whose faces meet at more than angle degrees, given edge_cosines(normals).
+        Non-manifold edges count as creases; boundary edges do not."""
+        return (cosines < np.cos(np.radians(angle))) | self.nonmanifold_mask()
+
+    def boundary_edges(self):
+        return self.edges[self.boundary_mask()]
+
+    def crease_edges(self, cosines, angle=30.0):
+        return self.edges[self.crease_mask(cosines, angle)]
+
+    def region_boundary(self, faces):
+        """Outline of a face selection: edges between a selected and an unselected face,
+        plus open boundary edges of selected faces."""
+        sides = self.face_edges[np.asarray(faces, dtype=np.int64)].ravel()
+        edges, inside = np.unique(sides[sides >= 0], return_counts=True)
+        counts = self.edge_face_counts()[edges]
+        return self.edges[edges[(inside < counts) | (counts == 1)]]
+
+# ---------------------------------------------
+# Model-level queries, cached until the model's geometry changes
+# ---------------------------------------------
+SELECT_MODES = ('face', 'connected', 'coplanar', 'smooth')
+COPLANAR_ANGLE = 1.0
+CREASE_ANGLE = 30.0
+
+def edge_cosines(model):
+    return model.cached('edge_cosines', lambda m: m.topology().edge_cosines(m.face_normals()))
+
+def select_faces(model, seeds, mode='connected', angle=None):
+    """Sorted faces of the region of model around the seed faces.
+
+    mode is 'face' (the seeds themselves), 'connected' (everything reachable through shared
+    edges), 'coplanar' (connected faces within angle degrees of the first seed's normal) or
+    'smooth' (connected faces not separated by a crease sharper than angle degrees).
+    """
+    seeds = np.unique(np.asarray(seeds, dtype=np.int64).ravel())
+    if mode == 'face' or not len(seeds):
+        return seeds
+    topology = model.topology()
+    if mode == 'connected':
+        return topology.connected_faces(seeds)
+    if mode == 'coplanar':
+        return topology.coplanar_faces(seeds, model.face_normals(), COPLANAR_ANGLE if angle is None else angle)
+    if mode == 'smooth':
+        angle = CREASE_ANGLE if angle is None else float(angle)
+        # Labels per crease angle, so later clicks on the same model only compare labels
+        labels = model.cached(('smooth_labels', angle), lambda m: topology.component_labels(~topology.crease_mask(edge_cosines(m), angle)))
+        return np.flatnonzero(np.isin(labels, labels[seeds]))
+    raise ValueError(f"unknown selection mode '{mode}', expected one of {SELECT_MODES}")
+
+def feature_edges(model, angle=CREASE_ANGLE):
+    # (N, 2) int32 boundary, crease and non-manifold edges of model
+    topology = model.topology()
+    return topology.edges[topology.boundary_mask() | topology.crease_mask(edge_cosines(model), angle)]
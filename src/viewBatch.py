@@ -0,0 +1,227 @@
+"""Batch offscreen snapshots (thumbnails, turntables) rendered across a process pool.
+
+Each worker process owns one headless GL context and renders every requested view of the
+assets it is handed to PNG files; within a worker the next mesh is loaded and finished frames
+are encoded on background threads while the GL thread renders:
+
+    python src/viewBatch.py assets/*.obj --views iso,front,turntable:12 --size 256x256 --out thumbs
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import viewOffscreen
+
+# ---------------------------------------------
+# Camera presets
+# ---------------------------------------------
+# Each view is (mode, rot_x, rot_y); every view is fitted to the model and centered on it.
+# 'iso' matches ViewControl.reset_isometric_view.
+PRESETS = {
+    'iso': ('perspective', 35.264, 45.0),
+    'iso_ortho': ('orthogonal', 35.264, 45.0),
+    'perspective': ('perspective', 20.0, 30.0),
+    'front': ('orthogonal', 0.0, 0.0),
+    'side': ('orthogonal', 0.0, -90.0),
+    'top': ('orthogonal', 90.0, 0.0),
+}
+TURNTABLE_TILT = 20.0
+
+def parse_views(spec):
+    """[(label, (mode, rot_x, rot_y))] for a comma-separated list of preset names, where
+    turntable:N expands to N perspective views evenly spaced around the Y axis."""
+    views = []
+    for name in spec.split(','):
+        name = name.strip()
+        if name.startswith('turntable'):
+            steps = int(name.partition(':')[2] or 8)
+            views += [(f"turntable{i:03d}", ('perspective', TURNTABLE_TILT, 360.0 * i / steps)) for i in range(steps)]
+        elif name in PRESETS:
+            views.append((name, PRESETS[name]))
+        else:
+            raise ValueError(f"unknown view preset '{name}', expected one of {sorted(PRESETS)} or turntable:N")
+    return views
+
+# ---------------------------------------------
+# PNG encoding (zlib releases the GIL, so encoding overlaps rendering)
+# ---------------------------------------------
+def _png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+def encode_png(image, level=6):
+    # (H, W, 3) uint8 RGB, one filter byte (none) per row
+    height, width, _ = image.shape
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 1:] = image.reshape(height, -1)
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + _png_chunk(b'IHDR', header)
+            + _png_chunk(b'IDAT', zlib.compress(rows.tobytes(), level)) + _png_chunk(b'IEND', b''))
+
+def write_png(path, image):
+    with open(path, 'wb') as f:
+        f.write(encode_png(image))
+
+# ---------------------------------------------
+# Worker process: one viewer (GL context) per process
+# ---------------------------------------------
+_viewer = None
+
+def _init_worker(width, height, backend, threads_per_worker):
+    global _viewer
+    # Software GL spawns its own raster threads; one per worker avoids oversubscribing cores
+    if threads_per_worker:
+        os.environ.setdefault('LP_NUM_THREADS', str(threads_per_worker))
+    backend = viewOffscreen.use_platform(backend)
+    from viewRender import ViewRender
+    _viewer = ViewRender(width, height, headless=True, backend=backend)
+
+def _load(source):
+    # Runs on the worker's loader thread: no GL calls
+    from models.importers import load_mesh
+    from models.pointcloud import PointCloud
+    if not isinstance(source, str):
+        return source
+    if os.path.isdir(source):
+        return PointCloud.open(source)
+    return load_mesh(source)
+
+def apply_view(viewer, model, view):
+    """Fit the camera to model for a (mode, rot_x, rot_y) view, centered on the model."""
+    from viewCamera import rotation_matrix
+    mode, rot_x, rot_y = view
+    vc = viewer.view_control
+    # Perspective first: the orthographic fit is derived from the perspective distance
+    vc.view_mode = 'perspective'
+    viewer.reset_view()
+    if mode == 'orthogonal':
+        vc.toggle_view_mode()
+        viewer.get_render_mode().normalize_view()
+    viewer.last_view_mode = vc.view_mode
+    vc.rot_x, vc.rot_y = rot_x, rot_y
+    bounds = model.bounds()
+    if bounds is not None:
+        center = (rotation_matrix(rot_x, 0) @ rotation_matrix(rot_y, 1))[:3, :3] @ ((bounds[0] + bounds[1]) / 2.0)
+        vc.pan_x, vc.pan_y = -center[0], -center[1]
+        if mode == 'perspective':
+            vc.zoom -= center[2]
+    vc.dirty = True
+
+def _render_batch(task):
+    # One task is a short list of assets; the next asset loads while the current one renders
+    # and each frame is encoded while the next view renders
+    items, views, out_dir = task
+    results = []
+    with ThreadPoolExecutor(1) as loader, ThreadPoolExecutor(1) as encoder:
+        pending = loader.submit(_load, items[0][1]) if items else None
+        writes = []
+        for i, (name, source) in enumerate(items):
+            try:
+                start = time.perf_counter()
+                model = pending.result()
+                load_s = time.perf_counter() - start
+            except Exception as exc:
+                model, load_s = None, 0.0
+                results.append({'source': str(source), 'view': None, 'path': None, 'error': repr(exc)})
+            pending = loader.submit(_load, items[i + 1][1]) if i + 1 < len(items) else None
+            if model is None:
+                continue
+            # A failing view ends this asset with an error result; the batch goes on
+            label = None
+            _viewer.clear_models()
+            try:
+                _viewer.add_model(model, normalize=False)
+                for label, view in views:
+                    start = time.perf_counter()
+                    apply_view(_viewer, model, view)
+                    _viewer.render()
+                    while _viewer.models_dirty:
+                        # Point clouds page their chunks in over several frames
+                        _viewer.render()
+                    image = _viewer.snapshot()
+                    path = os.path.join(out_dir, f"{name}_{label}.png")
+                    result = {'source': str(source), 'view': label, 'path': path, 'load_s': load_s,
+                              'render_ms': (time.perf_counter() - start) * 1000.0, 'error': None}
+                    writes.append((result, encoder.submit(write_png, path, image)))
+                    results.append(result)
+                    load_s = 0.0
+            except Exception as exc:
+                results.append({'source': str(source), 'view': label, 'path': None, 'error': repr(exc)})
+            finally:
+                _viewer.clear_models()
+        # An image that failed to encode or write turns its own result into an error
+        for result, write in writes:
+            try:
+                write.result()
+            except Exception as exc:
+                result.update(path=None, error=repr(exc))
+    return results
+
+# ---------------------------------------------
+# Public API
+# ---------------------------------------------
+def asset_names(sources):
+    # File stems (or model0, model1, ... for in-memory models), made unique with an index
+    names = [os.path.splitext(os.path.basename(os.path.normpath(s)))[0] if isinstance(s, str) else f"model{i}"
+             for i, s in enumerate(sources)]
+    seen = {}
+    for name in names:
+        seen[name] = seen.get(name, 0) + 1
+    return [f"{name}_{i}" if seen[name] > 1 else name for i, name in enumerate(names)]
+
+def render_batch(sources, views='iso', out_dir='.', size=(256, 256), workers=None, backend=None, batch=4):
+    """Render every view of every source (mesh path, point cloud directory or picklable
+    Model) to out_dir/<name>_<view>.png; returns one result dict per image or failed asset.
+
+    Assets are handed to `workers` processes (default: one per core) in batches of `batch`.
+    """
+    if isinstance(views, str):
+        views = parse_views(views)
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+    items = list(zip(asset_names(sources), sources))
+    tasks = [(items[i:i + batch], views, out_dir) for i in range(0, len(items), batch)]
+    if not tasks:
+        return []
+    # Spawned workers start without any inherited GL state
+    context = multiprocessing.get_context('spawn')
+    initargs = (size[0], size[1], backend, 1 if workers > 1 else None)
+    with context.Pool(min(workers, len(tasks)), _init_worker, initargs) as pool:
+        return [result for results in pool.imap_unordered(_render_batch, tasks) for result in results]
+
+# ---------------------------------------------
+# Command line entry point
+# ---------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sources', nargs='+', help='mesh files (OBJ, PLY, STL) or point cloud directories')
+    parser.add_argument('--views', default='iso', help=f"comma-separated presets: {', '.join(PRESETS)}, turntable:N")
+    parser.add_argument('--size', default='256x256', help='image size as WIDTHxHEIGHT')
+    parser.add_argument('--out', default='snapshots')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per core)')
+    parser.add_argument('--batch', type=int, default=4, help='assets handed to a worker at a time')
+    parser.add_argument('--backend', choices=('egl', 'osmesa'), default=None)
+    parser.add_argument('--json', help='write per-image results to this file')
+    args = parser.parse_args(argv)
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    start = time.perf_counter()
+    results = render_batch(args.sources, args.views, args.out, (width, height), args.workers, args.backend, args.batch)
+    elapsed = time.perf_counter() - start
+    images = sum(1 for r in results if r['error'] is None)
+    for r in results:
+        if r['error'] is not None:
+            print(f"failed: {r['source']}: {r['error']}", file=sys.stderr)
+    print(f"{images} images from {len(args.sources)} assets in {elapsed:.2f} s ({images / elapsed:.1f} images/s)")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+if __name__ == '__main__':
+    main()
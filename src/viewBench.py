@@ -0,0 +1,167 @@
+"""Headless frame-time benchmark for the viewer.
+
+Builds synthetic scenes (separate cubes, the same cubes instanced, a dense torus, a triangle
+soup) at several sizes, drives a scripted orbit through ViewControl and reports frame latency
+percentiles, picking latency, build time and peak memory:
+
+    python src/viewBench.py --scenes cubes,torus,soup --sizes 1000,100000,1000000 --json bench.json
+"""
+import argparse
+import json
+import resource
+import sys
+import time
+import numpy as np
+import viewOffscreen
+
+if __name__ == '__main__':
+    # The headless platform (--backend) must be selected before OpenGL is first imported below
+    _platform = argparse.ArgumentParser(add_help=False)
+    _platform.add_argument('--backend', choices=viewOffscreen.BACKENDS, default=None)
+    viewOffscreen.use_platform(_platform.parse_known_args()[0].backend)
+
+from models.model import Model, create_cube
+from models.generators import torus
+from models.instancing import InstancedModel
+from viewRender import ViewRender
+
+# ---------------------------------------------
+# Synthetic scenes (each returns a list of Models with roughly `faces` faces in total)
+# ---------------------------------------------
+def build_cubes(faces):
+    # Many small models on a grid: stresses per-model overhead and culling
+    count = max(faces // 6, 1)
+    side = int(np.ceil(count ** (1.0 / 3.0)))
+    offsets = np.stack(np.meshgrid(*[np.arange(side)] * 3, indexing='ij'), axis=-1).reshape(-1, 3)[:count] * 3.0
+    models = []
+    for offset in offsets:
+        cube = create_cube()
+        cube.vertices = cube.vertices + offset.astype(np.float32)
+        models.append(cube)
+    return models
+
+def build_torus(faces):
+    # One dense quad mesh: stresses per-face work (shading, upload, LOD)
+    rings = max(int(np.sqrt(faces * 2)), 3)
+    sides = max(faces // rings, 3)
+    return [torus(1.0, 0.35, rings, sides)]
+
+def build_soup(faces):
+    # Unconnected random triangles: worst case for BVH quality and overdraw
+    rng = np.random.default_rng(0)
+    centers = rng.uniform(-5, 5, (faces, 1, 3))
+    vertices = (centers + rng.normal(0, 0.05, (faces, 3, 3))).reshape(-1, 3)
+    return [Model(vertices.astype(np.float32), [], np.arange(faces * 3).reshape(-1, 3))]
+
+def build_instanced(faces):
+    # The cube grid again, as one shared mesh with per-instance transforms
+    count = max(faces // 6, 1)
+    side = int(np.ceil(count ** (1.0 / 3.0)))
+    offsets = np.stack(np.meshgrid(*[np.arange(side)] * 3, indexing='ij'), axis=-1).reshape(-1, 3)[:count] * 3.0
+    transforms = np.tile(np.eye(4, dtype=np.float32), (count, 1, 1))
+    transforms[:, :3, 3] = offsets
+    return [InstancedModel(create_cube(), transforms)]
+
+SCENES = {'cubes': build_cubes, 'instanced': build_instanced, 'torus': build_torus, 'soup': build_soup}
+
+# ---------------------------------------------
+# Measurement helpers
+# ---------------------------------------------
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def percentiles(samples_s):
+    ms = np.asarray(samples_s) * 1000.0
+    return {'p50': float(np.percentile(ms, 50)), 'p95': float(np.percentile(ms, 95)),
+            'p99': float(np.percentile(ms, 99)), 'max': float(ms.max())}
+
+def orbit(view_control, frame, frames, base_zoom):
+    # Scripted camera path: full turn around Y, gentle tilt and a zoom in/out cycle
+    phase = frame / max(frames, 1)
+    view_control.rot_y = 360.0 * phase
+    view_control.rot_x = 20.0 + 15.0 * np.sin(2 * np.pi * phase)
+    view_control.zoom = base_zoom * (1.0 - 0.3 * np.sin(2 * np.pi * phase))
+
+def run_scene(viewer, name, faces, frames, picks):
+    viewer.clear_models()
+    start = time.perf_counter()
+    models = SCENES[name](faces)
+    viewer.add_models(models)
+    build_s = time.perf_counter() - start
+    vc = viewer.view_control
+    base_zoom = vc.zoom
+    start = time.perf_counter()
+    viewer.render()
+    first_frame_s = time.perf_counter() - start
+    # Per-stage history covers only the measured frames of this scene
+    viewer.profiler.clear_history()
+    frame_times = []
+    for frame in range(frames):
+        orbit(vc, frame, frames, base_zoom)
+        start = time.perf_counter()
+        viewer.render()
+        frame_times.append(time.perf_counter() - start)
+    rng = np.random.default_rng(1)
+    pick_times = []
+    for x, y in zip(rng.integers(0, viewer.width, picks), rng.integers(0, viewer.height, picks)):
+        start = time.perf_counter()
+        viewer.pick_face(x, y)
+        pick_times.append(time.perf_counter() - start)
+    frame = percentiles(frame_times)
+    return {
+        'scene': name, 'faces': int(sum(len(m.model.faces) * len(m) if hasattr(m, 'model') else len(m.faces) for m in models)),
+        'models': len(models),
+        'build_s': build_s, 'first_frame_ms': first_frame_s * 1000.0,
+        'frame_ms': frame, 'fps_p50': 1000.0 / frame['p50'] if frame['p50'] > 0 else float('inf'),
+        'pick_ms': percentiles(pick_times) if pick_times else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': viewer.profiler.stats() if viewer.profiler.enabled else None,
+    }
+
+# ---------------------------------------------
+# Command line entry point
+# ---------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenes', default='cubes,instanced,torus,soup')
+    parser.add_argument('--sizes', default='1000,10000,100000,1000000,5000000',
+                        help='comma-separated face counts per scene')
+    parser.add_argument('--frames', type=int, default=120)
+    parser.add_argument('--picks', type=int, default=200)
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--backend', choices=viewOffscreen.BACKENDS, default=None)
+    parser.add_argument('--max-models', type=int, default=20000,
+                        help='skip multi-model scenes that would exceed this many models')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--profile', action='store_true', help='record per-stage timings into the results')
+    parser.add_argument('--trace', help='write a Chrome trace of every span to this file (implies --profile)')
+    args = parser.parse_args(argv)
+
+    backend = viewOffscreen.use_platform(args.backend)
+    viewer = ViewRender(args.width, args.height, headless=True, backend=backend)
+    viewer.profiler.enabled = args.profile or bool(args.trace)
+    viewer.profiler.history = max(args.frames, 1)
+
+    results = []
+    print(f"{'scene':<8}{'faces':>10}{'build s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'pick p95':>10}{'rss MB':>9}")
+    for name in args.scenes.split(','):
+        for faces in (int(s) for s in args.sizes.split(',')):
+            if name == 'cubes' and faces // 6 > args.max_models:
+                continue
+            result = run_scene(viewer, name, faces, args.frames, args.picks)
+            results.append(result)
+            pick = result['pick_ms']['p95'] if result['pick_ms'] else float('nan')
+            print(f"{name:<8}{result['faces']:>10}{result['build_s']:>9.2f}{result['frame_ms']['p50']:>9.2f}"
+                  f"{result['frame_ms']['p95']:>9.2f}{result['frame_ms']['p99']:>9.2f}{pick:>10.3f}{result['peak_rss_mb']:>9.0f}")
+            sys.stdout.flush()
+    if args.trace:
+        viewer.profiler.export_chrome_trace(args.trace)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+if __name__ == '__main__':
+    main()
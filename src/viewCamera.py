@@ -0,0 +1,168 @@
+import numpy as np
+
+# ---------------------------------------------
+# Matrix helpers (row-major, column vectors, same conventions as the GL fixed pipeline)
+# ---------------------------------------------
+def translation_matrix(x, y, z):
+    m = np.eye(4)
+    m[:3, 3] = (x, y, z)
+    return m
+
+def rotation_matrix(angle_deg, axis):
+    # Equivalent of glRotate about a principal axis (0 = x, 1 = y, 2 = z)
+    c, s = np.cos(np.radians(angle_deg)), np.sin(np.radians(angle_deg))
+    i, j = [(1, 2), (2, 0), (0, 1)][axis]
+    m = np.eye(4)
+    m[i, i], m[i, j], m[j, i], m[j, j] = c, -s, s, c
+    return m
+
+def perspective_matrix(fov_y, aspect, near, far):
+    # Equivalent of gluPerspective
+    f = 1.0 / np.tan(np.radians(fov_y) / 2.0)
+    m = np.zeros((4, 4))
+    m[0, 0] = f / aspect
+    m[1, 1] = f
+    m[2, 2] = (far + near) / (near - far)
+    m[2, 3] = 2.0 * far * near / (near - far)
+    m[3, 2] = -1.0
+    return m
+
+def ortho_matrix(left, right, bottom, top, near, far):
+    # Equivalent of glOrtho
+    m = np.eye(4)
+    m[0, 0] = 2.0 / (right - left)
+    m[1, 1] = 2.0 / (top - bottom)
+    m[2, 2] = -2.0 / (far - near)
+    m[:3, 3] = (-(right + left) / (right - left), -(top + bottom) / (top - bottom), -(far + near) / (far - near))
+    return m
+
+# ---------------------------------------------
+# Camera: CPU-side view/projection state
+# ---------------------------------------------
+class Camera:
+    """View and projection matrices computed in NumPy from a ViewControl's state.
+
+    Matrices are rebuilt only when their inputs (pan, zoom, rotation, projection
+    parameters, window size) change, so picking and projection never read back GL state.
+    """
+
+    def __init__(self, view_control):
+        self.view_control = view_control
+        self.projection = ('perspective', 45.0, 0.1, 50.0)
+        self._view_key = None
+        self._view = None
+        self._projection_key = None
+        self._projection = None
+        self._combined_key = None
+        self._combined = None
+        self._combined_inv = None
+
+    # ---------------------------------------------
+    # Projection parameters (set by the active RenderMode)
+    # ---------------------------------------------
+    def set_perspective(self, fov_y, near, far):
+        self.projection = ('perspective', fov_y, near, far)
+
+    def set_ortho(self, left, right, bottom, top, near, far):
+        self.projection = ('orthogonal', left, right, bottom, top, near, far)
+
+    # ---------------------------------------------
+    # Cached matrices
+    # ---------------------------------------------
+    @property
+    def viewport(self):
+        return (0, 0, self.view_control.width, self.view_control.height)
+
+    @property
+    def view_key(self):
+        vc = self.view_control
+        return (vc.pan_x, vc.pan_y, vc.zoom, vc.rot_x, vc.rot_y)
+
+    @property
+    def projection_key(self):
+        return (self.projection, self.view_control.width, self.view_control.height)
+
+    @property
+    def view_matrix(self):
+        key = self.view_key
+        if key != self._view_key:
+            pan_x, pan_y, zoom, rot_x, rot_y = key
+            # Same order as glTranslatef(pan_x, pan_y, zoom); glRotatef(rot_x, x); glRotatef(rot_y, y)
+            self._view = translation_matrix(pan_x, pan_y, zoom) @ rotation_matrix(rot_x, 0) @ rotation_matrix(rot_y, 1)
+            self._view_key = key
+        return self._view
+
+    @property
+    def projection_matrix(self):
+        key = self.projection_key
+        if key != self._projection_key:
+            kind, *params = self.projection
+            if kind == 'perspective':
+                fov_y, near, far = params
+                aspect = self.view_control.width / self.view_control.height
+                self._projection = perspective_matrix(fov_y, aspect, near, far)
+            else:
+                self._projection = ortho_matrix(*params)
+            self._projection_key = key
+        return self._projection
+
+    def _update_combined(self):
+        key = (self.view_key, self.projection_key)
+        if key != self._combined_key:
+            self._combined = self.projection_matrix @ self.view_matrix
+            self._combined_inv = np.linalg.inv(self._combined)
+            self._combined_key = key
+
+    @property
+    def view_projection(self):
+        self._update_combined()
+        return self._combined
+
+    def frustum_planes(self):
+        """(6, 4) world-space planes (nx, ny, nz, d), inside where n.p + d >= 0."""
+        m = self.view_projection
+        planes = np.array([m[3] + m[0], m[3] - m[0], m[3] + m[1], m[3] - m[1], m[3] + m[2], m[3] - m[2]])
+        return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+    # ---------------------------------------------
+    # Batched projections
+    # ---------------------------------------------
+    def project(self, points):
+        """Window coordinates (x, y, depth) for an (N, 3) array of world points, like gluProject."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        clip = points @ self.view_projection[:3, :3].T + self.view_projection[:3, 3]
+        w = points @ self.view_projection[3, :3] + self.view_projection[3, 3]
+        ndc = clip / w[:, None]
+        x0, y0, width, height = self.viewport
+        return np.column_stack([
+            x0 + (ndc[:, 0] + 1.0) * 0.5 * width,
+            y0 + (ndc[:, 1] + 1.0) * 0.5 * height,
+            (ndc[:, 2] + 1.0) * 0.5,
+        ])
+
+    def unproject(self, window_points):
+        """World points for an (N, 3) array of window coordinates, like gluUnProject."""
+        window_points = np.asarray(window_points, dtype=np.float64).reshape(-1, 3)
+        self._update_combined()
+        x0, y0, width, height = self.viewport
+        ndc = np.column_stack([
+            (window_points[:, 0] - x0) / width * 2.0 - 1.0,
+            (window_points[:, 1] - y0) / height * 2.0 - 1.0,
+            window_points[:, 2] * 2.0 - 1.0,
+            np.ones(len(window_points)),
+        ])
+        world = ndc @ self._combined_inv.T
+        return world[:, :3] / world[:, 3:]
+
+    def screen_rays(self, mouse_points):
+        """Ray origins on the near plane and unit directions for (N, 2) mouse positions (y down)."""
+        mouse_points = np.asarray(mouse_points, dtype=np.float64).reshape(-1, 2)
+        win_y = self.view_control.height - mouse_points[:, 1]
+        near = self.unproject(np.column_stack([mouse_points[:, 0], win_y, np.zeros(len(win_y))]))
+        far = self.unproject(np.column_stack([mouse_points[:, 0], win_y, np.ones(len(win_y))]))
+        directions = far - near
+        return near, directions / np.linalg.norm(directions, axis=1, keepdims=True)
+
+    def screen_ray(self, mouse_x, mouse_y):
+        origins, directions = self.screen_rays([(mouse_x, mouse_y)])
+        return origins[0], directions[0]
@@ -1,4 +1,6 @@
 import pygame
+import numpy as np
+from viewCamera import Camera
 
 class ViewControl:
     def __init__(self, width=800, height=600):
@@ -15,6 +17,12 @@ class ViewControl:
         self.rot_y = 0.0  # Default rotation around y-axis
         self.shift_held = False
         self.last_left_click = None  # (x, y) coordinates
+        self.click_mode = 'face'     # Region a left click selects (see selection_mode)
+        self.last_hover = None       # (x, y) of the latest unprocessed mouse motion
+        self.lod_enabled = True      # Draw decimated levels of dense models when zoomed out
+        self.hud_enabled = False     # Frame timing overlay (F3)
+        self.dirty = True            # Camera or display settings changed since the last frame
+        self.camera = Camera(self)
         
     def reset_isometric_view(self):
         # Set rotation for top-left isometric view
@@ -23,7 +31,13 @@ class ViewControl:
         self.pan_x = 0.0
         self.pan_y = 0.0
         self.zoom = -5.0  # Reset zoom to default
+        self.dirty = True
         
+    def view_direction(self):
+        """World-space direction the camera looks along, accounting for rot_x and rot_y."""
+        # Eye-space -Z axis mapped back through the view rotation (third row of its inverse)
+        return -self.camera.view_matrix[2, :3]
+
     def toggle_view_mode(self):
         """Toggle between perspective and orthogonal view modes, normalizing zoom."""
         if self.view_mode == "perspective":
@@ -34,11 +48,13 @@ class ViewControl:
             self.ortho_zoom = self.zoom
             self.view_mode = "perspective"
             self.zoom = self.persp_zoom
+        self.dirty = True
 
     def handle_mousemotion(self, event):
         # Middle mouse button: rotation
         # Shift + middle mouse button: panning
         # Scroll: zoom (handled in mousebuttondown)
+        self.last_hover = event.pos
         if event.buttons[1]:  # Middle mouse button held
             if self.shift_held:
                 # Panning
@@ -48,6 +64,7 @@ class ViewControl:
                 # Rotation
                 self.rot_x += event.rel[1] * 0.5
                 self.rot_y += event.rel[0] * 0.5
+            self.dirty = True
 
 
     def handle_mousebuttondown(self, event):
@@ -58,20 +75,39 @@ class ViewControl:
                 self.persp_zoom = self.zoom
             else:
                 self.ortho_zoom = self.zoom
+            self.dirty = True
         elif event.button == 5:  # Scroll down
             self.zoom -= 0.5
             if self.view_mode == "perspective":
                 self.persp_zoom = self.zoom
             else:
                 self.ortho_zoom = self.zoom
+            self.dirty = True
         elif event.button == 1:  # Left click
             self.last_left_click = event.pos
+            self.click_mode = self.selection_mode()
+
+    def selection_mode(self):
+        # Modifiers held while clicking widen the selection: Shift selects the connected
+        # region, Ctrl the coplanar patch and Alt the smooth region bounded by creases
+        if self.shift_held:
+            return 'connected'
+        if self.is_key_pressed(pygame.K_LCTRL) or self.is_key_pressed(pygame.K_RCTRL):
+            return 'coplanar'
+        if self.is_key_pressed(pygame.K_LALT) or self.is_key_pressed(pygame.K_RALT):
+            return 'smooth'
+        return 'face'
 
     def consume_left_click(self):
         click = self.last_left_click
         self.last_left_click = None
         return click
 
+    def consume_hover(self):
+        hover = self.last_hover
+        self.last_hover = None
+        return hover
+
     def handle_mousebuttonup(self, event):
         pass
 
@@ -94,6 +130,12 @@ class ViewControl:
                 self.reset_isometric_view()
             case pygame.K_o:
                 self.toggle_view_mode()
+            case pygame.K_l:
+                self.lod_enabled = not self.lod_enabled
+                self.dirty = True
+            case pygame.K_F3:
+                self.hud_enabled = not self.hud_enabled
+                self.dirty = True
 
     def handle_keyup(self, event):
         self.set_key_state(event.key, False)
@@ -0,0 +1,83 @@
+import time
+import numpy as np
+from models.model import Model
+
+# ---------------------------------------------
+# IK trajectory playback as a live model in the viewer
+# ---------------------------------------------
+# The chain is one Model: joints 0..n joined by link edges, followed by a small cross marking
+# the current target. Each frame only its vertex positions are rewritten (Model.update_vertices),
+# so the GPU buffers are updated in place and the index buffers are never rebuilt.
+#
+#     playback = IKPlayback(IKSimulation(path[0], [1.0, 0.8, 0.6]), path)
+#     viewer.add_model(playback.model)
+#     viewer.add_animation(playback)
+
+# Offsets of the target marker's six vertices (three axis-aligned segments)
+_CROSS = np.array([[-1, 0, 0], [1, 0, 0], [0, -1, 0], [0, 1, 0], [0, 0, -1], [0, 0, 1]], dtype=np.float64)
+
+class IKPlayback:
+    """Solves a trajectory of targets in time with the wall clock, within a per-frame budget.
+
+    Targets become due at `rate` per second. Each step() solves due targets in order, each
+    warm-started from the previous pose, until the budget is spent (at least one per step so
+    playback always advances). When the solver falls behind, the chain shows the latest solved
+    pose and later frames catch up. Solved poses and errors are kept for review.
+    """
+
+    def __init__(self, simulation, trajectory, rate=30.0, budget_ms=4.0, marker_size=None, **solver_options):
+        self.simulation = simulation
+        self.trajectory = np.atleast_2d(np.asarray(trajectory, dtype=np.float64))
+        self.rate = rate
+        self.budget_s = budget_ms / 1000.0
+        self.solver_options = solver_options
+        n = len(simulation.link_lengths)
+        self.poses = np.zeros((len(self.trajectory), n, 2))
+        self.errors = np.full(len(self.trajectory), np.nan)
+        self.solved = 0        # number of trajectory targets solved so far
+        self.start = None
+        if marker_size is None:
+            marker_size = 0.05 * float(np.sum(simulation.link_lengths))
+        self.marker = _CROSS * marker_size
+        links = np.stack([np.arange(n), np.arange(1, n + 1)], axis=1)
+        cross = n + 1 + np.arange(6).reshape(3, 2)
+        simulation.target_position = self.trajectory[0]
+        self.model = Model(self._vertices(), np.concatenate([links, cross]))
+
+    def _vertices(self):
+        target = self.simulation.target_position
+        return np.concatenate([self.simulation.forward_kinematics(), target + self.marker])
+
+    @property
+    def lag(self):
+        # Targets that are due but not yet solved
+        if self.start is None:
+            return 0
+        due = min(int((time.perf_counter() - self.start) * self.rate) + 1, len(self.trajectory))
+        return max(due - self.solved, 0)
+
+    @property
+    def finished(self):
+        return self.solved >= len(self.trajectory)
+
+    def _solve_next(self):
+        sim = self.simulation
+        sim.target_position = self.trajectory[self.solved]
+        sim.calculate_joint_angles(**self.solver_options)
+        self.poses[self.solved] = sim.joint_angles
+        self.errors[self.solved] = sim.error
+        self.solved += 1
+
+    def step(self, now=None):
+        """Advance playback to `now` (perf_counter seconds); returns False once finished."""
+        now = time.perf_counter() if now is None else now
+        if self.start is None:
+            self.start = now
+        due = min(int((now - self.start) * self.rate) + 1, len(self.trajectory))
+        deadline = time.perf_counter() + self.budget_s
+        before = self.solved
+        while self.solved < due and (self.solved == before or time.perf_counter() < deadline):
+            self._solve_next()
+        if self.solved > before:
+            self.model.update_vertices(self._vertices())
+        return not self.finished
@@ -0,0 +1,160 @@
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from models.model import Model
+from models.importers import load_mesh
+from models.cache import load_cached
+from models.preprocess import normalize_model, face_edges
+from models.lod import model_lod
+from models.buffers import build_face_arrays, build_edge_arrays
+
+# ---------------------------------------------
+# Background asset loading with progressive display
+# ---------------------------------------------
+# Workers parse, normalize and precompute everything a model needs before its first frame
+# (normals, bounds, pick BVH, LOD chain and the CPU-side vertex/index arrays). Finished
+# models travel through a queue to the render thread, which is the only thread making GL
+# calls: poll() adds them to the scene and uploads their buffers within a time budget.
+#
+#     loader = viewer.load_models_async(['scan.ply', 'part.stl'])
+#     # viewer.run() polls the loader every frame; loader.errors lists failed jobs
+#
+# Threads rather than processes: the heavy steps are NumPy calls that release the GIL, and
+# models stay in shared memory instead of being pickled back from another process.
+WORKERS = min(4, os.cpu_count() or 1)
+FRAME_BUDGET_MS = 8.0
+
+def split_model(model, chunk_faces):
+    # Consecutive runs of at most chunk_faces faces as separate models with their own vertices
+    if len(model.faces) <= chunk_faces:
+        return [model]
+    chunks = []
+    for start in range(0, len(model.faces), chunk_faces):
+        faces = model.faces[start:start + chunk_faces]
+        face_map = model.face_map[start:start + chunk_faces] if model.face_map is not None else None
+        used, local = np.unique(faces, return_inverse=True)
+        local = local.reshape(faces.shape).astype(np.int32)
+        chunk = Model(model.vertices[used], face_edges(local, face_map), local)
+        chunk.face_map = face_map
+        chunks.append(chunk)
+    return chunks
+
+def prepare_model(model):
+    # Fill the model's caches so its first frame does no geometry work on the render thread
+    if not isinstance(model, Model):
+        return model
+    model.bounds()
+    if len(model.faces):
+        model.face_normals()
+        model.bvh()
+        model_lod(model)
+        model.cached('face_arrays', build_face_arrays)
+    model.cached('edge_arrays', build_edge_arrays)
+    return model
+
+class AsyncLoader:
+    """Loads meshes on a thread pool and hands finished models to the render thread.
+
+    Each job delivers its models as soon as they are prepared; with chunk_faces set, large
+    meshes are split into chunks that are delivered one by one, so they appear progressively.
+    The view is normalized once, when the last pending job has been added.
+    """
+
+    def __init__(self, viewer, workers=WORKERS, chunk_faces=None, use_cache=True, weld_tolerance=None):
+        self.viewer = viewer
+        self.chunk_faces = chunk_faces
+        self.use_cache = use_cache
+        self.weld_tolerance = weld_tolerance
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='loader')
+        self.ready = queue.Queue()    # (job, model or exception); (job, None) when a job ends
+        self.jobs = 0
+        self.pending = 0              # jobs submitted whose end marker has not been polled yet
+        self.sources = {}             # job -> description (path or callable name)
+        self.models = {}              # job -> models delivered for it so far
+        self.errors = []              # (source, exception) for jobs that failed
+        self.unnormalized = False     # models were added since the last view reset
+
+    @property
+    def busy(self):
+        return self.pending > 0
+
+    def load(self, path):
+        """Queue a mesh file; returns the job id under which its models are collected."""
+        return self.submit(self._read, path, source=path)
+
+    def submit(self, build, *args, source=None):
+        # Any callable returning a Model, InstancedModel or a list of them, run on the pool
+        job = self.jobs
+        self.jobs += 1
+        self.sources[job] = source or getattr(build, '__name__', repr(build))
+        self.models[job] = []
+        self.pending += 1
+        self.pool.submit(self._run, job, build, args)
+        return job
+
+    def _read(self, path):
+        model = load_cached(path, load_mesh) if self.use_cache else load_mesh(path)
+        if self.weld_tolerance is not None:
+            model = normalize_model(model, self.weld_tolerance)
+        return model
+
+    def _run(self, job, build, args):
+        # Worker thread: no GL calls and no viewer state, only the queue
+        try:
+            result = build(*args)
+            for model in result if isinstance(result, (list, tuple)) else [result]:
+                parts = split_model(model, self.chunk_faces) if self.chunk_faces and isinstance(model, Model) else [model]
+                for part in parts:
+                    self.ready.put((job, prepare_model(part)))
+        except Exception as exc:
+            self.ready.put((job, exc))
+        finally:
+            self.ready.put((job, None))
+
+    def poll(self, budget_ms=FRAME_BUDGET_MS):
+        """Add prepared models to the viewer (render thread only); returns how many were added.
+
+        Buffer uploads stop once budget_ms is spent so the frame stays interactive; at least
+        one model is added per call so loading always progresses. When the last pending job
+        has been added, the view is normalized once for the whole batch.
+        """
+        deadline = time.perf_counter() + budget_ms / 1000.0
+        added = []
+        while not added or time.perf_counter() < deadline:
+            try:
+                job, item = self.ready.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self.pending -= 1
+            elif isinstance(item, Exception):
+                self.errors.append((self.sources[job], item))
+            else:
+                if isinstance(item, Model):
+                    # Buffers are created here, on the thread that owns the GL context
+                    item.gpu_buffers().update_geometry(item)
+                self.models[job].append(item)
+                added.append(item)
+        if added:
+            self.viewer.add_models(added, normalize=False)
+            self.unnormalized = True
+        if not self.pending and self.unnormalized:
+            self.viewer.reset_view()
+            self.unnormalized = False
+        return len(added)
+
+    def wait(self, timeout=None):
+        # Block until every queued job has been added (e.g. scripts and benchmarks)
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while self.busy:
+            if deadline is not None and time.perf_counter() > deadline:
+                return False
+            if not self.poll():
+                time.sleep(0.001)
+        return True
+
+    def shutdown(self):
+        # Drop queued jobs; jobs already running finish in the background and are discarded
+        self.pool.shutdown(wait=False, cancel_futures=True)
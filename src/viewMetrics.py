@@ -0,0 +1,135 @@
+import numpy as np
+from models.model import Model
+from models.buffers import compute_face_centroids
+
+# ---------------------------------------------
+# Screen-space metrics of the scene for the current camera
+# ---------------------------------------------
+# Everything is computed with whole-array transforms through the camera's own view and
+# projection matrices: camera-space depths of all face centroids at once, and window
+# coordinates of many points per call. Face centroids are cached per model version
+# (shared with the back-to-front face sort), and models whose bounding box cannot hold a
+# closer face than the best one found so far are skipped without touching their faces.
+#
+# Depth is the distance in front of the camera along its view axis (-z in eye space), so
+# the closest face is the argmin over the faces in front of the camera.
+SAMPLE_FACES = 1 << 16  # faces measured per call by face_size_distribution
+
+def box_corners(lo, hi):
+    # (8, 3) corners of an axis-aligned box
+    return np.array([[x, y, z] for x in (lo[0], hi[0]) for y in (lo[1], hi[1]) for z in (lo[2], hi[2])], dtype=np.float64)
+
+def camera_depths(points, view_matrix):
+    """Distance in front of the camera of each (N, 3) point; negative behind it."""
+    points = np.asarray(points).reshape(-1, 3)
+    return -(points @ view_matrix[2, :3].astype(points.dtype) + view_matrix[2, 3])
+
+def project_points(points, camera):
+    """Window (x, y) of (N, 3) world points plus a mask of points in front of the camera
+    (positive clip w), whose coordinates alone are meaningful."""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    vp = camera.view_projection
+    clip = points @ vp[:, :3].T + vp[:, 3]
+    front = clip[:, 3] > 1e-9
+    w = np.where(front, clip[:, 3], 1.0)
+    x0, y0, width, height = camera.viewport
+    screen = np.column_stack([x0 + (clip[:, 0] / w + 1.0) * 0.5 * width,
+                              y0 + (clip[:, 1] / w + 1.0) * 0.5 * height])
+    return screen, front
+
+def screen_sizes(corners, camera):
+    """(F,) screen-space size of faces given as (F, K, 3) corner positions: the largest
+    distance in pixels between two corners, NaN for faces reaching behind the camera."""
+    corners = np.asarray(corners)
+    count, arity = corners.shape[:2]
+    screen, front = project_points(corners.reshape(-1, 3), camera)
+    screen = screen.reshape(count, arity, 2)
+    sizes = np.zeros(count)
+    # K is small (3 or 4): one vectorized pass per corner pair
+    for i in range(arity):
+        for j in range(i + 1, arity):
+            np.maximum(sizes, np.linalg.norm(screen[:, i] - screen[:, j], axis=1), out=sizes)
+    sizes[~front.reshape(count, arity).all(axis=1)] = np.nan
+    return sizes
+
+# ---------------------------------------------
+# Closest face
+# ---------------------------------------------
+def closest_face(models, view_matrix, near=0.0):
+    """(model_idx, face_idx, depth) of the face whose centroid is nearest in front of the
+    camera, or None. Models other than meshes (instances, point clouds) are ignored."""
+    candidates = []
+    for m_idx, model in enumerate(models):
+        if not isinstance(model, Model) or not len(model.faces):
+            continue
+        lo, hi = model.bounds()
+        depths = camera_depths(box_corners(lo, hi), view_matrix)
+        if depths.max() > near:
+            candidates.append((max(depths.min(), near), m_idx))
+    best = None
+    # Nearest boxes first; a box starting behind the best face so far cannot improve on it
+    for box_depth, m_idx in sorted(candidates):
+        if best is not None and box_depth >= best[2]:
+            break
+        model = models[m_idx]
+        depths = camera_depths(model.cached('face_centroids', compute_face_centroids), view_matrix)
+        depths[depths <= near] = np.inf
+        face_idx = int(np.argmin(depths))
+        if np.isfinite(depths[face_idx]) and (best is None or depths[face_idx] < best[2]):
+            best = (m_idx, face_idx, float(depths[face_idx]))
+    return best
+
+def closest_face_screen_size(models, camera, default=1.0):
+    # Screen-space size in pixels of the closest face in front of the camera
+    hit = closest_face(models, camera.view_matrix)
+    if hit is None:
+        return default
+    model = models[hit[0]]
+    size = screen_sizes(model.vertices[model.faces[hit[1]]][None], camera)[0]
+    return float(size) if np.isfinite(size) and size > 0 else default
+
+# ---------------------------------------------
+# Scene-wide distributions and extents
+# ---------------------------------------------
+def face_size_distribution(models, camera, percentiles=(5, 50, 95), sample=SAMPLE_FACES):
+    """Summary of the screen-space face sizes (pixels) over the scene's mesh faces in front
+    of the camera: count, min, mean, max and the requested percentiles. At most `sample`
+    faces are measured, evenly strided over the scene, so the cost is bounded on any scene.
+    Returns None when no face is in front of the camera."""
+    meshes = [model for model in models if isinstance(model, Model) and len(model.faces)]
+    total = sum(len(model.faces) for model in meshes)
+    if not total:
+        return None
+    stride = max(1, -(-total // sample))
+    sizes = []
+    for model in meshes:
+        faces = model.faces[::stride]
+        sizes.append(screen_sizes(model.vertices[faces], camera))
+    sizes = np.concatenate(sizes)
+    sizes = sizes[np.isfinite(sizes)]
+    if not len(sizes):
+        return None
+    stats = {'count': len(sizes), 'sampled_from': total, 'min': float(sizes.min()),
+             'mean': float(sizes.mean()), 'max': float(sizes.max())}
+    for p, value in zip(percentiles, np.percentile(sizes, percentiles)):
+        stats[f"p{p:g}"] = float(value)
+    return stats
+
+def projected_extent(bounds, camera):
+    """Screen rectangle (x_min, y_min, x_max, y_max) in pixels covered by an axis-aligned
+    (lo, hi) box, e.g. the scene bounds; None when the box reaches behind the camera."""
+    if bounds is None:
+        return None
+    screen, front = project_points(box_corners(*bounds), camera)
+    if not front.all():
+        return None
+    (x_min, y_min), (x_max, y_max) = screen.min(axis=0), screen.max(axis=0)
+    return float(x_min), float(y_min), float(x_max), float(y_max)
+
+def screen_coverage(bounds, camera):
+    # Fraction of the viewport's width and height spanned by the box (1.0 = fills it)
+    extent = projected_extent(bounds, camera)
+    if extent is None:
+        return None
+    _, _, width, height = camera.viewport
+    return (extent[2] - extent[0]) / width, (extent[3] - extent[1]) / height
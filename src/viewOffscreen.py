@@ -0,0 +1,132 @@
+import ctypes
+import os
+import numpy as np
+
+# ---------------------------------------------
+# Headless OpenGL contexts and offscreen framebuffers
+# ---------------------------------------------
+# PyOpenGL binds its platform (GLX, EGL, OSMesa) when OpenGL is first imported, so
+# use_platform() must run before viewRender or any OpenGL module is imported:
+#
+#     import viewOffscreen
+#     viewOffscreen.use_platform('egl')
+#     from viewRender import ViewRender
+#     viewer = ViewRender(headless=True)
+#
+# 'egl' uses a pbuffer on the default EGL display (Mesa llvmpipe when no GPU is present),
+# 'osmesa' uses Mesa's pure software rasterizer, and 'pygame' opens a hidden SDL window.
+BACKENDS = ('egl', 'osmesa', 'pygame')
+
+def use_platform(backend=None):
+    backend = backend or os.environ.get('VIEWER_HEADLESS_BACKEND', 'egl')
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown headless backend '{backend}', expected one of {BACKENDS}")
+    if backend in ('egl', 'osmesa'):
+        os.environ['PYOPENGL_PLATFORM'] = backend
+        if backend == 'egl':
+            os.environ.setdefault('EGL_PLATFORM', 'surfaceless')
+    return backend
+
+class OffscreenContext:
+    """A current OpenGL context with no visible window."""
+
+    def __init__(self, width, height, backend=None):
+        self.width = width
+        self.height = height
+        self.backend = backend or os.environ.get('PYOPENGL_PLATFORM', 'pygame')
+        if self.backend == 'egl':
+            self._create_egl()
+        elif self.backend == 'osmesa':
+            self._create_osmesa()
+        else:
+            self._create_pygame()
+
+    def _create_egl(self):
+        from OpenGL import EGL
+        display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        if not EGL.eglInitialize(display, None, None):
+            raise RuntimeError("eglInitialize failed")
+        attributes = (EGL.EGLint * 13)(
+            EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+            EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8,
+            EGL.EGL_DEPTH_SIZE, 24,
+            EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+            EGL.EGL_NONE)
+        config = EGL.EGLConfig()
+        count = EGL.EGLint()
+        if not EGL.eglChooseConfig(display, attributes, ctypes.pointer(config), 1, ctypes.pointer(count)) or not count.value:
+            raise RuntimeError("no EGL config with desktop OpenGL and a depth buffer")
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        size = (EGL.EGLint * 5)(EGL.EGL_WIDTH, self.width, EGL.EGL_HEIGHT, self.height, EGL.EGL_NONE)
+        surface = EGL.eglCreatePbufferSurface(display, config, size)
+        context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+        if not EGL.eglMakeCurrent(display, surface, surface, context):
+            raise RuntimeError("eglMakeCurrent failed")
+        self._egl = (display, surface, context)
+
+    def _create_osmesa(self):
+        from OpenGL import GL, osmesa
+        self._osmesa = osmesa.OSMesaCreateContextExt(osmesa.OSMESA_RGBA, 24, 0, 0, None)
+        self._osmesa_buffer = (GL.GLubyte * (self.width * self.height * 4))()
+        if not osmesa.OSMesaMakeCurrent(self._osmesa, self._osmesa_buffer, GL.GL_UNSIGNED_BYTE, self.width, self.height):
+            raise RuntimeError("OSMesaMakeCurrent failed")
+
+    def _create_pygame(self):
+        import pygame
+        pygame.display.init()
+        pygame.display.set_mode((self.width, self.height), pygame.OPENGL | pygame.DOUBLEBUF | pygame.HIDDEN)
+
+    def release(self):
+        if self.backend == 'egl':
+            from OpenGL import EGL
+            display, surface, context = self._egl
+            EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+            EGL.eglDestroyContext(display, context)
+            EGL.eglDestroySurface(display, surface)
+        elif self.backend == 'osmesa':
+            from OpenGL import osmesa
+            osmesa.OSMesaDestroyContext(self._osmesa)
+        else:
+            import pygame
+            pygame.display.quit()
+
+class Framebuffer:
+    """Framebuffer object with RGBA color and depth renderbuffers, readable as a NumPy image."""
+
+    def __init__(self, width, height):
+        from OpenGL.GL import (glGenFramebuffers, glGenRenderbuffers, glBindFramebuffer, glBindRenderbuffer,
+                               glRenderbufferStorage, glFramebufferRenderbuffer, glCheckFramebufferStatus,
+                               GL_FRAMEBUFFER, GL_RENDERBUFFER, GL_RGBA8, GL_DEPTH_COMPONENT24,
+                               GL_COLOR_ATTACHMENT0, GL_DEPTH_ATTACHMENT, GL_FRAMEBUFFER_COMPLETE)
+        self.width = width
+        self.height = height
+        self.fbo = glGenFramebuffers(1)
+        self.color, self.depth = glGenRenderbuffers(2)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.color)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, width, height)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, self.color)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.depth)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, width, height)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, self.depth)
+        if glCheckFramebufferStatus(GL_FRAMEBUFFER) != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError("offscreen framebuffer is incomplete")
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+
+    def bind(self):
+        from OpenGL.GL import glBindFramebuffer, glViewport, GL_FRAMEBUFFER
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glViewport(0, 0, self.width, self.height)
+
+    def read_pixels(self):
+        # (height, width, 3) uint8 image, top row first
+        from OpenGL.GL import glReadPixels, glPixelStorei, glBindFramebuffer, GL_FRAMEBUFFER, GL_PACK_ALIGNMENT, GL_RGB, GL_UNSIGNED_BYTE
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        data = glReadPixels(0, 0, self.width, self.height, GL_RGB, GL_UNSIGNED_BYTE)
+        return np.frombuffer(data, dtype=np.uint8).reshape(self.height, self.width, 3)[::-1]
+
+    def release(self):
+        from OpenGL.GL import glDeleteFramebuffers, glDeleteRenderbuffers
+        glDeleteFramebuffers(1, [self.fbo])
+        glDeleteRenderbuffers(2, [self.color, self.depth])
@@ -0,0 +1,238 @@
+import json
+import os
+import time
+from collections import deque
+import numpy as np
+
+# ---------------------------------------------
+# Frame profiler: named spans, ring-buffered per-frame history and trace export
+# ---------------------------------------------
+# Usage inside the render loop:
+#
+#     with profiler.frame():
+#         with profiler.span('cull'):
+#             ...
+#         profiler.count('draw_calls', 3)
+#
+# While the profiler is disabled, span() and frame() return a shared no-op context manager,
+# so instrumented code pays one attribute check and one method call per span.
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._record(self.name, self.start, time.perf_counter_ns())
+        return False
+
+class _FrameSpan(_Span):
+    __slots__ = ()
+
+    def __exit__(self, *exc):
+        super().__exit__(*exc)
+        self.profiler._end_frame()
+        return False
+
+class Profiler:
+    """Per-stage timings and counters for the last `history` frames.
+
+    Every stage is summed over a frame (a stage entered twice in one frame records the total)
+    and stored in a fixed-size ring buffer, so stats cost the same however long the viewer runs.
+    Completed spans are also kept as trace events, up to trace_capacity, for export.
+    """
+
+    def __init__(self, enabled=False, history=240, trace_capacity=100000):
+        self.enabled = enabled
+        self.history = history
+        self.frames = 0                 # completed frames since the last reset
+        self.stages = {}                # name -> ring buffer of per-frame milliseconds
+        self.counters = {}              # name -> ring buffer of per-frame totals
+        self.trace = deque(maxlen=trace_capacity)  # (name, start_ns, duration_ns)
+        self._frame_times = {}
+        self._frame_counts = {}
+        self._origin_ns = time.perf_counter_ns()
+
+    def span(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def frame(self):
+        # Outer span of one render() call; closing it commits the frame to the ring buffers
+        if not self.enabled:
+            return _NULL_SPAN
+        return _FrameSpan(self, 'frame')
+
+    def count(self, name, value):
+        if self.enabled:
+            self._frame_counts[name] = self._frame_counts.get(name, 0) + value
+
+    def clear_history(self):
+        # Forget per-frame statistics but keep the trace, e.g. between benchmark scenes
+        self.frames = 0
+        self.stages.clear()
+        self.counters.clear()
+        self._frame_times.clear()
+        self._frame_counts.clear()
+
+    def reset(self):
+        self.clear_history()
+        self.trace.clear()
+
+    def _record(self, name, start_ns, end_ns):
+        duration = end_ns - start_ns
+        self._frame_times[name] = self._frame_times.get(name, 0) + duration
+        self.trace.append((name, start_ns, duration))
+
+    def _end_frame(self):
+        slot = self.frames % self.history
+        for buffers, values, scale in ((self.stages, self._frame_times, 1e-6), (self.counters, self._frame_counts, 1)):
+            for name, value in values.items():
+                if name not in buffers:
+                    buffers[name] = np.zeros(self.history)
+                buffers[name][slot] = value * scale
+            # Stages that did not run this frame record zero rather than a stale value
+            for name, ring in buffers.items():
+                if name not in values:
+                    ring[slot] = 0
+            values.clear()
+        self.frames += 1
+
+    def _recent(self, ring):
+        return ring[:min(self.frames, self.history)]
+
+    def last(self, name):
+        """Value of a stage (ms) or counter in the most recent completed frame."""
+        if not self.frames:
+            return 0.0
+        ring = self.stages.get(name, self.counters.get(name))
+        return float(ring[(self.frames - 1) % self.history]) if ring is not None else 0.0
+
+    def stats(self):
+        """{name: {'mean', 'p50', 'p95', 'max'}} over the retained history, stages in ms."""
+        result = {}
+        for name, ring in list(self.stages.items()) + list(self.counters.items()):
+            samples = self._recent(ring)
+            if not len(samples):
+                continue
+            p50, p95 = np.percentile(samples, [50, 95])
+            result[name] = {'mean': float(samples.mean()), 'p50': float(p50),
+                            'p95': float(p95), 'max': float(samples.max())}
+        return result
+
+    # ---------------------------------------------
+    # Export
+    # ---------------------------------------------
+    def export_json(self, path):
+        # Summary statistics plus the raw per-frame history, oldest frame first
+        count = min(self.frames, self.history)
+        start = self.frames % self.history if self.frames > self.history else 0
+        order = (np.arange(count) + start) % self.history
+        data = {
+            'frames': self.frames,
+            'stats': self.stats(),
+            'stages_ms': {name: ring[order].tolist() for name, ring in self.stages.items()},
+            'counters': {name: ring[order].tolist() for name, ring in self.counters.items()},
+        }
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    def export_chrome_trace(self, path):
+        # Complete ("X") events in microseconds, loadable in chrome://tracing or Perfetto
+        pid = os.getpid()
+        events = [{'name': name, 'ph': 'X', 'ts': (start - self._origin_ns) / 1000.0,
+                   'dur': duration / 1000.0, 'pid': pid, 'tid': 0}
+                  for name, start, duration in self.trace]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+    def export(self, path):
+        # Chrome trace for *.trace.json / *.trace, summary JSON otherwise
+        if path.endswith(('.trace.json', '.trace')):
+            self.export_chrome_trace(path)
+        else:
+            self.export_json(path)
+
+# ---------------------------------------------
+# On-screen overlay
+# ---------------------------------------------
+class ProfilerHUD:
+    """Text overlay with frame time, per-stage milliseconds and draw statistics.
+
+    The text is rasterized with pygame.font into a pixel buffer that is only rebuilt every
+    refresh_s seconds; drawing it is a single glDrawPixels call in window coordinates.
+    """
+
+    def __init__(self, font_size=16, refresh_s=0.25):
+        self.font_size = font_size
+        self.refresh_s = refresh_s
+        self.font = None
+        self.pixels = None
+        self.size = (0, 0)
+        self.updated = 0.0
+
+    def lines(self, profiler):
+        frame_ms = profiler.stats().get('frame', {}).get('mean', 0.0)
+        fps = 1000.0 / frame_ms if frame_ms > 0 else 0.0
+        lines = [f"frame {frame_ms:6.2f} ms  {fps:6.1f} fps"]
+        for name, ring in profiler.stages.items():
+            if name != 'frame':
+                lines.append(f"{name:<10}{profiler._recent(ring).mean():7.2f} ms")
+        lines.append(f"draw calls {profiler.last('draw_calls'):.0f}  faces {profiler.last('faces_submitted'):.0f}")
+        return lines
+
+    def _rasterize(self, lines):
+        import pygame
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.Font(None, self.font_size)
+        rendered = [self.font.render(line, True, (255, 255, 255)) for line in lines]
+        width = max(surface.get_width() for surface in rendered) + 8
+        height = sum(surface.get_height() for surface in rendered) + 8
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 160))
+        y = 4
+        for surface in rendered:
+            panel.blit(surface, (4, y))
+            y += surface.get_height()
+        # Flipped vertically: glDrawPixels expects the bottom row first
+        self.pixels = pygame.image.tostring(panel, 'RGBA', True)
+        self.size = (width, height)
+
+    def draw(self, profiler, window_height):
+        from OpenGL.GL import (glWindowPos2i, glDrawPixels, glEnable, glDisable, glBlendFunc, glIsEnabled,
+                               GL_RGBA, GL_UNSIGNED_BYTE, GL_BLEND, GL_DEPTH_TEST, GL_SRC_ALPHA,
+                               GL_ONE_MINUS_SRC_ALPHA)
+        now = time.perf_counter()
+        if self.pixels is None or now - self.updated > self.refresh_s:
+            self._rasterize(self.lines(profiler))
+            self.updated = now
+        width, height = self.size
+        depth_test = glIsEnabled(GL_DEPTH_TEST)
+        glDisable(GL_DEPTH_TEST)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        # Top-left corner of the window
+        glWindowPos2i(8, max(window_height - height - 8, 0))
+        glDrawPixels(width, height, GL_RGBA, GL_UNSIGNED_BYTE, self.pixels)
+        glDisable(GL_BLEND)
+        if depth_test:
+            glEnable(GL_DEPTH_TEST)
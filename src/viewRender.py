@@ -1,6 +1,8 @@
 # ---------------------------------------------
 # Imports
 # ---------------------------------------------
+import os
+import sys
 from abc import ABC, abstractmethod
 import pygame
 from pygame.locals import *
@@ -8,12 +10,36 @@ from OpenGL.GL import *
 from OpenGL.GLU import *
 import numpy as np
 from models.model import Model, create_cube
+from models.bvh import PickHit
+from models.importers import load_mesh
+from models.cache import load_cached
+from models.lod import model_lod
+from models.buffers import MeshBuffers
+from models.instancing import InstancedModel
+from models.pointcloud import PointCloud
+from models.topology import select_faces
 from viewControl import ViewControl
+from viewScene import SceneBounds, SceneIndex
+from viewOffscreen import OffscreenContext, Framebuffer
+from viewProfiler import Profiler, ProfilerHUD
+from viewLoader import AsyncLoader
+from viewMetrics import closest_face_screen_size, projected_extent, face_size_distribution
 
 # ---------------------------------------------
 # Global variables
 # ---------------------------------------------
-debug = 2  # 0 = off, 1 = debug, 2 = full logging
+debug = 0  # 0 = off, 1 = debug, 2 = full logging (timings go through ViewRender.profiler)
+
+# Face shading colors (RGBA)
+HIGHLIGHT_COLOR = (1.0, 1.0, 0.2, 0.8)   # Yellow, more opaque
+HOVER_COLOR = (0.3, 0.7, 1.0, 0.7)       # Light blue, under the mouse
+SELECTION_COLOR = (1.0, 0.6, 0.1, 0.7)   # Orange, region grown from the clicked face
+FACING_COLOR = (0.2, 0.8, 0.2, 0.5)      # Green, semi-transparent
+BACKFACING_COLOR = (0.8, 0.2, 0.2, 0.5)  # Red, semi-transparent
+
+# Event loop: longest sleep while nothing changes, and the frame cap while redrawing
+IDLE_TIMEOUT_MS = 1000
+MAX_FPS = 60
 
 # ---------------------------------------------
 # Helper classes
@@ -34,9 +60,19 @@ class RenderMode(ABC):
         self.view_render = view_render
 
     @abstractmethod
-    def apply_projection(self):
+    def configure_camera(self):
         pass
 
+    def apply_projection(self):
+        self.configure_camera()
+        glLoadMatrixd(self.view_render.view_control.camera.projection_matrix.T)
+
+    def depth_extent(self, minimum):
+        # Distance the clip range must reach to contain the whole scene from the current
+        # camera distance, rounded up to a power of two so zooming rarely changes it
+        reach = abs(self.view_render.view_control.zoom) + self.view_render.get_max_model_size()
+        return max(minimum, 2.0 ** np.ceil(np.log2(max(reach, 1.0))))
+
     @abstractmethod
     def convert_zoom(self, zoom):
         pass
@@ -48,9 +84,8 @@ class PerspectiveMode(RenderMode):
         self.view_render.view_control.zoom = self.view_render.view_control.persp_zoom
         self.view_render.ortho_base_size = ortho_base_size
 
-    def apply_projection(self):
-        aspect = self.view_render.width / self.view_render.height
-        gluPerspective(45, aspect, 0.1, 50.0)
+    def configure_camera(self):
+        self.view_render.view_control.camera.set_perspective(45, 0.1, self.depth_extent(50.0))
 
     def convert_zoom(self, ortho_zoom=None):
         # Convert ortho zoom to perspective zoom
@@ -75,14 +110,15 @@ class OrthoMode(RenderMode):
         if debug >= 1:
             print(f"[DEBUG] OrthoMode.normalize_view: persp_zoom={persp_zoom:.4f}, ortho_zoom={self.view_render.view_control.ortho_zoom:.4f}")
 
-    def apply_projection(self):
+    def configure_camera(self):
         aspect = self.view_render.width / self.view_render.height
         base = getattr(self.view_render, 'ortho_base_size', 1.0)
         k = 0.15
         ortho_zoom = getattr(self.view_render.view_control, 'ortho_zoom', 0.0)
         scale = np.exp(ortho_zoom * k)
         ortho_size = base / scale
-        glOrtho(-ortho_size * aspect, ortho_size * aspect, -ortho_size, ortho_size, -100, 100)
+        depth = self.depth_extent(100.0)
+        self.view_render.view_control.camera.set_ortho(-ortho_size * aspect, ortho_size * aspect, -ortho_size, ortho_size, -depth, depth)
 
     def convert_zoom(self, persp_zoom=None):
         # Convert perspective zoom to ortho zoom
@@ -97,31 +133,19 @@ class OrthoMode(RenderMode):
         
 class ViewUtils:
     @staticmethod
-    def get_closest_face_to_camera(models, view_matrix):
-        closest_dist = float('inf')
-        closest_face = None
-        closest_verts = None
-        for model in models:
-            for face in getattr(model, 'faces', []):
-                verts = [np.array(model.vertices[i]) for i in face]
-                # Transform vertices by view matrix
-                verts_cam = [view_matrix @ np.append(v, 1.0) for v in verts]
-                # Use average z as distance to camera
-                avg_z = np.mean([v[2] for v in verts_cam])
-                if avg_z < closest_dist:
-                    closest_dist = avg_z
-                    closest_face = face
-                    closest_verts = verts
-        return closest_face, closest_verts
+    def face_shading_colors(normals, view_dir, highlights=()):
+        # Classify every face against the view direction in one pass and map to RGBA;
+        # highlights is a sequence of (face_idx, color) painted on top in order
+        facing = (normals @ view_dir) > 0
+        colors = np.where(facing[:, None], FACING_COLOR, BACKFACING_COLOR).astype(np.float32)
+        for face_idx, color in highlights:
+            colors[face_idx] = color
+        return colors
 
     @staticmethod
-    def project_vertices_to_screen(vertices, modelview, projection, viewport):
-        # Project 3D vertices to 2D screen coordinates
-        screen_coords = []
-        for v in vertices:
-            win = gluProject(v[0], v[1], v[2], modelview, projection, viewport)
-            screen_coords.append(win[:2])
-        return np.array(screen_coords)
+    def project_vertices_to_screen(vertices, camera):
+        # Project 3D vertices to 2D screen coordinates in one batched transform
+        return camera.project(vertices)[:, :2]
     
 class ViewRender:
     # ---------------------------------------------
@@ -129,126 +153,199 @@ class ViewRender:
     # ---------------------------------------------
     def render(self):
         vc = self.view_control
-        # If view mode just changed, update normalization and convert zoom
-        if getattr(self, 'last_view_mode', None) != vc.view_mode:
-            self.get_render_mode().normalize_view()
-            self.last_view_mode = vc.view_mode
-        self.init_opengl()
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-        glLoadIdentity()
-        glTranslatef(vc.pan_x, vc.pan_y, vc.zoom)
-        glRotatef(vc.rot_x, 1, 0, 0)
-        glRotatef(vc.rot_y, 0, 1, 0)
+        prof = self.profiler
+        # The overlay needs timings, so showing it switches the profiler on; hiding it again
+        # restores the previous state (VIEWER_PROFILE or a caller's setting)
+        if vc.hud_enabled and not prof.enabled:
+            prof.enabled = self.hud_profiling = True
+        elif not vc.hud_enabled and self.hud_profiling:
+            prof.enabled = self.hud_profiling = False
+        with prof.frame():
+            # If view mode just changed, update normalization and convert zoom
+            if getattr(self, 'last_view_mode', None) != vc.view_mode:
+                with prof.span('normalize'):
+                    self.get_render_mode().normalize_view()
+                self.last_view_mode = vc.view_mode
+            with prof.span('setup'):
+                # GL projection state is only touched when the mode, zoom or window size changed
+                self.get_render_mode().configure_camera()
+                if vc.camera.projection_key != self.loaded_projection:
+                    self.init_opengl()
+                glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+                # Modelview comes from the CPU-side camera so picking sees exactly what is drawn
+                glLoadMatrixd(vc.camera.view_matrix.T)
+            self.update_picking()
+
+            # Only models whose bounds intersect the view frustum are submitted
+            with prof.span('cull'):
+                visible = self.scene_index.visible(vc.camera.frustum_planes())
+                self.cull_stats = self.scene_index.stats
+            # Each visible model is drawn at the detail level its on-screen size calls for
+            with prof.span('lod'):
+                draw_list = [(m_idx, self.get_draw_model(m_idx)) for m_idx in visible]
+            MeshBuffers.draw_calls = MeshBuffers.faces_submitted = 0
+            # Render faces first (if available)
+            with prof.span('faces'):
+                self.render_faces(draw_list)
+            # Render wireframes
+            with prof.span('wireframe'):
+                for _, draw_model in draw_list:
+                    draw_model.render(self.screen)
+            prof.count('draw_calls', MeshBuffers.draw_calls)
+            prof.count('faces_submitted', MeshBuffers.faces_submitted)
 
-        # Check for new left click and perform picking
+            if vc.hud_enabled:
+                with prof.span('hud'):
+                    self.hud.draw(prof, self.height)
+            with prof.span('present'):
+                self.present()
+        vc.dirty = False
+        # Point clouds still paging in chunks need further frames to reach full detail
+        self.models_dirty = any(getattr(model, 'incomplete', False) for _, model in draw_list)
+
+    # ---------------------------------------------
+    # Resolve pending clicks and hover into highlighted faces; a change requests a redraw
+    # ---------------------------------------------
+    def update_picking(self):
+        vc = self.view_control
         click = vc.consume_left_click()
         if click:
-            self.highlighted_face = self.pick_face(click[0], click[1])
+            hit = self.pick_face(click[0], click[1])
+            self.set_marked_face('highlighted_face', (hit.model_idx, hit.face_idx, hit.instance) if hit else None)
+            self.select_region(hit, vc.click_mode)
+        # Hover highlighting follows the mouse on every motion event
+        hover = vc.consume_hover()
+        if hover:
+            hit = self.pick_face(hover[0], hover[1])
+            self.set_marked_face('hovered_face', (hit.model_idx, hit.face_idx, hit.instance) if hit else None)
 
-        # Render faces first (if available)
-        self.render_faces()
-        # Render wireframes
-        for model in self.models:
-            model.render(self.screen)
+    def select_region(self, hit, mode):
+        # Modifier clicks select the region around the hit face (see ViewControl.selection_mode);
+        # a plain click or a miss clears the selection
+        model = self.models[hit.model_idx] if hit else None
+        if mode == 'face' or not isinstance(model, Model):
+            selection = None
+        else:
+            faces = select_faces(model, model.source_faces(hit.face_idx), mode)
+            selection = (hit.model_idx, faces, model.topology_version)
+        if selection is not None or self.selected_faces is not None:
+            self.selected_faces = selection
+            self.view_control.dirty = True
 
-        pygame.display.flip()
+    def set_marked_face(self, attr, face):
+        if getattr(self, attr, None) != face:
+            setattr(self, attr, face)
+            self.view_control.dirty = True
+
+    def needs_redraw(self):
+        return self.view_control.dirty or self.models_dirty
+
+    # ---------------------------------------------
+    # Animations (e.g. IK playback) advance once per loop iteration; their model edits
+    # mark the scene dirty through the model listeners
+    # ---------------------------------------------
+    def add_animation(self, animation):
+        self.animations.append(animation)
+
+    def step_animations(self):
+        with self.profiler.span('animate'):
+            self.animations = [animation for animation in self.animations if animation.step()]
+
+    def _on_model_modified(self, model):
+        self.models_dirty = True
+
+    # ---------------------------------------------
+    # Render mode for the current view mode (perspective or orthogonal)
+    # ---------------------------------------------
     def get_render_mode(self):
+        # One instance per mode, created on first use
         mode = getattr(self.view_control, 'view_mode', 'perspective')
-        if mode == 'orthogonal':
-            return OrthoMode(self)
-        else:
-            return PerspectiveMode(self)
+        if mode not in self.render_modes:
+            self.render_modes[mode] = OrthoMode(self) if mode == 'orthogonal' else PerspectiveMode(self)
+        return self.render_modes[mode]
 
     # ---------------------------------------------
-    # Get screen-space size of closest face to camera
+    # Level of detail: pick the decimated version of a model to draw this frame
+    # ---------------------------------------------
+    def get_draw_model(self, m_idx):
+        model = self.models[m_idx]
+        if not self.view_control.lod_enabled or not isinstance(model, Model):
+            return model
+        # Keep marked models at full resolution so highlighted face indices stay valid
+        for face in (getattr(self, 'highlighted_face', None), getattr(self, 'hovered_face', None), self.selected_faces):
+            if face and face[0] == m_idx:
+                return model
+        return model_lod(model).select(self.view_control.camera)
+
+    # ---------------------------------------------
+    # Screen-space metrics for the current camera (see viewMetrics)
     # ---------------------------------------------
     def get_closest_face_screen_size(self):
-        viewport = glGetIntegerv(GL_VIEWPORT)
-        modelview = glGetDoublev(GL_MODELVIEW_MATRIX)
-        projection = glGetDoublev(GL_PROJECTION_MATRIX)
-        # Use identity for view_matrix for now (camera at origin)
-        view_matrix = np.eye(4)
-        _, verts = ViewUtils.get_closest_face_to_camera(self.models, view_matrix)
-        if verts is None:
-            return 1.0
-        screen_coords = ViewUtils.project_vertices_to_screen(verts, modelview, projection, viewport)
-        # Use max distance between any two screen coords as size
-        dists = [np.linalg.norm(a-b) for i,a in enumerate(screen_coords) for b in screen_coords[i+1:]]
-        return max(dists) if dists else 1.0
-    
+        # Pixel size of the face nearest in front of the camera; used to normalize zoom
+        return closest_face_screen_size(self.models, self.view_control.camera)
+
+    def get_projected_extent(self):
+        # Screen rectangle covered by the scene bounds, or None if they reach behind the camera
+        return projected_extent(self.scene_bounds.get(), self.view_control.camera)
+
+    def get_face_size_distribution(self, percentiles=(5, 50, 95)):
+        return face_size_distribution(self.models, self.view_control.camera, percentiles)
+
     # ---------------------------------------------
     # Compute the bounding box and max size of all models
     # ---------------------------------------------
     def get_max_model_size(self):
-        if not self.models:
-            return 1.0
-        all_vertices = np.concatenate([np.array(m.vertices) for m in self.models if hasattr(m, 'vertices')])
-        min_v = np.min(all_vertices, axis=0)
-        max_v = np.max(all_vertices, axis=0)
-        size = np.linalg.norm(max_v - min_v)
+        # Read from the incrementally maintained scene bounds instead of re-scanning vertices
+        size = self.scene_bounds.size()
         return size if size > 0 else 1.0
     # ---------------------------------------------
-    # Ray picking: Returns (model_idx, face_idx) if a face is picked, else None
+    # Ray picking: Returns the closest PickHit(model_idx, face_idx, t, barycentrics), else None
     # ---------------------------------------------
     def pick_face(self, mouse_x, mouse_y):
-        from OpenGL.GL import glGetIntegerv, glGetDoublev
-        from OpenGL.GLU import gluUnProject
-        viewport = glGetIntegerv(GL_VIEWPORT)
-        modelview = glGetDoublev(GL_MODELVIEW_MATRIX)
-        projection = glGetDoublev(GL_PROJECTION_MATRIX)
-        winX = float(mouse_x)
-        winY = float(viewport[3] - mouse_y)
-        near = gluUnProject(winX, winY, 0.0, modelview, projection, viewport)
-        far = gluUnProject(winX, winY, 1.0, modelview, projection, viewport)
-        ray_dir = np.array(far) - np.array(near)
-        ray_dir = ray_dir / np.linalg.norm(ray_dir)
-        ray_origin = np.array(near)
-        for m_idx, model in enumerate(self.models):
-            for f_idx, face in enumerate(model.faces):
-                verts = [np.array(model.vertices[i]) for i in face]
-                v0, v1, v2 = verts[0], verts[1], verts[2]
-                normal = np.cross(v1 - v0, v2 - v0)
-                normal = normal / np.linalg.norm(normal)
-                d = -np.dot(normal, v0)
-                denom = np.dot(normal, ray_dir)
-                if abs(denom) < 1e-6:
-                    continue
-                t = -(np.dot(normal, ray_origin) + d) / denom
-                if t < 0:
-                    continue
-                intersect = ray_origin + t * ray_dir
-                tri1 = [verts[0], verts[1], verts[2]]
-                tri2 = [verts[0], verts[2], verts[3]]
-                if self.point_in_triangle(intersect, tri1) or self.point_in_triangle(intersect, tri2):
-                    return (m_idx, f_idx)
-        return None
-
-    # ---------------------------------------------
-    # Helper: Check if point p is inside triangle tri
-    # ---------------------------------------------
-    def point_in_triangle(self, p, tri):
-        a, b, c = tri
-        v0 = c - a
-        v1 = b - a
-        v2 = p - a
-        dot00 = np.dot(v0, v0)
-        dot01 = np.dot(v0, v1)
-        dot02 = np.dot(v0, v2)
-        dot11 = np.dot(v1, v1)
-        dot12 = np.dot(v1, v2)
-        invDenom = 1 / (dot00 * dot11 - dot01 * dot01)
-        u = (dot11 * dot02 - dot01 * dot12) * invDenom
-        v = (dot00 * dot12 - dot01 * dot02) * invDenom
-        return (u >= 0) and (v >= 0) and (u + v <= 1)
+        with self.profiler.span('pick'):
+            ray_origin, ray_dir = self.view_control.camera.screen_ray(mouse_x, mouse_y)
+            return self.pick_ray(ray_origin, ray_dir)
+
+    def pick_ray(self, ray_origin, ray_dir):
+        # Only models whose bounds the ray enters are asked, nearest first; each answers from
+        # its own lazily built BVH, and the best t so far prunes everything behind it
+        closest = None
+        candidates, entry = self.scene_index.ray_candidates(ray_origin, ray_dir)
+        for m_idx, t_entry in zip(candidates, entry):
+            if closest is not None and t_entry >= closest.t:
+                break
+            hit = self.models[m_idx].pick(ray_origin, ray_dir, closest.t if closest else np.inf)
+            if hit is not None:
+                closest = PickHit(int(m_idx), *hit)
+        return closest
+
     # ---------------------------------------------
     # Constructor: Initializes the viewer window and state
     # ---------------------------------------------
-    def __init__(self, width=800, height=600):
+    def __init__(self, width=800, height=600, headless=False, backend=None):
         self.width = width
         self.height = height
+        self.headless = headless
         self.models = []
-        self.view_control = ViewControl()
-        self.init_pygame()
+        self.scene_bounds = SceneBounds()
+        self.scene_index = SceneIndex()
+        self.cull_stats = self.scene_index.stats
+        self.view_control = ViewControl(width, height)
+        self.render_modes = {}
+        self.loaded_projection = None  # camera.projection_key last loaded into GL
+        self.models_dirty = True       # geometry changed since the last frame
+        self.animations = []           # objects with step() -> False once finished
+        self.loader = None             # AsyncLoader, created by load_models_async
+        self.selected_faces = None     # (model_idx, sorted face indices, topology_version)
+        # Stage timings are off unless the HUD is shown or VIEWER_PROFILE names an export file
+        self.profile_path = os.environ.get('VIEWER_PROFILE')
+        self.profiler = Profiler(enabled=bool(self.profile_path))
+        self.hud_profiling = False     # profiler switched on only for the HUD
+        self.hud = ProfilerHUD()
+        if headless:
+            self.init_offscreen(backend)
+        else:
+            self.init_pygame()
         self.init_opengl()
         # Set initial zoom (move camera back based on model size)
         self.reset_view()
@@ -261,6 +358,7 @@ class ViewRender:
         self.view_control.pan_y = 0
         self.view_control.rot_x = 0
         self.view_control.rot_y = 0
+        self.view_control.dirty = True
         # Delegate all normalization and zoom logic to the current RenderMode
         self.get_render_mode().normalize_view()
         self.init_opengl()
@@ -273,6 +371,35 @@ class ViewRender:
         self.screen = pygame.display.set_mode((self.width, self.height), DOUBLEBUF | OPENGL)
         pygame.display.set_caption('3D Environment Viewer')
 
+    # ---------------------------------------------
+    # Initialize a headless context rendering into an offscreen framebuffer
+    # (see viewOffscreen.use_platform for selecting EGL/OSMesa before import)
+    # ---------------------------------------------
+    def init_offscreen(self, backend=None):
+        self.offscreen = OffscreenContext(self.width, self.height, backend)
+        self.framebuffer = Framebuffer(self.width, self.height)
+        self.framebuffer.bind()
+        self.screen = None
+
+    # ---------------------------------------------
+    # Finish the frame: swap buffers, or wait for the offscreen frame to complete
+    # ---------------------------------------------
+    def present(self):
+        if self.headless:
+            glFinish()
+        else:
+            pygame.display.flip()
+
+    # ---------------------------------------------
+    # Read back the last rendered frame as an (height, width, 3) uint8 image
+    # ---------------------------------------------
+    def snapshot(self):
+        if self.headless:
+            return self.framebuffer.read_pixels()
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        data = glReadPixels(0, 0, self.width, self.height, GL_RGB, GL_UNSIGNED_BYTE)
+        return np.frombuffer(data, dtype=np.uint8).reshape(self.height, self.width, 3)[::-1]
+
     # ---------------------------------------------
     # Initialize OpenGL context and settings
     # ---------------------------------------------
@@ -282,73 +409,194 @@ class ViewRender:
         glLoadIdentity()
         self.get_render_mode().apply_projection()
         glMatrixMode(GL_MODELVIEW)
+        self.loaded_projection = self.view_control.camera.projection_key
 
     # ---------------------------------------------
     # Add a model to the viewer
     # ---------------------------------------------
-    def add_model(self, model):
-        self.models.append(model)
-        self.reset_view()  # Reset view when new model is added
+    def add_model(self, model, normalize=True):
+        self.add_models([model], normalize)
+
+    # ---------------------------------------------
+    # Add several models with a single view normalization at the end (normalize=False
+    # leaves the camera alone, e.g. while a background load is still delivering models)
+    # ---------------------------------------------
+    def add_models(self, models, normalize=True):
+        for model in models:
+            self.models.append(model)
+            self.scene_bounds.add(model)
+            self.scene_index.add(model)
+            model.listeners.append(self._on_model_modified)
+        self.models_dirty = True
+        if normalize:
+            self.reset_view()
+
+    # ---------------------------------------------
+    # Remove every model and free its GPU buffers
+    # ---------------------------------------------
+    def clear_models(self):
+        for model in self.models:
+            self.scene_bounds.remove(model)
+            self.scene_index.remove(model)
+            model.listeners.remove(self._on_model_modified)
+            self.release_model(model)
+        self.models = []
+        self.highlighted_face = None
+        self.hovered_face = None
+        self.selected_faces = None
+        self.models_dirty = True
+
+    def release_model(self, model):
+        # GPU buffers are recreated on the next draw if the model is added again
+        if isinstance(model, (InstancedModel, PointCloud)):
+            model.release()
+        else:
+            model.release_buffers()
+
+    # ---------------------------------------------
+    # Load a mesh file (OBJ, PLY, STL) and add it to the viewer
+    # ---------------------------------------------
+    def load_model(self, path, use_cache=True):
+        # Reopening an asset maps the native cache instead of re-parsing the source file
+        model = load_cached(path, load_mesh) if use_cache else load_mesh(path)
+        self.add_model(model)
+        return model
+
+    # ---------------------------------------------
+    # Load mesh files on worker threads; models appear as they become ready and the
+    # view is normalized once when all of them are in (polled from run())
+    # ---------------------------------------------
+    def load_models_async(self, paths, **options):
+        if self.loader is None:
+            self.loader = AsyncLoader(self, **options)
+        for path in paths:
+            self.loader.load(path)
+        return self.loader
+
+    # ---------------------------------------------
+    # Remove a model from the viewer
+    # ---------------------------------------------
+    def remove_model(self, model):
+        m_idx = self.models.index(model)
+        self.models.pop(m_idx)
+        self.scene_bounds.remove(model)
+        self.scene_index.remove(model)
+        model.listeners.remove(self._on_model_modified)
+        self.release_model(model)
+        self.models_dirty = True
+        # Face references into later models shift down by one
+        for attr in ('highlighted_face', 'hovered_face', 'selected_faces'):
+            face = getattr(self, attr, None)
+            if face and face[0] == m_idx:
+                setattr(self, attr, None)
+            elif face and face[0] > m_idx:
+                setattr(self, attr, (face[0] - 1,) + face[1:])
 
     # ---------------------------------------------
     # Render all model faces with coloring and highlighting
     # ---------------------------------------------
-    def render_faces(self):
-        view_dir = np.array([0, 0, -1])
-        def get_face_color(m_idx, f_idx, dot):
-            if hasattr(self, 'highlighted_face') and self.highlighted_face == (m_idx, f_idx):
-                return (1.0, 1.0, 0.2, 0.8)  # Yellow, more opaque
-            elif dot > 0:
-                return (0.2, 0.8, 0.2, 0.5)  # Green, semi-transparent
-            else:
-                return (0.8, 0.2, 0.2, 0.5)  # Red, semi-transparent
-        for m_idx, model in enumerate(self.models):
-            if hasattr(model, 'faces') and model.faces:
+    def render_faces(self, draw_list=None):
+        view_dir = self.view_control.view_direction()
+        # Later entries are painted over earlier ones, so the selection wins over hover
+        marked = [(getattr(self, 'hovered_face', None), HOVER_COLOR),
+                  (getattr(self, 'highlighted_face', None), HIGHLIGHT_COLOR)]
+        if draw_list is None:
+            draw_list = list(enumerate(self.models))
+        for m_idx, model in draw_list:
+            if isinstance(model, InstancedModel):
+                # Whole instances are marked; they are culled individually against the frustum
+                instances = [(face[2], color) for face, color in marked if face and face[0] == m_idx]
                 glEnable(GL_BLEND)
                 glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-                glBegin(GL_QUADS)
-                for f_idx, face in enumerate(model.faces):
-                    v0 = np.array(model.vertices[face[0]])
-                    v1 = np.array(model.vertices[face[1]])
-                    v2 = np.array(model.vertices[face[2]])
-                    normal = np.cross(v1 - v0, v2 - v0)
-                    normal = normal / np.linalg.norm(normal)
-                    dot = np.dot(normal, view_dir)
-                    color = get_face_color(m_idx, f_idx, dot)
-                    glColor4f(*color)
-                    for idx in face:
-                        glVertex3fv(model.vertices[idx])
-                glEnd()
+                model.draw_faces(view_dir, self.view_control.camera.frustum_planes(), instances,
+                                 FACING_COLOR, BACKFACING_COLOR)
+                glDisable(GL_BLEND)
+            elif isinstance(model, PointCloud):
+                # Visible chunks are paged in and drawn at the density their screen size calls for
+                model.draw(self.view_control.camera, [(face[1], color) for face, color in marked if face and face[0] == m_idx])
+            elif len(getattr(model, 'faces', ())):
+                # Face indices refer to the full-resolution model, which get_draw_model
+                # always returns while one of its faces is marked
+                # Triangles split from an imported polygon are highlighted together
+                highlights = [(model.source_faces(face[1]), color) for face, color in marked if face and face[0] == m_idx]
+                selection = self.selected_faces
+                # A selection made before the faces were edited no longer refers to the same faces
+                if selection and selection[0] == m_idx and selection[2] == model.topology_version:
+                    highlights.insert(0, (selection[1], SELECTION_COLOR))
+                colors = ViewUtils.face_shading_colors(model.face_normals(), view_dir, highlights)
+                glEnable(GL_BLEND)
+                glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+                model.gpu_buffers().draw_faces(model, colors, slot='shading', view_matrix=self.view_control.camera.view_matrix)
                 glDisable(GL_BLEND)
 
     # ---------------------------------------------
     # Main event loop: handles input and rendering
     # ---------------------------------------------
-    def run(self):
+    def run(self, idle_timeout_ms=IDLE_TIMEOUT_MS, max_fps=MAX_FPS, continuous=False):
+        # Frames are only drawn when the camera, selection or geometry changed (or always,
+        # with continuous=True); otherwise the loop sleeps in pygame.event.wait
         clock = pygame.time.Clock()
         vc = self.view_control
         while True:
-            for event in pygame.event.get():
-                match event.type:
-                    case pygame.QUIT:
-                        pygame.quit()
-                        return
-                    case pygame.KEYDOWN:
-                        vc.handle_keydown(event)
-                    case pygame.KEYUP:
-                        vc.handle_keyup(event)
-                    case pygame.MOUSEBUTTONDOWN:
-                        vc.handle_mousebuttondown(event)
-                    case pygame.MOUSEBUTTONUP:
-                        vc.handle_mousebuttonup(event)
-                    case pygame.MOUSEMOTION:
-                        vc.handle_mousemotion(event)
-
-            self.render()
-            clock.tick(60)
+            if continuous:
+                vc.dirty = True
+            loading = self.loader is not None and self.loader.busy
+            if self.needs_redraw() or self.animations or loading:
+                events = pygame.event.get()
+            else:
+                event = pygame.event.wait(idle_timeout_ms)
+                events = [event] + pygame.event.get() if event.type != pygame.NOEVENT else []
+                if not events and vc.hud_enabled:
+                    # Keep the overlay's numbers fresh while idle
+                    vc.dirty = True
+            # Recorded into the frame rendered right after the events are handled
+            with self.profiler.span('events'):
+                for event in events:
+                    match event.type:
+                        case pygame.QUIT:
+                            if self.loader is not None:
+                                self.loader.shutdown()
+                            if self.profile_path:
+                                self.profiler.export(self.profile_path)
+                            pygame.quit()
+                            return
+                        case pygame.KEYDOWN:
+                            vc.handle_keydown(event)
+                        case pygame.KEYUP:
+                            vc.handle_keyup(event)
+                        case pygame.MOUSEBUTTONDOWN:
+                            vc.handle_mousebuttondown(event)
+                        case pygame.MOUSEBUTTONUP:
+                            vc.handle_mousebuttonup(event)
+                        case pygame.MOUSEMOTION:
+                            vc.handle_mousemotion(event)
+                        case pygame.VIDEOEXPOSE | pygame.WINDOWEXPOSED:
+                            vc.dirty = True
+
+            if loading:
+                with self.profiler.span('load'):
+                    self.loader.poll()
+            if self.animations:
+                self.step_animations()
+            # With no frame due the camera is the one last drawn, so clicks and hover are
+            # picked here on the CPU and only a changed highlight requests a redraw; otherwise
+            # render() picks them against the camera it configures
+            if not self.needs_redraw():
+                self.update_picking()
+            if self.needs_redraw():
+                self.render()
+                clock.tick(max_fps)
+            elif self.animations or loading:
+                # Waiting for the next target to come due without spinning
+                clock.tick(max_fps)
 
 if __name__ == "__main__":
     viewer = ViewRender()
-    model = create_cube()
-    viewer.add_model(model)
+    if len(sys.argv) > 1:
+        # Directories are point clouds written by PointCloud.build
+        paths = sys.argv[1:]
+        viewer.add_models([PointCloud.open(path) for path in paths if os.path.isdir(path)])
+        viewer.load_models_async([path for path in paths if not os.path.isdir(path)])
+    else:
+        viewer.add_model(create_cube())
     viewer.run()
\ No newline at end of file
@@ -0,0 +1,149 @@
+import numpy as np
+from models.bvh import BVH, ray_box_entry
+
+# ---------------------------------------------
+# Scene-level bounds, maintained incrementally
+# ---------------------------------------------
+class SceneBounds:
+    """Union of per-model AABBs, updated in O(1) on add and rebuilt only when a shrink is possible.
+
+    Each model's own AABB is cached on the model (Model.bounds) until its geometry changes;
+    models notify this object through Model.listeners so edits are picked up lazily.
+    """
+
+    def __init__(self):
+        self.entries = {}  # id(model) -> (model, bounds the union was last built from)
+        self.lo = None
+        self.hi = None
+        self.stale = False
+
+    def _grow(self, bounds):
+        if bounds is None:
+            return
+        lo, hi = bounds
+        self.lo = lo.copy() if self.lo is None else np.minimum(self.lo, lo)
+        self.hi = hi.copy() if self.hi is None else np.maximum(self.hi, hi)
+
+    def _touches_boundary(self, bounds):
+        # A model whose box reaches the scene box may be the only thing holding that face out
+        if bounds is None or self.lo is None:
+            return False
+        lo, hi = bounds
+        return bool(np.any(lo <= self.lo) or np.any(hi >= self.hi))
+
+    def add(self, model):
+        bounds = model.bounds()
+        self.entries[id(model)] = (model, bounds)
+        model.listeners.append(self._on_modified)
+        if not self.stale:
+            self._grow(bounds)
+
+    def remove(self, model):
+        _, bounds = self.entries.pop(id(model))
+        model.listeners.remove(self._on_modified)
+        if self._touches_boundary(bounds):
+            self.stale = True
+
+    def _on_modified(self, model):
+        _, old_bounds = self.entries[id(model)]
+        if self._touches_boundary(old_bounds):
+            self.stale = True
+            return
+        # The old box was strictly inside, so the union can only grow
+        bounds = model.bounds()
+        self.entries[id(model)] = (model, bounds)
+        self._grow(bounds)
+
+    def _rebuild(self):
+        self.lo = self.hi = None
+        boxes = []
+        for key, (model, _) in self.entries.items():
+            bounds = model.bounds()
+            self.entries[key] = (model, bounds)
+            if bounds is not None:
+                boxes.append(bounds)
+        if boxes:
+            los, his = zip(*boxes)
+            self.lo = np.min(los, axis=0)
+            self.hi = np.max(his, axis=0)
+        self.stale = False
+
+    def get(self):
+        """(min, max) corners of the whole scene, or None when no model has vertices."""
+        if self.stale:
+            self._rebuild()
+        if self.lo is None:
+            return None
+        return self.lo, self.hi
+
+    def size(self):
+        # Diagonal length of the scene box
+        bounds = self.get()
+        if bounds is None:
+            return 0.0
+        return float(np.linalg.norm(bounds[1] - bounds[0]))
+
+# ---------------------------------------------
+# Spatial index over model bounds for frustum culling
+# ---------------------------------------------
+class SceneIndex:
+    """BVH over per-model AABBs, rebuilt lazily after models are added, removed or edited."""
+
+    def __init__(self, leaf_size=4):
+        self.leaf_size = leaf_size
+        self.models = []
+        self.bvh = None
+        self.lo = None
+        self.hi = None
+        self.valid = None
+        self.stats = {'drawn': 0, 'culled': 0}
+
+    def invalidate(self, model=None):
+        # Also registered as a Model listener, hence the optional argument
+        self.bvh = None
+
+    def add(self, model):
+        self.models.append(model)
+        model.listeners.append(self.invalidate)
+        self.invalidate()
+
+    def remove(self, model):
+        self.models.remove(model)
+        model.listeners.remove(self.invalidate)
+        self.invalidate()
+
+    def _rebuild(self):
+        boxes = [model.bounds() for model in self.models]
+        # Empty models are indexed with a placeholder box and filtered out through self.valid
+        empty = (np.full(3, np.inf), np.full(3, -np.inf))
+        lo, hi = zip(*[box if box is not None else empty for box in boxes]) if boxes else ((), ())
+        self.lo = np.array(lo, dtype=np.float64).reshape(-1, 3)
+        self.hi = np.array(hi, dtype=np.float64).reshape(-1, 3)
+        valid = np.all(self.lo <= self.hi, axis=1)
+        self.bvh = BVH(np.where(valid[:, None], self.lo, 0.0), np.where(valid[:, None], self.hi, 0.0), self.leaf_size)
+        self.valid = valid
+
+    def visible(self, planes):
+        """Indices (into the add order) of models whose bounds intersect the frustum planes."""
+        if self.bvh is None:
+            self._rebuild()
+        indices = self.bvh.query_frustum(planes, self.lo, self.hi)
+        indices = indices[self.valid[indices]]
+        self.stats = {'drawn': len(indices), 'culled': len(self.models) - len(indices)}
+        return indices
+
+    def ray_candidates(self, origin, direction, max_t=np.inf):
+        """Indices of models whose bounds the ray enters before max_t, nearest entry first,
+        with their entry distances."""
+        if self.bvh is None:
+            self._rebuild()
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+        leaves, _ = self.bvh.leaves_hit_by_ray(origin, direction, max_t)
+        candidates = self.bvh.primitives_in_leaves(leaves)
+        candidates = candidates[self.valid[candidates]]
+        entry = ray_box_entry(origin, 1.0 / np.where(direction == 0, 1e-30, direction),
+                              self.lo[candidates], self.hi[candidates])
+        keep = entry < max_t
+        ranked = np.argsort(entry[keep], kind='stable')
+        return candidates[keep][ranked], entry[keep][ranked]